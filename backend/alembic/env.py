@@ -13,6 +13,12 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import models and database config
 from app.database.connection import Base
 from app.models.contact import Contact
+from app.models.contact_note import contact_notes  # noqa: F401 - registers query indexes
+from app.models.change import Change  # noqa: F401
+from app.models.contact_stats import ContactStats  # noqa: F401
+from app.models.contact_block_key import ContactBlockKey  # noqa: F401
+from app.models.job import Job  # noqa: F401
+from app.models.interaction_rollup import ContactDailyInteractions, DailyInteractions  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -30,6 +36,16 @@ fileConfig(config.config_file_name)
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Objects managed by hand-written migrations rather than the models
+# (e.g. the SQLite FTS5 table and its shadow tables, expression indexes)
+EXCLUDED_PREFIXES = ("contacts_fts", "ix_contacts_search_")
+
+
+def include_name(name, type_, parent_names):
+    if name and name.startswith(EXCLUDED_PREFIXES):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -54,6 +70,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -75,7 +92,8 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,59 @@
+"""Add interaction rollups
+
+Revision ID: 1f8d3b6a9c05
+Revises: 0c9f3a7e5b21
+Create Date: 2026-10-17 21:03:27.615204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f8d3b6a9c05'
+down_revision = '0c9f3a7e5b21'
+branch_labels = None
+depends_on = None
+
+# Copy of app/services/rollups.py's UNKNOWN_TYPE
+UNKNOWN_TYPE = 'unknown'
+
+
+def upgrade():
+    daily_interactions = op.create_table('daily_interactions',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('interaction_type', sa.String(), nullable=False),
+    sa.Column('notes', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'interaction_type')
+    )
+    contact_daily_interactions = op.create_table('contact_daily_interactions',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('interaction_type', sa.String(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('notes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'interaction_type', 'contact_id')
+    )
+    op.create_index('ix_contact_daily_interactions_contact_id_day', 'contact_daily_interactions', ['contact_id', 'day'], unique=False)
+
+    # Rollups of the existing notes
+    notes = sa.table('notes', sa.column('id'), sa.column('interaction_date'), sa.column('interaction_type'))
+    contact_notes = sa.table('contact_notes', sa.column('contact_id'), sa.column('note_id'))
+    day = sa.func.date(notes.c.interaction_date)
+    interaction_type = sa.func.coalesce(notes.c.interaction_type, UNKNOWN_TYPE)
+    op.execute(daily_interactions.insert().from_select(
+        ['day', 'interaction_type', 'notes'],
+        sa.select(day, interaction_type, sa.func.count()).group_by(day, interaction_type),
+    ))
+    op.execute(contact_daily_interactions.insert().from_select(
+        ['day', 'interaction_type', 'contact_id', 'notes'],
+        sa.select(day, interaction_type, contact_notes.c.contact_id, sa.func.count())
+        .select_from(notes.join(contact_notes, contact_notes.c.note_id == notes.c.id))
+        .group_by(day, interaction_type, contact_notes.c.contact_id),
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_contact_daily_interactions_contact_id_day', table_name='contact_daily_interactions')
+    op.drop_table('contact_daily_interactions')
+    op.drop_table('daily_interactions')
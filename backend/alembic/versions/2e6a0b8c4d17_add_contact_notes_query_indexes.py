@@ -0,0 +1,30 @@
+"""Add contact notes query indexes
+
+Revision ID: 2e6a0b8c4d17
+Revises: 9c1d7e3f5a20
+Create Date: 2026-10-17 13:40:08.902116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e6a0b8c4d17'
+down_revision = '9c1d7e3f5a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # contact_notes(contact_id, note_id) is already covered by the primary
+    # key, which GET /contacts/{id}/notes uses to find a contact's links.
+    # The reverse index serves note -> contacts lookups and the join back.
+    op.create_index('ix_contact_notes_note_id_contact_id', 'contact_notes', ['note_id', 'contact_id'], unique=False)
+    # Ordering, keyset pagination and date-range filters on interaction_date
+    op.create_index('ix_notes_interaction_date_id', 'notes', ['interaction_date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_notes_interaction_date_id', table_name='notes')
+    op.drop_index('ix_contact_notes_note_id_contact_id', table_name='contact_notes')
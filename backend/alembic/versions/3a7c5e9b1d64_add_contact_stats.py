@@ -0,0 +1,83 @@
+"""Add contact stats
+
+Revision ID: 3a7c5e9b1d64
+Revises: 8b4e1f6c2a93
+Create Date: 2026-10-17 18:05:41.118920
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7c5e9b1d64'
+down_revision = '8b4e1f6c2a93'
+branch_labels = None
+depends_on = None
+
+# Copies of app/services/contact_stats.py's settings, so the backfill does
+# not change with the app
+DEFAULT_CADENCE_DAYS = 90
+MIN_CADENCE_DAYS = 7
+MAX_CADENCE_DAYS = 365
+
+
+def upgrade():
+    contact_stats = op.create_table('contact_stats',
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('cadence_days', sa.Integer(), nullable=True),
+    sa.Column('interaction_count', sa.Integer(), nullable=False),
+    sa.Column('first_interaction', sa.DateTime(), nullable=True),
+    sa.Column('last_interaction', sa.DateTime(), nullable=True),
+    sa.Column('effective_cadence_days', sa.Integer(), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('contact_id')
+    )
+    op.create_index('ix_contact_stats_due_at_contact_id', 'contact_stats', ['due_at', 'contact_id'], unique=False)
+
+    # Backfill every existing contact in one aggregate query
+    contacts = sa.table('contacts', sa.column('id'), sa.column('created_at', sa.DateTime()))
+    contact_notes = sa.table('contact_notes', sa.column('contact_id'), sa.column('note_id'))
+    notes = sa.table('notes', sa.column('id'), sa.column('interaction_date', sa.DateTime()))
+    aggregates = op.get_bind().execute(
+        sa.select(
+            contacts.c.id,
+            contacts.c.created_at,
+            sa.func.count(notes.c.id),
+            sa.func.min(notes.c.interaction_date),
+            sa.func.max(notes.c.interaction_date),
+        )
+        .select_from(contacts)
+        .outerjoin(contact_notes, contact_notes.c.contact_id == contacts.c.id)
+        .outerjoin(notes, notes.c.id == contact_notes.c.note_id)
+        .group_by(contacts.c.id, contacts.c.created_at)
+    ).all()
+
+    now = datetime.utcnow()
+    rows = []
+    for contact_id, created_at, count, first, last in aggregates:
+        cadence = DEFAULT_CADENCE_DAYS
+        if count >= 2 and first is not None and last is not None:
+            average_gap = (last - first).total_seconds() / 86400 / (count - 1)
+            cadence = int(min(max(round(average_gap), MIN_CADENCE_DAYS), MAX_CADENCE_DAYS))
+        rows.append({
+            'contact_id': contact_id,
+            'cadence_days': None,
+            'interaction_count': count,
+            'first_interaction': first,
+            'last_interaction': last,
+            'effective_cadence_days': cadence,
+            'due_at': (last or created_at or now) + timedelta(days=cadence),
+            'updated_at': now,
+        })
+    if rows:
+        op.bulk_insert(contact_stats, rows)
+
+
+def downgrade():
+    op.drop_index('ix_contact_stats_due_at_contact_id', table_name='contact_stats')
+    op.drop_table('contact_stats')
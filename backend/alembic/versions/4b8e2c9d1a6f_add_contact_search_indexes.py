@@ -0,0 +1,94 @@
+"""Add contact search indexes
+
+Revision ID: 4b8e2c9d1a6f
+Revises: daf2670b7172
+Create Date: 2026-10-17 09:12:44.381205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8e2c9d1a6f'
+down_revision = 'daf2670b7172'
+branch_labels = None
+depends_on = None
+
+
+# Must match PostgresTrigramSearchBackend.document() in app/services/search.py
+SEARCH_DOCUMENT = "crm_unaccent(lower(first_name || ' ' || last_name || ' ' || coalesce(nickname, '')))"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        # unaccent() is only STABLE, so wrap it in an IMMUTABLE function that
+        # can be used in an index expression
+        op.execute(
+            """
+            CREATE OR REPLACE FUNCTION crm_unaccent(text) RETURNS text
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+            """
+        )
+        op.execute(
+            f"CREATE INDEX ix_contacts_search_trgm ON contacts "
+            f"USING gin ({SEARCH_DOCUMENT} gin_trgm_ops)"
+        )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE contacts_fts USING fts5(
+                first_name, last_name, nickname,
+                content='contacts', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER contacts_fts_ai AFTER INSERT ON contacts BEGIN
+                INSERT INTO contacts_fts(rowid, first_name, last_name, nickname)
+                VALUES (new.id, new.first_name, new.last_name, new.nickname);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER contacts_fts_ad AFTER DELETE ON contacts BEGIN
+                INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, nickname)
+                VALUES ('delete', old.id, old.first_name, old.last_name, old.nickname);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER contacts_fts_au AFTER UPDATE OF first_name, last_name, nickname ON contacts BEGIN
+                INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, nickname)
+                VALUES ('delete', old.id, old.first_name, old.last_name, old.nickname);
+                INSERT INTO contacts_fts(rowid, first_name, last_name, nickname)
+                VALUES (new.id, new.first_name, new.last_name, new.nickname);
+            END
+            """
+        )
+        # Index the contacts that already exist
+        op.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_contacts_search_trgm', table_name='contacts')
+        op.execute("DROP FUNCTION IF EXISTS crm_unaccent(text)")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS contacts_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS contacts_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS contacts_fts_ai")
+        op.execute("DROP TABLE IF EXISTS contacts_fts")
@@ -0,0 +1,53 @@
+"""Add contact block keys
+
+Revision ID: 6e2b8d4f0a19
+Revises: 3a7c5e9b1d64
+Create Date: 2026-10-17 19:12:06.402358
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2b8d4f0a19'
+down_revision = '3a7c5e9b1d64'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    contact_block_keys = op.create_table('contact_block_keys',
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=80), nullable=False),
+    sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('contact_id', 'key')
+    )
+    op.create_index('ix_contact_block_keys_key_contact_id', 'contact_block_keys', ['key', 'contact_id'], unique=False)
+
+    # Keys of the existing contacts. They are computed by the app's own
+    # function; a migration changing the key format rebuilds them.
+    from app.services.dedupe import blocking_keys
+
+    contacts = sa.table(
+        'contacts', sa.column('id'), sa.column('first_name'), sa.column('last_name'),
+        sa.column('nickname'), sa.column('linkedin_url'),
+    )
+    result = op.get_bind().execute(
+        sa.select(contacts.c.id, contacts.c.first_name, contacts.c.last_name,
+                  contacts.c.nickname, contacts.c.linkedin_url)
+    )
+    rows = [
+        {'contact_id': contact_id, 'key': key}
+        for contact_id, first_name, last_name, nickname, linkedin_url in result
+        for key in sorted(blocking_keys(first_name, last_name, nickname, linkedin_url))
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(contact_block_keys, rows[start:start + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_index('ix_contact_block_keys_key_contact_id', table_name='contact_block_keys')
+    op.drop_table('contact_block_keys')
@@ -0,0 +1,30 @@
+"""Add change version indexes
+
+Revision ID: 8b4e1f6c2a93
+Revises: 5d3f9a1c7e42
+Create Date: 2026-10-17 16:48:12.305271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e1f6c2a93'
+down_revision = '5d3f9a1c7e42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ETags are built from the newest change of a contact, a note or an
+    # entity type; each lookup is a backward scan of one of these indexes.
+    op.create_index('ix_changes_contact_id_id', 'changes', ['contact_id', 'id'], unique=False)
+    op.create_index('ix_changes_note_id_id', 'changes', ['note_id', 'id'], unique=False)
+    op.create_index('ix_changes_entity_type_id', 'changes', ['entity_type', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_changes_entity_type_id', table_name='changes')
+    op.drop_index('ix_changes_note_id_id', table_name='changes')
+    op.drop_index('ix_changes_contact_id_id', table_name='changes')
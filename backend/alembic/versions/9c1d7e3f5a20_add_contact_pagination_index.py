@@ -0,0 +1,25 @@
+"""Add contact pagination index
+
+Revision ID: 9c1d7e3f5a20
+Revises: 4b8e2c9d1a6f
+Create Date: 2026-10-17 11:02:31.518734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1d7e3f5a20'
+down_revision = '4b8e2c9d1a6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves the (last_contacted, id) keyset ordering of GET /contacts/
+    op.create_index('ix_contacts_last_contacted_id', 'contacts', ['last_contacted', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_contacts_last_contacted_id', table_name='contacts')
@@ -0,0 +1,35 @@
+"""Order contact pagination index for DESC NULLS LAST
+
+Revision ID: a4c8e2f6b3d1
+Revises: 1f8d3b6a9c05
+Create Date: 2026-10-18 09:12:44.302815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f6b3d1'
+down_revision = '1f8d3b6a9c05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /contacts/ orders by last_contacted DESC NULLS LAST, id DESC. A
+    # PostgreSQL (last_contacted, id) index read backwards gives NULLS FIRST,
+    # so it cannot serve that order; SQLite sorts NULLs lowest and its
+    # backward scan already puts them last.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_contacts_last_contacted_id', table_name='contacts')
+        op.create_index(
+            'ix_contacts_last_contacted_id', 'contacts',
+            [sa.text('last_contacted DESC NULLS LAST'), sa.text('id DESC')], unique=False,
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_contacts_last_contacted_id', table_name='contacts')
+        op.create_index('ix_contacts_last_contacted_id', 'contacts', ['last_contacted', 'id'], unique=False)
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Conditional GET (RFC 9110 section 13). Read endpoints send an ETag and,
+# when known, a Last-Modified header; a client that sends them back in
+# If-None-Match / If-Modified-Since gets an empty 304 while nothing changed.
+#
+# Validators come from the change feed: the id of the newest change of the
+# resource is its version. The ETags are weak because they identify a
+# version of the data, not the exact bytes of the response. Resources without
+# any recorded change (missing ones, or rows older than the change feed) get
+# no validators and are always sent in full.
+
+# Clients may keep the response but must revalidate before using it
+CACHE_CONTROL = "private, no-cache"
+
+
+def validator_headers(tag: str, change: Tuple[int, Optional[datetime]]) -> Dict[str, str]:
+    """
+    ETag and Last-Modified headers for version change of the resource tag.
+    """
+    change_id, changed_at = change
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if not change_id:
+        return headers
+    headers["ETag"] = f'W/"{tag}.{change_id}"'
+    if changed_at is not None:
+        # changed_at is stored as naive UTC
+        headers["Last-Modified"] = format_datetime(changed_at.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, headers: Mapping[str, str]) -> bool:
+    """
+    Whether the request's preconditions say the client's copy is current.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        etag = headers.get("ETag")
+        if etag is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        # Invalid dates are ignored
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
+
+
+def not_modified(headers: Mapping[str, str]) -> Response:
+    return Response(status_code=304, headers=dict(headers))
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database.connection import get_db, run_db
+from app.schemas.change import ChangeFeed
+from app.services import change_feed
+
+router = APIRouter()
+
+@router.get("/", response_model=ChangeFeed)
+async def read_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """
+    Incremental change feed for sync clients.
+    
+    Returns created, updated and deleted contacts, notes and contact-note
+    links in the order they were written, starting after the since token
+    (from the beginning without one). Deletions are tombstones with only the
+    ids. Store next_token and pass it as since on the next call; keep
+    calling while has_more is true.
+    
+    Entries are kept for CHANGE_RETENTION_DAYS. Once entries a client has
+    not seen are pruned (or, without a token, the start of the feed), it
+    gets a 410 with next_token in its detail: take a full snapshot with
+    GET /export/, then continue the feed from that token.
+    """
+    return await run_db(db, change_feed.get_changes, since, limit)
@@ -1,129 +1,303 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from sqlalchemy import or_
+from typing import Any, Dict, List, Literal, Optional, Union
+from datetime import datetime
 
-from app.database.connection import get_db
-from app.models.contact import Contact
-from app.schemas.contact import Contact as ContactSchema, ContactCreate, ContactUpdate
-from app.schemas.note import Note as NoteSchema
+from app.api.fields import (
+    FIELDS_QUERY, embed_field, fields_tag, parse_fields, partial_adapter, partial_list_adapter, sparse_model,
+)
+from app.crud import contact as crud
+from app.database.connection import get_db, run_db
+from app.schemas.contact import (
+    Contact as ContactSchema, ContactAdapter, ContactCadence, ContactCreate, ContactImportResult,
+    ContactListAdapter, ContactMerge, ContactSuggestion, ContactUpdate, DueContact, DuplicateCandidate
+)
+from app.schemas.graph import ContactNetwork, ContactPath
+from app.schemas.note import NoteListAdapter, NoteWithContacts
+from app.services import autocomplete, change_feed, contact_import, contact_stats, dedupe, graph
+from app.services.cache import cached_response, collection_key, entity_key
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ContactSchema])
-def read_contacts(
+# Responses with fields= have only some of the fields
+SparseContact = sparse_model(ContactSchema)
+SparseNote = sparse_model(NoteWithContacts)
+
+@router.get("/", response_model=Union[List[ContactSchema], List[SparseContact]])
+async def read_contacts(
+    request: Request,
+    response: Response,
     search: Optional[str] = None,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db)
 ):
     """
     Retrieve contacts with optional search.
     
-    Search logic:
-    - If one word: search in first_name OR last_name OR nickname
-    - If two or more words: assume first word is first_name, second word is last_name
-    - Also search the entire term in nickname
-    """
-    query = db.query(Contact)
-    
-    # Apply search if provided
-    if search and search.strip():
-        search_terms = [term.strip() for term in search.split() if term.strip()]
-        
-        if len(search_terms) == 1:
-            # Single word - search in first_name OR last_name OR nickname
-            term = search_terms[0]
-            query = query.filter(
-                or_(
-                    Contact.first_name.ilike(f"%{term}%"),
-                    Contact.last_name.ilike(f"%{term}%"),
-                    Contact.nickname.ilike(f"%{term}%")
-                )
-            )
-        else:
-            # Split multiple words into first and second terms
-            first_term, second_term = search_terms[:2]
-            
-            # Create first_name + last_name search
-            name_filter = Contact.first_name.ilike(f"%{first_term}%") & Contact.last_name.ilike(f"%{second_term}%")
-            
-            # Also search the whole phrase in nickname
-            query = query.filter(
-                or_(
-                    name_filter,
-                    Contact.nickname.ilike(f"%{search}%")
-                )
-            )
-    
-    contacts = query.offset(skip).limit(limit).all()
-    return contacts
+    Search is delegated to the backend for the current database (see
+    app/services/search.py):
+    - SQLite: FTS5 prefix matching, accent-insensitive, ranked by bm25
+    - PostgreSQL: pg_trgm substring/similarity matching, accent-insensitive
+      and typo-tolerant, ranked by word similarity
+    
+    Without search, contacts are ordered by last_contacted (most recent
+    first, never contacted last) and can be paged with the opaque cursor
+    returned in the X-Next-Cursor header instead of skip.
+    
+    Responses carry an ETag that changes with any contact; send it back in
+    If-None-Match to get a 304 while the list is unchanged.
+    
+    fields=id,first_name,last_name returns (and reads) only those fields.
+    """
+    selected = parse_fields(fields, ContactSchema)
+    key = collection_key(
+        "contacts", search=search, skip=skip, limit=limit, cursor=cursor, fields=selected and ",".join(selected)
+    )
+    adapter = ContactListAdapter if selected is None else partial_list_adapter(ContactSchema, selected)
+    return await cached_response(
+        key, request, response, adapter,
+        lambda: run_db(db, crud.get_contacts, response, search, skip, limit, cursor, selected),
+        fields_tag("contacts", selected), lambda: run_db(db, change_feed.collection_version, "contact")
+    )
 
 @router.post("/", response_model=ContactSchema)
-def create_contact(contact: ContactCreate, db: Session = Depends(get_db)):
+async def create_contact(contact: ContactCreate, db: Session = Depends(get_db)):
     """
     Create a new contact.
     """
-    db_contact = Contact(**contact.dict())
-    db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
-    return db_contact
+    return await run_db(db, crud.create_contact, contact)
+
+@router.post("/bulk", response_model=ContactImportResult)
+async def bulk_create_contacts(
+    contacts: List[Dict[str, Any]] = Body(...),
+    transaction: Literal["single", "chunked"] = "chunked",
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Create many contacts from a JSON array.
+    
+    Rows are validated one by one and inserted in batches of batch_size with
+    a single executemany each. Invalid rows are skipped and listed in errors.
+    With transaction=chunked (default) each batch is committed on its own;
+    with transaction=single nothing is stored unless the whole import is.
+    """
+    records = enumerate(contacts, start=1)
+    return await run_db(
+        db, contact_import.import_records, records, batch_size, transaction == "single"
+    )
 
-@router.get("/{contact_id}", response_model=ContactSchema)
-def read_contact(contact_id: int, db: Session = Depends(get_db)):
+@router.post("/import", response_model=ContactImportResult)
+async def import_contacts(
+    request: Request,
+    format: Optional[Literal["csv", "vcard", "jsonl"]] = None,
+    transaction: Literal["single", "chunked"] = "chunked",
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Import contacts from an uploaded CSV, vCard or JSON-lines file.
+    
+    Send the file as the raw request body. The format comes from the format
+    parameter or the Content-Type (text/csv, text/vcard,
+    application/x-ndjson). The body is spooled to a temporary file as it
+    arrives and parsed row by row, so memory use does not grow with the
+    upload. Batching and transactions work as for POST /contacts/bulk.
+    """
+    import_format = format or contact_import.format_for_content_type(request.headers.get("content-type"))
+    upload = await contact_import.spool_request_body(request)
+    try:
+        return await run_db(
+            db, contact_import.import_upload, upload, import_format, batch_size, transaction == "single"
+        )
+    finally:
+        upload.close()
+
+@router.post("/merge", response_model=ContactSchema)
+async def merge_contacts(merge: ContactMerge, db: Session = Depends(get_db)):
+    """
+    Merge duplicate contacts (source_ids) into target_id.
+    
+    The target keeps its values and fills empty fields from the sources;
+    the sources' notes are moved to it and the sources are deleted.
+    """
+    return await run_db(db, crud.merge_contacts, merge.target_id, merge.source_ids)
+
+@router.get("/duplicates", response_model=List[DuplicateCandidate])
+async def read_duplicate_contacts(
+    min_score: float = Query(dedupe.DEFAULT_MIN_SCORE, ge=0, le=1),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Pairs of contacts that are likely the same person, most likely first.
+    
+    Only contacts sharing a blocking key are compared: the same name by
+    sound (with nicknames resolved and first/last swaps) or the same
+    LinkedIn profile. Pass a pair to POST /contacts/merge to merge it.
+    """
+    return await run_db(db, dedupe.find_duplicates, min_score, limit)
+
+@router.get("/autocomplete", response_model=List[ContactSuggestion])
+async def autocomplete_contacts(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    Contacts for a type-ahead picker: every word of prefix must start a
+    word of the first name, last name or nickname, ignoring case and
+    accents ("ada lov" finds Ada Lovelace).
+    
+    Answered from an in-memory index; the database is only read for
+    contacts changed since the last call.
+    """
+    return await run_db(db, autocomplete.autocomplete, prefix, limit)
+
+@router.get("/due", response_model=List[DueContact])
+async def read_due_contacts(
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    include_upcoming: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Who to reach out to: contacts past their due date, most overdue first.
+    
+    A contact is due its cadence after their last interaction (or after
+    being added, if there is none). The cadence is the one set with
+    PUT /contacts/{id}/cadence, or else the average gap between their past
+    interactions, or CONTACT_DEFAULT_CADENCE_DAYS. overdue_days is the
+    ranking score. With include_upcoming, contacts not due yet follow,
+    soonest first, with a negative overdue_days.
+    
+    Reads the maintained contact_stats table in due_at index order.
+    """
+    return await run_db(db, contact_stats.get_due_contacts, limit, skip, include_upcoming)
+
+@router.get("/{contact_id}", response_model=Union[ContactSchema, SparseContact])
+async def read_contact(
+    contact_id: int, 
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_db)
+):
     """
     Get a specific contact by ID.
+    
+    Supports conditional requests with If-None-Match / If-Modified-Since,
+    and sparse fieldsets with fields= as GET /contacts/.
     """
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
-    if contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    return contact
+    selected = parse_fields(fields, ContactSchema)
+    guard = None
+    if selected is None:
+        key, adapter, guard = entity_key("contact", contact_id), ContactAdapter, "contacts"
+    else:
+        # Only entity_key entries are dropped on change, this one expires
+        # with the contacts' generation like a list
+        key = collection_key("contacts", contact_id=contact_id, fields=",".join(selected))
+        adapter = partial_adapter(ContactSchema, selected)
+    return await cached_response(
+        key, request, response, adapter,
+        lambda: run_db(db, crud.get_contact, contact_id, selected),
+        fields_tag(f"contact-{contact_id}", selected), lambda: run_db(db, change_feed.contact_version, contact_id),
+        guard,
+    )
 
 @router.put("/{contact_id}", response_model=ContactSchema)
-def update_contact(contact_id: int, contact: ContactUpdate, db: Session = Depends(get_db)):
+async def update_contact(contact_id: int, contact: ContactUpdate, db: Session = Depends(get_db)):
     """
     Update a contact.
     """
-    db_contact = db.query(Contact).filter(Contact.id == contact_id).first()
-    if db_contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    
-    for key, value in contact.dict(exclude_unset=True).items():
-        setattr(db_contact, key, value)
+    return await run_db(db, crud.update_contact, contact_id, contact)
+
+@router.put("/{contact_id}/cadence", response_model=DueContact)
+async def set_contact_cadence(contact_id: int, cadence: ContactCadence, db: Session = Depends(get_db)):
+    """
+    Set how many days should pass between interactions with a contact.
     
-    db.commit()
-    db.refresh(db_contact)
-    return db_contact
+    A null cadence_days goes back to the cadence derived from the
+    interaction history.
+    """
+    return await run_db(db, contact_stats.set_cadence, contact_id, cadence.cadence_days)
 
 @router.delete("/{contact_id}")
-def delete_contact(contact_id: int, db: Session = Depends(get_db)):
+async def delete_contact(contact_id: int, db: Session = Depends(get_db)):
     """
     Delete a contact.
     """
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
-    if contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    
-    db.delete(contact)
-    db.commit()
+    await run_db(db, crud.delete_contact, contact_id)
     return {"message": "Contact deleted successfully"}
 
-@router.get("/{contact_id}/notes", response_model=List[NoteSchema])
-def get_contact_notes(
+@router.get("/{contact_id}/notes", response_model=Union[List[NoteWithContacts], List[SparseNote]])
+async def get_contact_notes(
     contact_id: int, 
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_contacts: bool = False,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db)
 ):
     """
-    Get all notes for a specific contact.
+    Get all notes for a specific contact, most recent interaction first.
+    
+    Optionally restrict to interactions between start_date and end_date
+    (both inclusive). Pass the X-Next-Cursor header of a page as cursor to
+    get the next one.
+    
+    The page is selected in SQL through contact_notes, so only the returned
+    notes are loaded no matter how many the contact has. fields= selects
+    the fields of the notes, as for GET /notes/.
     """
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
-    if contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
+    selected = parse_fields(fields, NoteWithContacts)
+    selected, include_contacts = embed_field(NoteWithContacts, selected, "contacts", include_contacts)
+    key = collection_key(
+        "notes", "contacts", contact_id=contact_id, skip=skip, limit=limit, cursor=cursor,
+        start_date=start_date, end_date=end_date, include_contacts=include_contacts,
+        fields=selected and ",".join(selected)
+    )
+    adapter = NoteListAdapter if selected is None else partial_list_adapter(NoteWithContacts, selected)
+    return await cached_response(
+        key, request, response, adapter,
+        lambda: run_db(
+            db, crud.get_contact_notes, response, contact_id, skip, limit,
+            cursor, start_date, end_date, include_contacts, selected
+        ),
+        fields_tag(f"contact-{contact_id}-notes", selected), lambda: run_db(db, change_feed.collection_version)
+    )
+
+@router.get("/{contact_id}/network", response_model=ContactNetwork)
+async def get_contact_network(
+    contact_id: int,
+    min_weight: int = Query(1, ge=1),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    The people a contact shares notes with, strongest connection first.
     
-    notes = contact.notes
-    # Apply pagination after getting all notes
-    # This is not the most efficient for very large datasets but works for this limited use case
-    return notes[skip:skip+limit]
\ No newline at end of file
+    weight is the number of notes they are both in.
+    """
+    return await run_db(db, graph.get_network, contact_id, min_weight, limit)
+
+@router.get("/{contact_id}/path/{target_id}", response_model=ContactPath)
+async def get_contact_path(
+    contact_id: int,
+    target_id: int,
+    max_depth: int = Query(6, ge=1, le=10),
+    db: Session = Depends(get_db)
+):
+    """
+    How do I know target_id through contact_id: the shortest chain of
+    contacts that share notes, at most max_depth hops, or 404.
+    """
+    return await run_db(db, graph.find_path, contact_id, target_id, max_depth)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from datetime import datetime
+
+from app.database.connection import get_db
+from app.services import export
+
+router = APIRouter()
+
+@router.get("/")
+async def export_data(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    entity: Literal["contacts", "notes", "links"] = "contacts",
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a backup of the CRM.
+    
+    - format=ndjson (default): contacts, then notes, then contact-note links,
+      one JSON object per line with a "type" field.
+    - format=csv: the table given by entity, with a header row.
+    
+    Rows are read with a server-side cursor and written as they arrive, so
+    memory use stays constant however large the CRM is. With since, only
+    contacts and notes created or updated since then (and their links) are
+    exported, for incremental backups; adding or removing a contact of a
+    note counts as an update of the note. Deletions are not in incremental
+    exports, follow GET /changes for them.
+    """
+    if format == "csv":
+        return StreamingResponse(
+            export.export_csv(db, entity, since),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{entity}.csv"'},
+        )
+    return StreamingResponse(
+        export.export_ndjson(db, since),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="crm-export.ndjson"'},
+    )
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database.connection import get_db, run_db
+from app.schemas.graph import Graph
+from app.services import graph
+
+router = APIRouter()
+
+@router.get("/", response_model=Graph)
+async def read_graph(
+    min_weight: int = Query(1, ge=1),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    The relationship graph: contacts are connected when they appear in the
+    same notes, weighted by how many they share.
+    
+    Returns the limit strongest edges of at least min_weight and the
+    contacts they join, each with its degree in the whole graph. Served
+    from the in-memory adjacency, see app/services/graph.py.
+    """
+    return await run_db(db, graph.get_graph_view, min_weight, limit)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.database.connection import get_db, run_db
+from app.schemas.job import Job
+from app.services import jobs
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=Job)
+async def read_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Status of a background job, e.g. the refinement queued by POST /notes/
+    (X-Job-Id header).
+    
+    A failed attempt sets last_error and requeues the job with backoff
+    until max_attempts; status is failed after that.
+    """
+    return await run_db(db, jobs.get_job, job_id)
@@ -1,149 +1,177 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Optional, Union
 
-from app.database.connection import get_db
-from app.models.note import Note
-from app.models.contact import Contact
-from app.schemas.note import Note as NoteSchema, NoteCreate, NoteUpdate, NoteWithContacts
+from app.api.fields import (
+    FIELDS_QUERY, embed_field, fields_tag, parse_fields, partial_adapter, partial_list_adapter, sparse_model,
+)
+from app.crud import note as crud
+from app.database.connection import get_db, run_db
+from app.schemas.note import NoteAdapter, NoteCreate, NoteListAdapter, NoteSearchResult, NoteUpdate, NoteWithContacts
+from app.services import change_feed, note_search
+from app.services.cache import cached_response, collection_key, entity_key
 
 router = APIRouter()
 
-@router.get("/", response_model=List[NoteSchema])
-def read_notes(
+# Responses with fields= have only some of the fields
+SparseNote = sparse_model(NoteWithContacts)
+
+@router.get("/", response_model=Union[List[NoteWithContacts], List[SparseNote]])
+async def read_notes(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    include_contacts: bool = False,
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db)
 ):
     """
-    Retrieve all notes.
+    Retrieve all notes, most recent interaction first.
+    
+    Each note carries its contact_ids; with include_contacts the contacts'
+    names are embedded as well. Pass the X-Next-Cursor header of a page as
+    cursor to get the next one.
+    
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    while the list is unchanged.
+    
+    fields=id,title,interaction_date returns (and reads) only those fields;
+    the wide content columns are not even selected unless asked for.
+    Asking for contacts embeds them as include_contacts does.
     """
-    notes = db.query(Note).offset(skip).limit(limit).all()
-    return notes
+    selected = parse_fields(fields, NoteWithContacts)
+    selected, include_contacts = embed_field(NoteWithContacts, selected, "contacts", include_contacts)
+    # Embedded contact names go stale when a contact changes
+    if include_contacts:
+        collections, entity_types = ("notes", "contacts"), ()
+    else:
+        collections, entity_types = ("notes",), ("note", "link")
+    key = collection_key(
+        *collections, skip=skip, limit=limit, cursor=cursor, include_contacts=include_contacts,
+        fields=selected and ",".join(selected)
+    )
+    adapter = NoteListAdapter if selected is None else partial_list_adapter(NoteWithContacts, selected)
+    return await cached_response(
+        key, request, response, adapter,
+        lambda: run_db(db, crud.get_notes, response, skip, limit, cursor, include_contacts, selected),
+        fields_tag("notes", selected), lambda: run_db(db, change_feed.collection_version, *entity_types)
+    )
 
-@router.post("/", response_model=NoteSchema)
-def create_note(note: NoteCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=NoteWithContacts)
+async def create_note(note: NoteCreate, response: Response, db: Session = Depends(get_db)):
     """
     Create a new note and associate it with contacts.
     This will also update the last_contacted timestamp for all associated contacts.
-    """
-    # Set interaction_date to now if not provided
-    if not note.interaction_date:
-        note.interaction_date = datetime.utcnow()
-    
-    # Create the note
-    db_note = Note(
-        title=note.title,
-        content=note.content,
-        interaction_type=note.interaction_type,
-        interaction_date=note.interaction_date,
-        is_group=note.is_group or len(note.contact_ids) > 1
-    )
-    db.add(db_note)
-    db.flush()  # Flush to get the note ID
     
-    # Associate contacts with the note
-    contacts = db.query(Contact).filter(Contact.id.in_(note.contact_ids)).all()
-    if not contacts:
-        db.rollback()
-        raise HTTPException(status_code=404, detail="No valid contacts found")
+    refined_content is filled in by a background job; its id is in the
+    X-Job-Id header, see GET /jobs/{id}.
+    """
+    return await run_db(db, crud.create_note, note, response)
+
+# Largest number of notes accepted by POST /notes/batch
+MAX_BATCH_NOTES = 1000
+
+@router.post("/batch", response_model=List[NoteWithContacts])
+async def create_notes(response: Response, notes: List[NoteCreate] = Body(...), db: Session = Depends(get_db)):
+    """
+    Create many notes at once, e.g. a day of calendar events.
     
-    # Update each contact's last_contacted time and add the note
-    for contact in contacts:
-        contact.last_contacted = note.interaction_date
-        db_note.contacts.append(contact)
+    Each note is created as by POST /notes/, but the whole batch is inserted
+    with a few set-based statements in a single transaction: either all
+    notes are created or none is.
+    """
+    if len(notes) > MAX_BATCH_NOTES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_NOTES} notes per batch")
+    if not notes:
+        return []
+    return await run_db(db, crud.create_notes, notes, response)
+
+@router.get("/search", response_model=List[NoteSearchResult])
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    include_contacts: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over note titles and content, best match first.
     
-    db.commit()
-    db.refresh(db_note)
-    return db_note
+    Words are matched regardless of case, accents and common endings
+    ("moving" finds "moved"); results are ranked with BM25.
+    """
+    return await run_db(db, note_search.search_notes, q, limit, include_contacts)
 
-@router.get("/{note_id}", response_model=NoteWithContacts)
-def read_note(note_id: int, db: Session = Depends(get_db)):
+@router.get("/{note_id}", response_model=Union[NoteWithContacts, SparseNote])
+async def read_note(
+    note_id: int, 
+    request: Request,
+    response: Response,
+    include_contacts: bool = False, 
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_db)
+):
     """
     Get a specific note by ID.
-    """
-    note = db.query(Note).filter(Note.id == note_id).first()
-    if note is None:
-        raise HTTPException(status_code=404, detail="Note not found")
     
-    # Create the response with contact_ids included
-    response = NoteWithContacts.from_orm(note)
-    response.contact_ids = [contact.id for contact in note.contacts]
-    return response
+    Supports conditional requests with If-None-Match / If-Modified-Since,
+    and sparse fieldsets with fields= as GET /notes/.
+    """
+    selected = parse_fields(fields, NoteWithContacts)
+    selected, include_contacts = embed_field(NoteWithContacts, selected, "contacts", include_contacts)
+    adapter = NoteAdapter if selected is None else partial_adapter(NoteWithContacts, selected)
+    load = lambda: run_db(db, crud.read_note, note_id, include_contacts, selected)
+    if include_contacts:
+        # The embedded contact names change with the contacts, so this
+        # version depends on all data
+        key = collection_key("notes", "contacts", note_id=note_id, fields=selected and ",".join(selected))
+        version = lambda: run_db(db, change_feed.collection_version)
+        return await cached_response(
+            key, request, response, adapter, load, fields_tag(f"note-{note_id}-contacts", selected), version
+        )
+    guard = None
+    if selected is None:
+        key, guard = entity_key("note", note_id), "notes"
+    else:
+        # Expires with the notes' generation, see read_contact
+        key = collection_key("notes", note_id=note_id, fields=",".join(selected))
+    return await cached_response(
+        key, request, response, adapter, load,
+        fields_tag(f"note-{note_id}", selected), lambda: run_db(db, change_feed.note_version, note_id), guard
+    )
 
-@router.put("/{note_id}", response_model=NoteSchema)
-def update_note(note_id: int, note: NoteUpdate, db: Session = Depends(get_db)):
+@router.put("/{note_id}", response_model=NoteWithContacts)
+async def update_note(note_id: int, note: NoteUpdate, response: Response, db: Session = Depends(get_db)):
     """
     Update a note.
-    """
-    db_note = db.query(Note).filter(Note.id == note_id).first()
-    if db_note is None:
-        raise HTTPException(status_code=404, detail="Note not found")
     
-    # Update note fields
-    update_data = note.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_note, key, value)
-    
-    db.commit()
-    db.refresh(db_note)
-    return db_note
+    A new content is refined again in the background (X-Job-Id header).
+    """
+    return await run_db(db, crud.update_note, note_id, note, response)
 
 @router.delete("/{note_id}")
-def delete_note(note_id: int, db: Session = Depends(get_db)):
+async def delete_note(note_id: int, db: Session = Depends(get_db)):
     """
     Delete a note.
     """
-    note = db.query(Note).filter(Note.id == note_id).first()
-    if note is None:
-        raise HTTPException(status_code=404, detail="Note not found")
-    
-    db.delete(note)
-    db.commit()
+    await run_db(db, crud.delete_note, note_id)
     return {"message": "Note deleted successfully"}
 
 @router.post("/{note_id}/contacts/{contact_id}")
-def add_contact_to_note(note_id: int, contact_id: int, db: Session = Depends(get_db)):
+async def add_contact_to_note(note_id: int, contact_id: int, db: Session = Depends(get_db)):
     """
     Associate a contact with a note.
     """
-    note = db.query(Note).filter(Note.id == note_id).first()
-    if note is None:
-        raise HTTPException(status_code=404, detail="Note not found")
-    
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
-    if contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    
-    if contact in note.contacts:
+    if not await run_db(db, crud.add_contact_to_note, note_id, contact_id):
         return {"message": "Contact already associated with this note"}
-    
-    note.contacts.append(contact)
-    
-    # Update contact's last_contacted time if note's interaction_date is more recent
-    if contact.last_contacted is None or note.interaction_date > contact.last_contacted:
-        contact.last_contacted = note.interaction_date
-    
-    db.commit()
     return {"message": "Contact added to note successfully"}
 
 @router.delete("/{note_id}/contacts/{contact_id}")
-def remove_contact_from_note(note_id: int, contact_id: int, db: Session = Depends(get_db)):
+async def remove_contact_from_note(note_id: int, contact_id: int, db: Session = Depends(get_db)):
     """
     Remove a contact's association with a note.
     """
-    note = db.query(Note).filter(Note.id == note_id).first()
-    if note is None:
-        raise HTTPException(status_code=404, detail="Note not found")
-    
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
-    if contact is None:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    
-    if contact not in note.contacts:
+    if not await run_db(db, crud.remove_contact_from_note, note_id, contact_id):
         return {"message": "Contact is not associated with this note"}
-    
-    note.contacts.remove(contact)
-    db.commit()
-    return {"message": "Contact removed from note successfully"}
\ No newline at end of file
+    return {"message": "Contact removed from note successfully"}
@@ -0,0 +1,44 @@
+from datetime import date
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+
+from app.database.connection import get_db, run_db
+from app.schemas.stats import ContactActivity, Period, Timeline
+from app.services import rollups
+
+router = APIRouter()
+
+@router.get("/timeline", response_model=Timeline)
+async def read_timeline(
+    period: Period = "week",
+    group_by: Optional[Literal["interaction_type", "city"]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    interaction_type: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Interactions per day, week or month, between since and until (inclusive).
+    
+    Notes are counted, optionally split by interaction_type. Split by city,
+    interactions with contacts are counted instead: a group note counts
+    once for each of its contacts. Periods without interactions are left
+    out.
+    
+    Reads daily rollups, see app/services/rollups.py.
+    """
+    return await run_db(db, rollups.get_timeline, period, group_by, since, until, interaction_type)
+
+@router.get("/contacts/{contact_id}", response_model=ContactActivity)
+async def read_contact_activity(
+    contact_id: int,
+    period: Period = "month",
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    A contact's interactions: totals per interaction type and a timeline.
+    """
+    return await run_db(db, rollups.get_contact_activity, contact_id, period, since, until)
@@ -0,0 +1,113 @@
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, create_model
+
+# Sparse fieldsets: GET /contacts/?fields=id,first_name,last_name returns
+# only those fields. The columns that are not asked for are neither selected
+# nor validated and encoded, which matters for wide text columns such as
+# how_we_met or a note's content. id is always returned.
+#
+# The query selects just those columns and returns rows, not ORM objects
+# (load_only still builds objects and costs more than loading them whole),
+# and responses go through a model with just the requested fields, created
+# on first use of a combination and cached like the schema adapters.
+
+Fields = Tuple[str, ...]
+
+# The query parameter of the endpoints that support it
+FIELDS_QUERY = Query(
+    None,
+    description="Comma-separated fields to return, e.g. id,first_name,last_name; all fields when omitted",
+)
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[Fields]:
+    """
+    The fields of schema named in the fields parameter, in the schema's
+    order and with id, or None for all of them. Unknown names are a 400.
+    """
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(names - set(schema.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    names.add("id")
+    return tuple(name for name in schema.model_fields if name in names)
+
+
+def embed_field(
+    schema: Type[BaseModel], selected: Optional[Fields], name: str, embed: bool
+) -> Tuple[Optional[Fields], bool]:
+    """
+    Reconcile selected with the flag embedding field name of schema, e.g.
+    include_contacts: asking for the field turns the flag on and the flag
+    adds the field, so neither is ignored.
+    """
+    if selected is None:
+        return None, embed
+    if name in selected:
+        return selected, True
+    if embed:
+        return tuple(field for field in schema.model_fields if field in selected or field == name), True
+    return selected, False
+
+
+@lru_cache(maxsize=256)
+def partial_model(schema: Type[BaseModel], fields: Fields) -> Type[BaseModel]:
+    """
+    A model with only fields of schema, validated from attributes too.
+    """
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+    )
+
+
+@lru_cache(maxsize=None)
+def sparse_model(schema: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    schema with every field but id optional: what a response with fields=
+    looks like, for the endpoints' response_model and the OpenAPI schema.
+    """
+    return create_model(
+        f"Sparse{schema.__name__}",
+        __doc__=f"{schema.__name__} with only the fields asked for with fields=, and id.",
+        **{
+            name: (field.annotation, field) if name == "id" else (
+                Optional[field.annotation], Field(None, description=field.description)
+            )
+            for name, field in schema.model_fields.items()
+        },
+    )
+
+
+@lru_cache(maxsize=256)
+def partial_adapter(schema: Type[BaseModel], fields: Fields) -> TypeAdapter:
+    return TypeAdapter(partial_model(schema, fields))
+
+
+@lru_cache(maxsize=256)
+def partial_list_adapter(schema: Type[BaseModel], fields: Fields) -> TypeAdapter:
+    return TypeAdapter(List[partial_model(schema, fields)])
+
+
+def projection(model, fields: Fields, *required) -> list:
+    """
+    The columns of model among fields, plus the required ones (e.g. the
+    sort column of a paginated query), for db.query(*columns).
+    """
+    columns = model.__table__.columns
+    names = dict.fromkeys(name for name in (*fields, *required) if name in columns)
+    return [getattr(model, name) for name in names]
+
+
+def fields_tag(tag: str, fields: Optional[Iterable[str]]) -> str:
+    """
+    The ETag tag of a resource for a fieldset; a response with other fields
+    is another representation.
+    """
+    return tag if fields is None else f"{tag}~{'+'.join(fields)}"
@@ -0,0 +1,92 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: Optional[datetime], row_id: int) -> str:
+    """
+    Encode the position of the last row of a page as an opaque cursor.
+    """
+    payload = [sort_value.isoformat() if sort_value is not None else None, row_id]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        if not isinstance(row_id, int):
+            raise ValueError("cursor id must be an integer")
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, row_id
+
+
+def paginate(
+    query: Query,
+    sort_column: Any,
+    id_column: Any,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    response: Optional[Response] = None,
+) -> List[Any]:
+    """
+    Return one page of query ordered by (sort_column DESC, id DESC).
+
+    With a cursor the page starts right after the cursor's row (keyset
+    pagination), which uses the (sort_column, id) index instead of an
+    OFFSET scan and is not affected by rows inserted in earlier pages.
+    Without a cursor, skip is applied as a plain OFFSET for backward
+    compatibility. NULL sort values of a nullable sort_column come last.
+
+    When there are more rows, the cursor for the next page is set in the
+    X-Next-Cursor header of response.
+    """
+    nullable = sort_column.expression.nullable
+    if cursor is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="Use either skip or cursor, not both")
+
+        sort_value, row_id = decode_cursor(cursor)
+        if sort_value is None and nullable:
+            # Already in the NULL tail, only lower ids with NULL remain
+            query = query.filter(and_(sort_column.is_(None), id_column < row_id))
+        else:
+            after = [sort_column < sort_value, and_(sort_column == sort_value, id_column < row_id)]
+            if nullable:
+                after.append(sort_column.is_(None))
+            query = query.filter(or_(*after))
+
+    # NULLS LAST only where NULLs can occur: on a NOT NULL column it would
+    # keep PostgreSQL from using the plain (sort_column, id) index
+    order = sort_column.desc().nulls_last() if nullable else sort_column.desc()
+    query = query.order_by(order, id_column.desc())
+    if skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+
+    if response is not None and len(rows) > limit and items:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return items
@@ -0,0 +1,222 @@
+import cProfile
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+from app.services.metrics import request_metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-request profiling, see README "Configuration":
+#
+#   PROFILING=off     nothing is recorded (default)
+#   PROFILING=on      wall time, DB time, statements and rows per request, as
+#                     a Server-Timing header and in GET /metrics
+#   PROFILING=debug   also flags N+1 query patterns and keeps a cProfile of
+#                     every request slower than PROFILE_SLOW_MS
+#
+# SQL is measured with cursor events on every Engine, so it covers the sync
+# engine, the async engine's sync core and the test engines alike. The
+# request's RequestProfile travels in a context variable, which Starlette's
+# threadpool and SQLAlchemy's greenlets both carry over.
+
+PROFILING_MODE = os.getenv("PROFILING", "off").strip().lower()
+if PROFILING_MODE not in ("off", "on", "debug"):
+    raise ValueError(f"PROFILING must be 'off', 'on' or 'debug', not {PROFILING_MODE!r}")
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS") or 500)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Identical SELECTs per request from which a request is flagged as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD") or 10)
+
+N_PLUS_ONE_HEADER = "X-N-Plus-One"
+
+
+class RequestProfile:
+    """
+    What one request spent in the database.
+    """
+
+    def __init__(self, track_statements=False):
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.rows = 0
+        # SELECT text -> executions, only kept for N+1 detection
+        self.statement_counts: Optional[Counter] = Counter() if track_statements else None
+        # cProfile.Profile of the request and of its threadpool calls
+        self.profilers: List[cProfile.Profile] = []
+
+    def repeated_select(self):
+        """
+        (statement, count) of the most repeated SELECT if it reaches
+        N_PLUS_ONE_THRESHOLD, else None.
+        """
+        if not self.statement_counts:
+            return None
+        statement, count = self.statement_counts.most_common(1)[0]
+        return (statement, count) if count >= N_PLUS_ONE_THRESHOLD else None
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is None or not starts:
+        return
+    profile.db_seconds += time.perf_counter() - starts.pop()
+    profile.statements += 1
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        if cursor.rowcount > 0:
+            profile.rows += cursor.rowcount
+    elif profile.statement_counts is not None:
+        profile.statement_counts[statement] += 1
+
+
+@event.listens_for(Mapper, "load")
+def _instance_loaded(target, context):
+    # Rows of SELECTs are counted as the ORM objects built from them
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.rows += 1
+
+
+# cProfile supports one active profiler per thread, and requests share the
+# event loop thread, so only one request at a time is profiled. Its profile
+# also contains whatever else ran on the loop meanwhile; profile slow
+# requests under light load.
+_profiling_lock = threading.Lock()
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Wrap fn so it is profiled when it runs for a profiled request.
+
+    Used by run_db for the part of a request that runs in the threadpool,
+    which the request's own profiler (on the event loop thread) misses.
+    """
+    profile = _current_profile.get()
+    if profile is None or not profile.profilers:
+        return fn
+
+    def run(*args, **kwargs):
+        profiler = cProfile.Profile()
+        profile.profilers.append(profiler)
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+    return run
+
+
+def server_timing(wall_seconds: float, profile: RequestProfile) -> str:
+    return (
+        f"app;dur={wall_seconds * 1000:.1f}, "
+        f'db;dur={profile.db_seconds * 1000:.1f};desc="{profile.statements} queries", '
+        f'db-rows;desc="{profile.rows}"'
+    )
+
+
+def _route_label(scope) -> str:
+    # The route template, not the raw path, keeps label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _dump_profile(profile: RequestProfile, method: str, route: str, wall_seconds: float) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(PROFILE_DIR, f"{stamp}-{method}-{name}-{wall_seconds * 1000:.0f}ms.prof")
+    pstats.Stats(*profile.profilers).dump_stats(path)
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware recording per-request timings, see PROFILING_MODE.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = PROFILING_MODE
+        if scope["type"] != "http" or mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        debug = mode == "debug"
+        profile = RequestProfile(track_statements=debug)
+        token = _current_profile.set(profile)
+        profiler = None
+        if debug and _profiling_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profile.profilers.append(profiler)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(time.perf_counter() - start, profile).encode()))
+                repeated = profile.repeated_select()
+                if repeated is not None:
+                    headers.append((N_PLUS_ONE_HEADER.lower().encode(), str(repeated[1]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profiling_lock.release()
+            _current_profile.reset(token)
+            wall_seconds = time.perf_counter() - start
+            self._record(scope, profile, status_code, wall_seconds, profiler is not None)
+
+    def _record(self, scope, profile, status_code, wall_seconds, profiled):
+        method, route = scope["method"], _route_label(scope)
+        request_metrics.observe(
+            method, route, status_code, wall_seconds, profile.db_seconds, profile.statements, profile.rows
+        )
+        repeated = profile.repeated_select()
+        if repeated is not None:
+            request_metrics.record_n_plus_one(method, route)
+            logger.warning(
+                "Possible N+1 in %s %s: statement ran %d times: %s",
+                method, route, repeated[1], " ".join(repeated[0].split())[:200],
+            )
+        if profiled and wall_seconds * 1000 >= PROFILE_SLOW_MS:
+            path = _dump_profile(profile, method, route, wall_seconds)
+            request_metrics.record_slow_profile()
+            logger.warning("Slow request %s %s took %.0f ms, profile written to %s",
+                           method, route, wall_seconds * 1000, path)
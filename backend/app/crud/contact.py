@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from app.api.fields import Fields, projection
+from app.api.pagination import paginate
+from app.models.contact import Contact
+from app.models.note import Note
+from app.models.contact_note import contact_notes
+from app.schemas.contact import ContactCreate, ContactUpdate
+from app.schemas.note import NoteWithContacts
+from app.services.events import emit
+from app.services.note_contacts import with_contacts
+from app.services.search import get_search_backend
+
+# Database work behind the contact endpoints. Functions take the sync Session
+# first so they can run through app.database.connection.run_db in both the
+# sync and the async database mode.
+
+def get_contacts(
+    db: Session,
+    response: Response,
+    search: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[Fields] = None,
+) -> List[Contact]:
+    # A sparse fieldset selects rows of its columns only; last_contacted is
+    # the sort key of the cursor
+    query = db.query(Contact) if fields is None else db.query(*projection(Contact, fields, "last_contacted"))
+    
+    # Apply search if provided
+    if search and search.strip():
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported with search")
+        query = get_search_backend(db).apply(query, search)
+        return query.offset(skip).limit(limit).all()
+    
+    return paginate(query, Contact.last_contacted, Contact.id, cursor, skip, limit, response)
+
+def get_contact(db: Session, contact_id: int, fields: Optional[Fields] = None) -> Contact:
+    query = db.query(Contact) if fields is None else db.query(*projection(Contact, fields))
+    contact = query.filter(Contact.id == contact_id).first()
+    if contact is None:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return contact
+
+def create_contact(db: Session, contact: ContactCreate) -> Contact:
+    db_contact = Contact(**contact.model_dump())
+    db.add(db_contact)
+    db.flush()
+    emit(db, "contact.created", contact_ids=[db_contact.id])
+    db.commit()
+    db.refresh(db_contact)
+    return db_contact
+
+def update_contact(db: Session, contact_id: int, contact: ContactUpdate) -> Contact:
+    db_contact = get_contact(db, contact_id)
+    
+    for key, value in contact.model_dump(exclude_unset=True).items():
+        setattr(db_contact, key, value)
+    db.flush()
+    emit(db, "contact.updated", contact_ids=[contact_id])
+    
+    db.commit()
+    db.refresh(db_contact)
+    return db_contact
+
+def delete_contact(db: Session, contact_id: int) -> None:
+    contact = get_contact(db, contact_id)
+    note_ids = [
+        note_id for (note_id,) in
+        db.query(contact_notes.c.note_id).filter(contact_notes.c.contact_id == contact_id)
+    ]
+    db.delete(contact)
+    db.flush()
+    emit(db, "link.removed", links=[(contact_id, note_id) for note_id in note_ids])
+    emit(db, "contact.deleted", contact_ids=[contact_id])
+    db.commit()
+
+# Fields a merge target takes from its sources when it has no value itself
+MERGED_FIELDS = ("nickname", "city", "how_we_met", "linkedin_url")
+
+def merge_contacts(db: Session, target_id: int, source_ids: List[int]) -> Contact:
+    """
+    Merge source_ids into target_id, then delete them.
+    
+    The target keeps its own values and takes the sources' for empty
+    fields, and the newest last_contacted. Their notes are moved to the
+    target with one UPDATE of contact_notes: per note, the link of one
+    source is re-pointed unless the target is already linked; the links
+    left over are deleted with the sources.
+    """
+    source_ids = list(dict.fromkeys(source_ids))
+    if target_id in source_ids:
+        raise HTTPException(status_code=400, detail="Cannot merge a contact into itself")
+    contacts = {c.id: c for c in db.query(Contact).filter(Contact.id.in_([target_id] + source_ids))}
+    if len(contacts) != len(source_ids) + 1:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    target = contacts[target_id]
+    for source_id in source_ids:
+        source = contacts[source_id]
+        for field in MERGED_FIELDS:
+            if getattr(target, field) is None:
+                setattr(target, field, getattr(source, field))
+        if source.last_contacted is not None and (
+            target.last_contacted is None or source.last_contacted > target.last_contacted
+        ):
+            target.last_contacted = source.last_contacted
+    db.flush()
+    
+    source_links = db.execute(
+        select(contact_notes.c.contact_id, contact_notes.c.note_id)
+        .where(contact_notes.c.contact_id.in_(source_ids))
+    ).all()
+    other = contact_notes.alias("other")
+    moved_note_ids = db.execute(
+        update(contact_notes)
+        .where(
+            contact_notes.c.contact_id.in_(source_ids),
+            contact_notes.c.contact_id == (
+                select(func.min(other.c.contact_id))
+                .where(other.c.note_id == contact_notes.c.note_id, other.c.contact_id.in_(source_ids))
+                .scalar_subquery()
+            ),
+            ~exists().where(other.c.note_id == contact_notes.c.note_id, other.c.contact_id == target_id),
+        )
+        .values(contact_id=target_id)
+        .returning(contact_notes.c.note_id)
+    ).scalars().all()
+    db.execute(delete(contact_notes).where(contact_notes.c.contact_id.in_(source_ids)))
+    db.execute(delete(Contact).where(Contact.id.in_(source_ids)))
+    
+    emit(db, "link.removed", links=[(contact_id, note_id) for contact_id, note_id in source_links])
+    emit(db, "link.added", links=[(target_id, note_id) for note_id in sorted(moved_note_ids)])
+    emit(db, "contact.deleted", contact_ids=source_ids)
+    emit(db, "contact.updated", contact_ids=[target_id])
+    db.commit()
+    db.refresh(target)
+    return target
+
+def get_contact_notes(
+    db: Session,
+    response: Response,
+    contact_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_contacts: bool = False,
+    fields: Optional[Fields] = None,
+) -> List[NoteWithContacts]:
+    if db.query(Contact.id).filter(Contact.id == contact_id).first() is None:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    query = db.query(Note) if fields is None else db.query(*projection(Note, fields, "interaction_date"))
+    query = (
+        query
+        .join(contact_notes, contact_notes.c.note_id == Note.id)
+        .filter(contact_notes.c.contact_id == contact_id)
+    )
+    if start_date is not None:
+        query = query.filter(Note.interaction_date >= start_date)
+    if end_date is not None:
+        query = query.filter(Note.interaction_date <= end_date)
+    
+    notes = paginate(query, Note.interaction_date, Note.id, cursor, skip, limit, response)
+    return with_contacts(db, notes, include_contacts, fields)
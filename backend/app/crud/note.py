@@ -0,0 +1,223 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.api.fields import Fields, projection
+from app.api.pagination import paginate
+from app.crud.contact import get_contact
+from app.models.note import Note
+from app.models.contact import Contact
+from app.models.contact_note import contact_notes
+from app.schemas.note import NoteCreate, NoteUpdate, NoteWithContacts
+from app.services.events import emit
+from app.services.jobs import JOB_ID_HEADER
+from app.services.note_contacts import load_contact_ids, with_contacts
+from app.services.refinement import enqueue_refinement
+
+# Database work behind the note endpoints, see app/crud/contact.py
+
+def get_notes(
+    db: Session,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_contacts: bool = False,
+    fields: Optional[Fields] = None,
+) -> List[NoteWithContacts]:
+    # As for contacts, interaction_date is the sort key of the cursor
+    query = db.query(Note) if fields is None else db.query(*projection(Note, fields, "interaction_date"))
+    notes = paginate(query, Note.interaction_date, Note.id, cursor, skip, limit, response)
+    return with_contacts(db, notes, include_contacts, fields)
+
+def get_note(db: Session, note_id: int, fields: Optional[Fields] = None) -> Note:
+    query = db.query(Note) if fields is None else db.query(*projection(Note, fields))
+    note = query.filter(Note.id == note_id).first()
+    if note is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return note
+
+def read_note(
+    db: Session, note_id: int, include_contacts: bool = False, fields: Optional[Fields] = None
+) -> NoteWithContacts:
+    note = get_note(db, note_id, fields)
+    # Create the response with contact_ids included
+    return with_contacts(db, [note], include_contacts, fields)[0]
+
+def create_note(db: Session, note: NoteCreate, response: Optional[Response] = None) -> NoteWithContacts:
+    return create_notes(db, [note], response)[0]
+
+def create_notes(
+    db: Session, notes: List[NoteCreate], response: Optional[Response] = None
+) -> List[NoteWithContacts]:
+    """
+    Create notes with their contact links in one transaction.
+    
+    Notes and contact_notes rows are inserted with one executemany each, and
+    last_contacted is moved forward for all linked contacts with a single
+    UPDATE. Contact ids that don't exist are ignored, but every note needs at
+    least one valid contact or nothing is created.
+    
+    Refinement of the notes is queued as one background job, whose id is
+    sent in the X-Job-Id header.
+    """
+    now = datetime.utcnow()
+    requested_ids = {contact_id for note in notes for contact_id in note.contact_ids}
+    valid_ids = set(db.scalars(select(Contact.id).where(Contact.id.in_(requested_ids))))
+    
+    note_rows = []
+    contact_ids_per_note = []
+    for index, note in enumerate(notes):
+        # Keep the requested order, drop unknown and repeated ids
+        contact_ids = [contact_id for contact_id in dict.fromkeys(note.contact_ids) if contact_id in valid_ids]
+        if not contact_ids:
+            detail = "No valid contacts found" if len(notes) == 1 else f"No valid contacts found for note {index}"
+            raise HTTPException(status_code=404, detail=detail)
+        contact_ids_per_note.append(contact_ids)
+        note_rows.append({
+            "title": note.title,
+            "content": note.content,
+            "interaction_type": note.interaction_type,
+            # Set interaction_date to now if not provided
+            "interaction_date": note.interaction_date or now,
+            "is_group": note.is_group or len(note.contact_ids) > 1,
+        })
+    
+    # RETURNING ids have to line up with note_rows. PostgreSQL returns them
+    # in no particular order and concurrent inserts interleave sequence
+    # values, so sort_by_parameter_order maps them back (still in batched
+    # statements). SQLite, one writer at a time, assigns rowids in VALUES
+    # order, so sorting them is enough there; sort_by_parameter_order would
+    # make it insert row by row.
+    if db.get_bind().dialect.name == "sqlite":
+        note_ids = sorted(db.execute(insert(Note).returning(Note.id), note_rows).scalars().all())
+    else:
+        note_ids = db.execute(
+            insert(Note).returning(Note.id, sort_by_parameter_order=True), note_rows
+        ).scalars().all()
+    links = [
+        (contact_id, note_id)
+        for note_id, contact_ids in zip(note_ids, contact_ids_per_note)
+        for contact_id in contact_ids
+    ]
+    db.execute(insert(contact_notes), [{"contact_id": c, "note_id": n} for c, n in links])
+    contacted_ids = update_last_contacted(db, note_ids, {contact_id for contact_id, _ in links})
+    
+    emit(db, "note.created", note_ids=note_ids)
+    emit(db, "link.added", links=links)
+    if contacted_ids:
+        emit(db, "contact.updated", contact_ids=contacted_ids)
+    _queue_refinement(db, note_ids, response)
+    
+    db.commit()
+    created = db.query(Note).filter(Note.id.in_(note_ids)).order_by(Note.id).all()
+    return with_contacts(db, created)
+
+def update_last_contacted(db: Session, note_ids: List[int], contact_ids: Iterable[int]) -> List[int]:
+    """
+    Move last_contacted forward to the newest of note_ids' interaction dates.
+    
+    One set-based UPDATE equivalent to
+    last_contacted = GREATEST(last_contacted, max(interaction_date)), that
+    only touches contacts whose value actually changes. Returns their ids.
+    """
+    contact_ids = list(contact_ids)
+    if not contact_ids or not note_ids:
+        return []
+    
+    newest = (
+        select(func.max(Note.interaction_date))
+        .join(contact_notes, contact_notes.c.note_id == Note.id)
+        .where(contact_notes.c.contact_id == Contact.id, Note.id.in_(note_ids))
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(Contact)
+        .where(
+            Contact.id.in_(contact_ids),
+            or_(Contact.last_contacted.is_(None), Contact.last_contacted < newest),
+        )
+        .values(last_contacted=newest)
+        .returning(Contact.id),
+        execution_options={"synchronize_session": "fetch"},
+    )
+    return result.scalars().all()
+
+def _queue_refinement(db: Session, note_ids: List[int], response: Optional[Response]) -> None:
+    job = enqueue_refinement(db, note_ids)
+    if job is not None and response is not None:
+        response.headers[JOB_ID_HEADER] = str(job.id)
+
+def update_note(
+    db: Session, note_id: int, note: NoteUpdate, response: Optional[Response] = None
+) -> NoteWithContacts:
+    db_note = get_note(db, note_id)
+    
+    # Update note fields
+    update_data = note.model_dump(exclude_unset=True)
+    if any(
+        key in update_data and update_data[key] != getattr(db_note, key)
+        for key in ("interaction_date", "interaction_type")
+    ):
+        emit(db, "note.changing", note_ids=[note_id])
+    for key, value in update_data.items():
+        setattr(db_note, key, value)
+    db.flush()
+    emit(db, "note.updated", note_ids=[note_id])
+    if "content" in update_data:
+        _queue_refinement(db, [note_id], response)
+    
+    db.commit()
+    db.refresh(db_note)
+    return with_contacts(db, [db_note])[0]
+
+def delete_note(db: Session, note_id: int) -> None:
+    note = get_note(db, note_id)
+    contact_ids = load_contact_ids(db, [note_id]).get(note_id, [])
+    emit(db, "note.changing", note_ids=[note_id])
+    db.delete(note)
+    db.flush()
+    emit(db, "link.removed", links=[(contact_id, note_id) for contact_id in contact_ids])
+    emit(db, "note.deleted", note_ids=[note_id])
+    db.commit()
+
+def add_contact_to_note(db: Session, note_id: int, contact_id: int) -> bool:
+    """
+    Link a contact to a note. Returns False if it was already linked.
+    """
+    note = get_note(db, note_id)
+    contact = get_contact(db, contact_id)
+    
+    if contact in note.contacts:
+        return False
+    
+    note.contacts.append(contact)
+    db.flush()
+    
+    # Update contact's last_contacted time if note's interaction_date is more recent
+    contacted_ids = update_last_contacted(db, [note_id], [contact_id])
+    
+    emit(db, "link.added", links=[(contact_id, note_id)])
+    if contacted_ids:
+        emit(db, "contact.updated", contact_ids=contacted_ids)
+    db.commit()
+    return True
+
+def remove_contact_from_note(db: Session, note_id: int, contact_id: int) -> bool:
+    """
+    Unlink a contact from a note. Returns False if it was not linked.
+    """
+    note = get_note(db, note_id)
+    contact = get_contact(db, contact_id)
+    
+    if contact not in note.contacts:
+        return False
+    
+    note.contacts.remove(contact)
+    db.flush()
+    emit(db, "link.removed", links=[(contact_id, note_id)])
+    db.commit()
+    return True
@@ -1,8 +1,19 @@
 import os
 from dotenv import load_dotenv
+from fastapi import Request, Response
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.api.profiling import profiled
+from app.database.pool import pool_options
+from app.database.replicas import (
+    DATABASE_REPLICA_URLS, READ_REPLICA_KEY, Replica, ReplicaSet, RoutingSession, reads_from_replica,
+)
+from app.database.sqlite import configure_engine
 
 # Load .env file
 load_dotenv()
@@ -10,19 +21,126 @@ load_dotenv()
 # Get database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# "sync" runs handlers' database work in the threadpool with a blocking
+# Session; "async" uses an AsyncEngine (asyncpg / aiosqlite) on the event loop
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+
+# Async driver used for each sync driver's database when DATABASE_MODE=async
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url):
+    """
+    Swap the driver of a database URL for its asyncio counterpart.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+# Create SQLAlchemy engine (always available for migrations, scripts and
+# background work, whatever the request mode)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+# WAL and pragmas for SQLite files (SQLITE_TUNING), see app/database/sqlite.py
+configure_engine(engine)
+
+def _replica(url):
+    replica_engine = create_engine(url, **pool_options(url))
+    if DATABASE_MODE != "async":
+        return Replica(replica_engine)
+    async_url = to_async_url(url)
+    return Replica(replica_engine, create_async_engine(async_url, **pool_options(async_url, is_async=True)).sync_engine)
+
+# Read replicas (DATABASE_REPLICA_URLS), see app/database/replicas.py
+replica_set = ReplicaSet([_replica(url) for url in DATABASE_REPLICA_URLS]) if DATABASE_REPLICA_URLS else None
+
+# Create session factory; reads of GET requests may go to a replica
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, replica_set=replica_set
+)
+
+# Async engine and session factory, only created in async mode
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_MODE == "async":
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, is_async=True))
+    configure_engine(async_engine.sync_engine)
+    # Objects stay loaded after commit so responses can be serialized
+    # without lazy loads outside the session's greenlet
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autocommit=False, autoflush=False, expire_on_commit=False,
+        sync_session_class=RoutingSession, replica_set=replica_set,
+    )
+elif DATABASE_MODE != "sync":
+    raise ValueError(f"DATABASE_MODE must be 'sync' or 'async', not {DATABASE_MODE!r}")
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def request_engine():
+    """
+    The (sync) engine that request sessions use, for pool monitoring.
+    """
+    return async_engine.sync_engine if async_engine is not None else engine
 
 # Create base class for models
 Base = declarative_base()
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
+async def get_db(request: Request, response: Response):
+    info = {READ_REPLICA_KEY: replica_set is not None and reads_from_replica(request, response)}
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal(info=info) as db:
+            yield db
+        return
+
+    db = SessionLocal(info=info)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await close_db(db)
+
+async def close_db(db):
+    """
+    Close a session from get_db without blocking the event loop.
+    """
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
+
+async def stream_partitions(db, statement, batch_size=1000):
+    """
+    Execute statement and yield its rows in lists of up to batch_size.
+
+    Uses yield_per, i.e. a server-side cursor where the driver supports it,
+    so result sets larger than memory can be streamed. Sync sessions fetch
+    each batch in the threadpool.
+    """
+    statement = statement.execution_options(yield_per=batch_size)
+    if isinstance(db, AsyncSession):
+        result = await db.stream(statement)
+        async for partition in result.partitions():
+            yield partition
+        return
+
+    result = await run_in_threadpool(db.execute, statement)
+    partitions = result.partitions()
+    while True:
+        partition = await run_in_threadpool(next, partitions, None)
+        if partition is None:
+            break
+        yield partition
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run fn(session, *args, **kwargs) for an async handler.
+
+    Database code is written once against the sync Session API. With an
+    AsyncSession it runs through run_sync, so its I/O is awaited on the event
+    loop; with a plain Session it runs in the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(profiled(fn), db, *args, **kwargs)
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Pool settings, see README "Configuration"
+POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# Default per-transaction statement timeout in milliseconds (0 disables it)
+STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+
+
+class PoolWaitStats:
+    """
+    Time spent waiting for a connection to be checked out of a pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def as_dict(self):
+        with self._lock:
+            average = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "wait_ms_avg": round(average * 1000, 3),
+                "wait_ms_max": round(self.max_wait * 1000, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+class _TimedPoolMixin:
+    """
+    Records how long each checkout waits on the pool's queue, and keeps
+    the configured max_overflow for pool_status (QueuePool only has it in a
+    private attribute).
+    """
+
+    def __init__(self, *args, max_overflow=10, **kw):
+        self.max_overflow = max_overflow
+        super().__init__(*args, max_overflow=max_overflow, **kw)
+
+    @property
+    def wait_stats(self):
+        stats = self.__dict__.get("_wait_stats")
+        if stats is None:
+            stats = self.__dict__.setdefault("_wait_stats", PoolWaitStats())
+        return stats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = True
+        try:
+            connection = super()._do_get()
+            timed_out = False
+            return connection
+        finally:
+            self.wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def is_sqlite_file(url):
+    """
+    Whether url is a SQLite database in a file rather than in memory.
+    """
+    url = make_url(url)
+    return (
+        url.get_backend_name() == "sqlite"
+        and url.database not in (None, "", ":memory:")
+        and url.query.get("mode") != "memory"
+    )
+
+
+def pool_options(url, is_async=False):
+    """
+    Keyword arguments for create_engine()/create_async_engine() for url.
+
+    In-memory SQLite keeps SQLAlchemy's default pools (it cannot use a
+    queue pool); everything else, SQLite files included, gets a timed queue
+    pool sized from the environment.
+    """
+    if make_url(url).get_backend_name() == "sqlite" and not is_sqlite_file(url):
+        return {"pool_pre_ping": POOL_PRE_PING}
+
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def pool_status(engine):
+    """
+    Current state of an engine's pool for the health endpoint.
+    """
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # Negative while the pool has not yet opened pool_size connections
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        status["max_overflow"] = pool.max_overflow
+        status.update(pool.wait_stats.as_dict())
+    return status
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    """
+    Apply a statement timeout to every PostgreSQL transaction.
+
+    Defaults to DB_STATEMENT_TIMEOUT_MS; a request can override it by
+    setting db.info["statement_timeout_ms"] before its first query. SET LOCAL
+    scopes it to the transaction, so pooled connections are not affected.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    timeout = session.info.get("statement_timeout_ms", STATEMENT_TIMEOUT_MS)
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
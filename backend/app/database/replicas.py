@@ -0,0 +1,231 @@
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+# Read replicas (DATABASE_REPLICA_URLS).
+#
+# Requests that only read (GET, HEAD) get a session whose queries go to one
+# of the replicas; everything else, and every session once it writes, uses
+# the primary. A replica is only chosen while its last health check
+# succeeded and found it less than DB_REPLICA_MAX_LAG_SECONDS behind. A
+# thread checks them every DB_REPLICA_CHECK_SECONDS, and a replica whose
+# connection fails during a request is taken out at once; with no usable
+# replica, reads fall back to the primary.
+#
+# Replication lag would hide a client's own changes from its next reads, so
+# write requests set a cookie and the reads of that client stay on the
+# primary for DB_READ_YOUR_WRITES_SECONDS after its last write. Reads that
+# outlive the request, like the scans filling the in-memory indexes, go to
+# the primary too (read_primary), or a lagging replica would serve its
+# missing rows to every client until the next rebuild.
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS") or 5)
+REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS") or 5)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS") or REPLICA_MAX_LAG_SECONDS)
+
+# Methods whose requests only read
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# Time of the client's last write request
+WROTE_AT_COOKIE = "crm_wrote_at"
+# Session info key: reads may go to a replica
+READ_REPLICA_KEY = "read_replica"
+
+# Seconds of replay a PostgreSQL standby is behind; 0 once it has replayed
+# all it received, so an idle primary does not look like lag
+POSTGRES_LAG = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+def replication_lag(connection) -> float:
+    """
+    How far behind its primary the database of connection is, in seconds.
+    """
+    if connection.dialect.name == "postgresql":
+        return float(connection.exec_driver_sql(POSTGRES_LAG).scalar() or 0)
+    # Other databases are not replicated by the database itself
+    connection.exec_driver_sql("SELECT 1")
+    return 0.0
+
+
+class Replica:
+    """
+    One read replica: engine runs the health checks, request_engine (the
+    sync_engine of an AsyncEngine in async mode) the requests' reads.
+    """
+
+    def __init__(self, engine, request_engine=None):
+        self.engine = engine
+        self.request_engine = request_engine if request_engine is not None else engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def usable(self, max_lag_seconds: float) -> bool:
+        return self.healthy and self.lag_seconds is not None and self.lag_seconds <= max_lag_seconds
+
+    def status(self) -> Dict:
+        return {
+            "url": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": None if self.lag_seconds is None else round(self.lag_seconds, 3),
+            "error": self.error,
+            "checked_ago_seconds": (
+                None if self.checked_at is None else round(time.monotonic() - self.checked_at, 1)
+            ),
+        }
+
+
+class ReplicaSet:
+    """
+    Replicas used in turn, with a thread checking their health and lag.
+    """
+
+    def __init__(self, replicas: List[Replica], max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+                 check_seconds: float = REPLICA_CHECK_SECONDS):
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._next = itertools.count()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        for replica in replicas:
+            event.listen(replica.request_engine, "handle_error", self._on_error(replica))
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context):
+            # Lost or refused connections, not errors of the statement
+            if context.is_disconnect or context.connection is None:
+                self._mark_down(replica, context.original_exception)
+        return handle_error
+
+    def _mark_down(self, replica: Replica, exc: BaseException) -> None:
+        if replica.healthy:
+            logger.warning("Read replica %s is down, reading from the others: %s", replica.name, exc)
+        replica.healthy = False
+        replica.error = f"{type(exc).__name__}: {exc}"
+
+    def choose(self) -> Optional[Replica]:
+        """
+        The next usable replica, or None to read from the primary.
+        """
+        usable = [replica for replica in self.replicas if replica.usable(self.max_lag_seconds)]
+        if not usable:
+            return None
+        return usable[next(self._next) % len(usable)]
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    lag = replication_lag(connection)
+            except Exception as exc:
+                self._mark_down(replica, exc)
+            else:
+                if not replica.healthy and replica.checked_at is not None:
+                    logger.info("Read replica %s is back", replica.name)
+                replica.healthy, replica.lag_seconds, replica.error = True, lag, None
+            replica.checked_at = time.monotonic()
+
+    def start(self) -> None:
+        if not self.replicas or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Read replica health check failed")
+            self._stopping.wait(self.check_seconds)
+
+    def status(self) -> List[Dict]:
+        return [replica.status() for replica in self.replicas]
+
+
+class RoutingSession(Session):
+    """
+    Session reading from a replica of replica_set while info[READ_REPLICA_KEY]
+    is set. Flushes and INSERT/UPDATE/DELETE statements go to the primary and
+    clear the flag, so the session's later reads see its writes.
+
+    One replica is chosen per session, so its reads are consistent with
+    each other.
+    """
+
+    def __init__(self, *args, replica_set: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_set = replica_set
+        self._replica: Optional[Replica] = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.replica_set is not None and self.info.get(READ_REPLICA_KEY):
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info[READ_REPLICA_KEY] = False
+            else:
+                if self._replica is None:
+                    self._replica = self.replica_set.choose()
+                if self._replica is not None:
+                    return self._replica.request_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def read_primary(db: Session) -> None:
+    """
+    Send the later reads of db to the primary.
+    """
+    db.info[READ_REPLICA_KEY] = False
+
+
+def reads_from_replica(request: Request, response: Response) -> bool:
+    """
+    Whether the reads of request may go to a replica: it only reads, and its
+    client has not written for READ_YOUR_WRITES_SECONDS. Write requests
+    set the cookie that keeps the client's next reads on the primary.
+    """
+    now = time.time()
+    if request.method not in READ_METHODS:
+        response.set_cookie(
+            WROTE_AT_COOKIE, f"{now:.3f}",
+            max_age=math.ceil(READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax",
+        )
+        return False
+    return not wrote_recently(request, now)
+
+
+def wrote_recently(request: Request, now: Optional[float] = None) -> bool:
+    """
+    Whether the client of request wrote in the last READ_YOUR_WRITES_SECONDS,
+    so its reads must see the primary.
+    """
+    try:
+        wrote_at = float(request.cookies.get(WROTE_AT_COOKIE, 0))
+    except ValueError:
+        wrote_at = 0.0
+    return (time.time() if now is None else now) - wrote_at < READ_YOUR_WRITES_SECONDS
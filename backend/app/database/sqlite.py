@@ -0,0 +1,99 @@
+import os
+import re
+import threading
+from typing import Dict
+
+from sqlalchemy import event
+
+from app.database.pool import _env_bool, _env_int, is_sqlite_file
+
+# SQLite deployment mode, for file databases (in-memory ones are left alone).
+#
+# Every new connection gets WAL journaling, so readers never block the
+# writer or each other, synchronous=NORMAL (durable at each checkpoint
+# instead of each commit, safe in WAL mode), a larger page cache, mmap'd
+# reads and a busy timeout.
+#
+# SQLite allows one writer at a time. pysqlite begins a transaction right
+# before its first INSERT, UPDATE or DELETE, so that is where each
+# transaction takes a per-database lock of this process, held until it
+# commits or rolls back: writers queue on the lock in turn instead of
+# polling in SQLite's busy handler, which sleeps up to 100 ms between
+# attempts and fails with "database is locked" when the busy timeout runs
+# out. Reads never take it. Writers of other processes still meet in the
+# busy handler. Async engines skip the lock, which would block the event
+# loop; their writers wait in the busy handler on aiosqlite's threads.
+
+SQLITE_TUNING = _env_bool("SQLITE_TUNING", True)
+SQLITE_CACHE_SIZE_MB = _env_int("SQLITE_CACHE_SIZE_MB", 64)
+SQLITE_MMAP_SIZE_MB = _env_int("SQLITE_MMAP_SIZE_MB", 256)
+SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+
+# Connection (record) info keys: the engine's writer lock, and whether the
+# connection's transaction got it (absent until its first write)
+_LOCK_KEY = "sqlite_writer_lock"
+_HELD_KEY = "sqlite_writer_lock_held"
+
+# First keyword of the statements pysqlite opens a transaction for
+_WRITE = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+_locks_lock = threading.Lock()
+# Database path -> writer lock, shared by all engines of the process
+_writer_locks: Dict[str, threading.Lock] = {}
+
+
+def pragmas() -> Dict[str, object]:
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        # Negative sizes are in KiB
+        "cache_size": -SQLITE_CACHE_SIZE_MB * 1024,
+        "mmap_size": SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "temp_store": "MEMORY",
+    }
+
+
+def writer_lock(database: str) -> threading.Lock:
+    path = os.path.abspath(database)
+    with _locks_lock:
+        return _writer_locks.setdefault(path, threading.Lock())
+
+
+def configure_engine(engine, tuned: bool = SQLITE_TUNING) -> None:
+    """
+    Switch a file SQLite engine (or an AsyncEngine's sync_engine) to the
+    deployment mode above; other engines are left as they are.
+    """
+    if not tuned or not is_sqlite_file(engine.url):
+        return
+    lock = writer_lock(engine.url.database)
+    settings = pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+        connection_record.info[_LOCK_KEY] = lock
+
+    if engine.dialect.is_async:
+        return
+    event.listen(engine, "before_cursor_execute", _acquire_writer)
+    event.listen(engine, "commit", _release_writer)
+    event.listen(engine, "rollback", _release_writer)
+
+
+def _acquire_writer(connection, cursor, statement, parameters, context, executemany):
+    info = connection.info
+    if _HELD_KEY in info or _LOCK_KEY not in info or not _WRITE.match(statement):
+        return
+    # After the timeout, carry on and let SQLite's busy handler decide
+    info[_HELD_KEY] = info[_LOCK_KEY].acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+
+
+def _release_writer(connection):
+    info = connection.info
+    if info.pop(_HELD_KEY, False):
+        info[_LOCK_KEY].release()
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+from app.database.connection import Base
+
+
+class Change(Base):
+    """
+    One entry of the change feed (GET /changes).
+
+    Rows are appended when the transaction of the change they describe
+    commits, one transaction at a time, so the id order is the order in
+    which changes were committed.
+    """
+    __tablename__ = "changes"
+
+    id = Column(Integer, primary_key=True)
+    # contact, note or link
+    entity_type = Column(String(16), nullable=False)
+    # created, updated or deleted
+    action = Column(String(16), nullable=False)
+    # Set for contact and link changes
+    contact_id = Column(Integer, nullable=True)
+    # Set for note and link changes
+    note_id = Column(Integer, nullable=True)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Newest change of a contact, a note or an entity type (ETag versions)
+Index("ix_changes_contact_id_id", Change.contact_id, Change.id)
+Index("ix_changes_note_id_id", Change.note_id, Change.id)
+Index("ix_changes_entity_type_id", Change.entity_type, Change.id)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
+
+from app.database.connection import Base
+
+
+class ContactBlockKey(Base):
+    """
+    A blocking key of a contact for duplicate detection, see
+    app/services/dedupe.py.
+
+    Only contacts that share a key are ever compared, so finding duplicates
+    reads the groups of this table instead of every pair of contacts.
+    """
+    __tablename__ = "contact_block_keys"
+
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(80), primary_key=True)
+
+
+# Contacts by key
+Index("ix_contact_block_keys_key_contact_id", ContactBlockKey.key, ContactBlockKey.contact_id)
@@ -0,0 +1,21 @@
+from sqlalchemy import Index
+
+from app.database.connection import Base
+from app.models.contact import Contact
+from app.models.note import Note
+
+# Association table behind Contact.notes / Note.contacts, for queries that
+# work on the links directly instead of through the relationships
+contact_notes = Base.metadata.tables["contact_notes"]
+
+# Indexes for the list endpoints' keyset ordering and the contact -> notes
+# join. contact_notes(contact_id, note_id) is covered by its primary key.
+# GET /contacts/ orders by last_contacted DESC NULLS LAST, which a PostgreSQL
+# index only serves when declared in that order; SQLite has no NULLS LAST in
+# indexes and gets the same order from a backward scan of the plain one.
+Index(
+    "ix_contacts_last_contacted_id", Contact.last_contacted.desc().nulls_last(), Contact.id.desc()
+).ddl_if(dialect="postgresql")
+Index("ix_contacts_last_contacted_id", Contact.last_contacted, Contact.id).ddl_if(dialect="sqlite")
+Index("ix_notes_interaction_date_id", Note.interaction_date, Note.id)
+Index("ix_contact_notes_note_id_contact_id", contact_notes.c.note_id, contact_notes.c.contact_id)
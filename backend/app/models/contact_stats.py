@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+
+from app.database.connection import Base
+
+
+class ContactStats(Base):
+    """
+    Interaction summary of a contact, kept up to date by
+    app/services/contact_stats.py whenever its notes change.
+
+    due_at is when the contact should next be reached out to; GET
+    /contacts/due reads contacts in due_at order from its index.
+    """
+    __tablename__ = "contact_stats"
+
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True)
+    # Desired days between interactions, set by the user; None derives it
+    # from the interaction history
+    cadence_days = Column(Integer, nullable=True)
+    interaction_count = Column(Integer, nullable=False, default=0)
+    first_interaction = Column(DateTime, nullable=True)
+    last_interaction = Column(DateTime, nullable=True)
+    # Cadence actually used for due_at
+    effective_cadence_days = Column(Integer, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+Index("ix_contact_stats_due_at_contact_id", ContactStats.due_at, ContactStats.contact_id)
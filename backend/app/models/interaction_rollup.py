@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer, String
+
+from app.database.connection import Base
+
+
+class DailyInteractions(Base):
+    """
+    Number of notes per day and interaction type, kept up to date by
+    app/services/rollups.py in the transaction of every note change.
+    """
+    __tablename__ = "daily_interactions"
+
+    day = Column(Date, primary_key=True)
+    interaction_type = Column(String, primary_key=True)
+    # May drop to 0; such rows are kept for the next note of the day
+    notes = Column(Integer, nullable=False, default=0)
+
+
+class ContactDailyInteractions(Base):
+    """
+    The same per contact: number of the contact's notes per day and
+    interaction type. A group note counts once for each of its contacts.
+    """
+    __tablename__ = "contact_daily_interactions"
+
+    day = Column(Date, primary_key=True)
+    interaction_type = Column(String, primary_key=True)
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True)
+    notes = Column(Integer, nullable=False, default=0)
+
+
+Index(
+    "ix_contact_daily_interactions_contact_id_day",
+    ContactDailyInteractions.contact_id, ContactDailyInteractions.day,
+)
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
+
+from app.database.connection import Base
+
+
+class Job(Base):
+    """
+    A unit of background work, run by the worker pool of app/services/jobs.py.
+
+    Jobs are inserted in the transaction of the change that needs them, so
+    they exist exactly when the change does, and survive restarts.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    # Name of the registered handler, e.g. refine_note
+    kind = Column(String(32), nullable=False)
+    # Keyword arguments of the handler
+    payload = Column(JSON, nullable=False)
+    # queued, running, succeeded or failed
+    status = Column(String(16), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # Not claimed before this time (retry backoff)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Worker running the job and when it claimed it; a running job whose
+    # claim is older than JOBS_LEASE_SECONDS is claimed again
+    locked_by = Column(String(64), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    # Return value of the handler
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# Next job to claim
+Index("ix_jobs_status_run_after_id", Job.status, Job.run_after, Job.id)
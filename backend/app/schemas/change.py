@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+# One change in the feed
+class Change(BaseModel):
+    entity: str
+    action: str
+    contact_id: Optional[int] = None
+    note_id: Optional[int] = None
+    changed_at: datetime
+    # Current state of the contact/note for created and updated entries,
+    # None for deletions, links and entities deleted since
+    data: Optional[Dict[str, Any]] = None
+
+# A page of the change feed
+class ChangeFeed(BaseModel):
+    changes: List[Change]
+    # Pass as since to get the changes after this page
+    next_token: str
+    has_more: bool
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import List, Optional
 from datetime import datetime
 
 # Shared properties
@@ -22,28 +22,74 @@ class ContactUpdate(ContactBase):
 
 # Properties shared by models returned from API
 class ContactInDBBase(ContactBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     last_contacted: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+# Properties to return to client
+class Contact(ContactInDBBase):
+    pass
 
-# Forward reference for Note schema
-from app.schemas.note import Note
+# Validation/serialization of responses outside of FastAPI's response_model
+# (e.g. the read cache). Building a TypeAdapter is costly, so it is done once.
+ContactAdapter = TypeAdapter(Contact)
+ContactListAdapter = TypeAdapter(List[Contact])
 
-# Properties shared by models returned from API
-class ContactInDBBase(ContactBase):
+# A match of GET /contacts/autocomplete
+class ContactSuggestion(BaseModel):
     id: int
-    last_contacted: Optional[datetime] = None
-    created_at: datetime
-    updated_at: Optional[datetime] = None
+    first_name: str
+    last_name: str
+    nickname: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+# A contact in GET /contacts/due, with why it is due
+class DueContact(Contact):
+    # Desired days between interactions, if set
+    cadence_days: Optional[int] = None
+    # Cadence used: cadence_days or one derived from past interactions
+    effective_cadence_days: int
+    interaction_count: int
+    last_interaction: Optional[datetime] = None
+    due_at: datetime
+    # Days past due_at (negative for upcoming contacts); the ranking score
+    overdue_days: float
 
-# Properties to return to client
-class Contact(ContactInDBBase):
-    class Config:
-        orm_mode = True
\ No newline at end of file
+# Body of PUT /contacts/{id}/cadence
+class ContactCadence(BaseModel):
+    # None clears it
+    cadence_days: Optional[int] = Field(None, ge=1, le=3650)
+
+# A likely duplicate pair in GET /contacts/duplicates
+class DuplicateCandidate(BaseModel):
+    # The older contact of the pair
+    contact: Contact
+    duplicate: Contact
+    # 0-1, how likely they are the same person
+    score: float
+    reasons: List[str]
+
+# Body of POST /contacts/merge
+class ContactMerge(BaseModel):
+    # Contact that is kept
+    target_id: int
+    # Contacts merged into it and then deleted
+    source_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+# A row of a bulk import that could not be stored
+class ContactImportError(BaseModel):
+    row: int
+    error: str
+
+# Outcome of POST /contacts/bulk and POST /contacts/import
+class ContactImportResult(BaseModel):
+    received: int
+    created: int
+    failed: int
+    # Capped at MAX_REPORTED_ERRORS rows; failed has the full count
+    errors: List[ContactImportError] = []
+    batches: int
+    elapsed_seconds: float
+    rows_per_second: float
@@ -0,0 +1,41 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+# A contact in graph responses
+class GraphContact(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    nickname: Optional[str] = None
+
+# Someone a contact shares notes with
+class Connection(BaseModel):
+    contact: GraphContact
+    # Number of notes they are both in
+    weight: int
+
+# GET /contacts/{id}/network
+class ContactNetwork(BaseModel):
+    contact: GraphContact
+    connections: List[Connection]
+
+# A contact in GET /graph
+class GraphNode(GraphContact):
+    # Number of connections in the whole graph
+    degree: int
+
+class GraphEdge(BaseModel):
+    source: int
+    target: int
+    weight: int
+
+# GET /graph: the strongest edges and the contacts they join
+class Graph(BaseModel):
+    nodes: List[GraphNode]
+    edges: List[GraphEdge]
+
+# GET /contacts/{id}/path/{target_id}: from the contact to the target
+class ContactPath(BaseModel):
+    contacts: List[GraphContact]
+    # Weight of each hop, one less than contacts
+    weights: List[int]
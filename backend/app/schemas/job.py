@@ -0,0 +1,21 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+# A background job, see GET /jobs/{id}
+class Job(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    # queued, running, succeeded or failed
+    status: str
+    attempts: int
+    max_attempts: int
+    # When a queued job runs next (later than created_at after a failure)
+    run_after: datetime
+    last_error: Optional[str] = None
+    result: Optional[Any] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 
@@ -21,17 +21,31 @@ class NoteUpdate(NoteBase):
     is_group: Optional[bool] = None
     
 class Note(NoteBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     refined_content: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+# Minimal contact fields embedded in note responses
+class NoteContact(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    nickname: Optional[str] = None
 
 # Schema for returning a note with associated contacts
 class NoteWithContacts(Note):
     contact_ids: List[int] = []
-    
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    # Only filled in when the client asks for include_contacts
+    contacts: Optional[List[NoteContact]] = None
+
+# A hit of GET /notes/search
+class NoteSearchResult(NoteWithContacts):
+    # BM25 relevance, only comparable within one search
+    score: float
+
+# Built once, like the adapters in app/schemas/contact.py
+NoteAdapter = TypeAdapter(NoteWithContacts)
+NoteListAdapter = TypeAdapter(List[NoteWithContacts])
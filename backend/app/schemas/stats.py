@@ -0,0 +1,30 @@
+from datetime import date
+from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+
+Period = Literal["day", "week", "month"]
+
+# Interactions in one period (starting on a Monday for weeks, on the 1st
+# for months)
+class TimelinePoint(BaseModel):
+    start: date
+    # Interaction type or city, when the timeline is grouped
+    group: Optional[str] = None
+    count: int
+
+# GET /stats/timeline
+class Timeline(BaseModel):
+    period: Period
+    group_by: Optional[Literal["interaction_type", "city"]] = None
+    points: List[TimelinePoint]
+
+# GET /stats/contacts/{id}
+class ContactActivity(BaseModel):
+    contact_id: int
+    total: int
+    first_day: Optional[date] = None
+    last_day: Optional[date] = None
+    # Interaction type -> number of notes
+    by_type: Dict[str, int]
+    period: Period
+    timeline: List[TimelinePoint]
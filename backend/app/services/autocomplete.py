@@ -0,0 +1,281 @@
+import logging
+import os
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database.replicas import read_primary
+from app.models.contact import Contact
+from app.schemas.contact import ContactSuggestion
+from app.services.events import subscribe
+from app.services.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Type-ahead over contact names, answered from memory.
+#
+# Every word of a contact's first name, last name and nickname, lowercased
+# and without accents, is one entry of a sorted list of words with a
+# parallel array of contact ids, so the contacts whose names have a word
+# starting with a prefix are one contiguous run found by bisection. Names
+# are kept alongside to answer without the database.
+#
+# The index is built at startup (AUTOCOMPLETE_PRELOAD) or on first use.
+# Contact events mark ids stale after commit and the next lookup reads
+# those contacts in one query, as for the note search index. Each worker
+# keeps its own index and rebuilds it after AUTOCOMPLETE_MAX_AGE_SECONDS
+# to pick up other workers' changes (0 keeps it until the process exits).
+# Builds and refreshes read the primary, never a replica that may lag.
+
+AUTOCOMPLETE_MAX_AGE_SECONDS = float(os.getenv("AUTOCOMPLETE_MAX_AGE_SECONDS") or 300)
+AUTOCOMPLETE_PRELOAD = os.getenv("AUTOCOMPLETE_PRELOAD", "on").lower() not in ("0", "off", "false")
+
+Names = Tuple[str, str, Optional[str]]
+
+
+def fold(text: Optional[str]) -> str:
+    """
+    Lowercase text without accents: "Zoë" -> "zoe".
+    """
+    if not text:
+        return ""
+    text = text.casefold()
+    if text.isascii():
+        return text
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def name_words(first_name: str, last_name: str, nickname: Optional[str]) -> Set[str]:
+    return set(tokenize(fold(f"{first_name} {last_name} {nickname or ''}")))
+
+
+class PrefixIndex:
+    """
+    Contacts by the prefixes of the words of their names, built from
+    (contact_id, first_name, last_name, nickname).
+
+    Safe to use from several threads; nothing in it does I/O.
+    """
+
+    def __init__(self, contacts: Iterable[Tuple[int, str, str, Optional[str]]]):
+        self._lock = threading.RLock()
+        self._names: Dict[int, Names] = {}
+        self._name_words: Dict[int, Tuple[str, ...]] = {}
+        # Sequence number of the change last applied to a contact
+        self._applied: Dict[int, int] = {}
+        entries = []
+        for contact_id, first_name, last_name, nickname in contacts:
+            words = tuple(sorted(name_words(first_name, last_name, nickname)))
+            self._names[contact_id] = (first_name, last_name, nickname)
+            self._name_words[contact_id] = words
+            entries.extend((word, contact_id) for word in words)
+        entries.sort()
+        # Sorted by (word, contact id)
+        self._words: List[str] = [word for word, _ in entries]
+        self._ids = array("q", (contact_id for _, contact_id in entries))
+
+    def _locate(self, word: str, contact_id: int) -> int:
+        lo = bisect_left(self._words, word)
+        hi = bisect_right(self._words, word, lo)
+        return bisect_left(self._ids, contact_id, lo, hi)
+
+    def _replace(self, contact_id: int, names: Optional[Names]) -> None:
+        self._names.pop(contact_id, None)
+        old_words = set(self._name_words.pop(contact_id, ()))
+        new_words = name_words(*names) if names else set()
+        for word in old_words - new_words:
+            i = self._locate(word, contact_id)
+            del self._words[i]
+            del self._ids[i]
+        for word in new_words - old_words:
+            i = self._locate(word, contact_id)
+            self._words.insert(i, word)
+            self._ids.insert(i, contact_id)
+        if names:
+            self._names[contact_id] = names
+            self._name_words[contact_id] = tuple(sorted(new_words))
+
+    def update(self, changes: Dict[int, Tuple[Optional[Names], int]]) -> None:
+        """
+        Apply contact_id -> (new names or None when deleted, sequence number).
+
+        A change older than the one already applied is skipped, see
+        NoteIndex.update.
+        """
+        with self._lock:
+            for contact_id, (names, seq) in changes.items():
+                if self._applied.get(contact_id, -1) > seq:
+                    continue
+                self._applied[contact_id] = seq
+                self._replace(contact_id, names)
+
+    def search(self, prefix: str, limit: int) -> List[Tuple[int, str, str, Optional[str]]]:
+        """
+        Contacts with a name word starting with each word of prefix, in the
+        order of their matching words; "ada lov" finds Ada Lovelace.
+        """
+        prefixes = tokenize(fold(prefix))
+        if not prefixes:
+            return []
+        with self._lock:
+            # Walk the run of the most selective word, check the others
+            runs = []
+            for word in prefixes:
+                lo = bisect_left(self._words, word)
+                hi = bisect_left(self._words, word + "\U0010ffff", lo)
+                runs.append((hi - lo, lo, hi, word))
+            _, lo, hi, first = min(runs)
+            others = [word for *_, word in runs if word != first]
+
+            results = []
+            seen = set()
+            for i in range(lo, hi):
+                contact_id = self._ids[i]
+                if contact_id in seen:
+                    continue
+                seen.add(contact_id)
+                if others:
+                    words = self._name_words[contact_id]
+                    if not all(any(w.startswith(other) for w in words) for other in others):
+                        continue
+                results.append((contact_id, *self._names[contact_id]))
+                if len(results) == limit:
+                    break
+            return results
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {"contacts": len(self._names), "words": len(self._words)}
+
+
+_lock = threading.Lock()
+_index: Optional[PrefixIndex] = None
+_built_at = 0.0
+# contact id -> sequence number of its last change not yet read in
+_stale: Dict[int, int] = {}
+_seq = 0
+# Changes that arrive while an index is being built, one dict per build
+_collectors: List[Dict[int, int]] = []
+
+# Contacts read per query when refreshing stale ones
+REFRESH_CHUNK = 1000
+
+
+def _columns():
+    return select(Contact.id, Contact.first_name, Contact.last_name, Contact.nickname)
+
+
+def get_index(db: Session) -> PrefixIndex:
+    """
+    The current index, (re)built when missing or too old, with the contacts
+    changed since the last lookup read in. See note_search.get_index.
+    """
+    global _index, _built_at
+    with _lock:
+        index = _index
+        if index is not None and AUTOCOMPLETE_MAX_AGE_SECONDS and (
+            time.monotonic() - _built_at >= AUTOCOMPLETE_MAX_AGE_SECONDS
+        ):
+            index = None
+        if index is None:
+            collector = {}
+            _collectors.append(collector)
+    if index is None:
+        read_primary(db)
+        try:
+            index = PrefixIndex(db.execute(_columns()))
+        except BaseException:
+            with _lock:
+                _collectors.remove(collector)
+            raise
+        with _lock:
+            _collectors.remove(collector)
+            # Changes committed during the scan may or may not be in it
+            for contact_id, seq in collector.items():
+                _stale[contact_id] = max(seq, _stale.get(contact_id, 0))
+            _index, _built_at = index, time.monotonic()
+    _refresh(db, index)
+    return index
+
+
+def _refresh(db: Session, index: PrefixIndex) -> None:
+    with _lock:
+        if not _stale:
+            return
+        pending = dict(_stale)
+        _stale.clear()
+    read_primary(db)
+    try:
+        contact_ids = sorted(pending)
+        names = {}
+        for start in range(0, len(contact_ids), REFRESH_CHUNK):
+            rows = db.execute(_columns().where(Contact.id.in_(contact_ids[start:start + REFRESH_CHUNK])))
+            names.update((contact_id, tuple(rest)) for contact_id, *rest in rows)
+    except BaseException:
+        with _lock:
+            for contact_id, seq in pending.items():
+                _stale[contact_id] = max(seq, _stale.get(contact_id, 0))
+        raise
+    index.update({contact_id: (names.get(contact_id), seq) for contact_id, seq in pending.items()})
+
+
+def preload(session_factory: Callable[[], Session]) -> None:
+    """
+    Build the index at startup so the first keystroke does not wait for it.
+    """
+    if not AUTOCOMPLETE_PRELOAD:
+        return
+    try:
+        with session_factory() as db:
+            get_index(db)
+    except Exception:
+        logger.warning("Could not preload the autocomplete index; it is built on first use", exc_info=True)
+
+
+def reset_index() -> None:
+    """
+    Drop the index; the next lookup rebuilds it.
+    """
+    global _index
+    with _lock:
+        _index = None
+        _stale.clear()
+
+
+def index_status() -> Dict:
+    with _lock:
+        index, built_at, stale = _index, _built_at, len(_stale)
+    if index is None:
+        return {"built": False}
+    return {"built": True, "age_seconds": round(time.monotonic() - built_at, 1), "stale": stale, **index.status()}
+
+
+@subscribe("contact.created", after_commit=True)
+@subscribe("contact.updated", after_commit=True)
+@subscribe("contact.deleted", after_commit=True)
+def _contacts_changed(contact_ids):
+    global _seq
+    with _lock:
+        if _index is None and not _collectors:
+            return
+        _seq += 1
+        for contact_id in contact_ids:
+            _stale[contact_id] = _seq
+            for collector in _collectors:
+                collector[contact_id] = _seq
+
+
+def autocomplete(db: Session, prefix: str, limit: int = 10) -> List[ContactSuggestion]:
+    """
+    Contacts whose names start with prefix, for a contact picker.
+    """
+    return [
+        ContactSuggestion(id=contact_id, first_name=first_name, last_name=last_name, nickname=nickname)
+        for contact_id, first_name, last_name, nickname in get_index(db).search(prefix, limit)
+    ]
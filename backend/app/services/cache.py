@@ -0,0 +1,360 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from urllib.parse import urlencode
+
+import orjson
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.api.conditional import is_not_modified, not_modified, validator_headers
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.database.replicas import wrote_recently
+from app.services.events import subscribe
+
+# Read cache in front of the contact and note queries, see README
+# "Configuration". Entries are rendered JSON response bodies, so a hit skips
+# the database, the ORM and serialization entirely.
+#
+# Single rows are cached under "contact:<id>" / "note:<id>" and dropped when
+# an event names them. Lists are cached under a key that embeds the current
+# generation of the collections they read ("contacts", "notes"); a change
+# bumps the generation, which makes every older list key unreachable at once
+# without having to know which pages contained the row.
+#
+# A row loaded before a concurrent change commits could be stored after the
+# change dropped its key. Invalidations bump the collection's generation
+# before dropping rows, and a row is only stored if that generation is still
+# the one read before loading it (guard=), checked atomically with the set.
+#
+# With read replicas, a response loaded from a lagging replica can be cached
+# after the change's invalidation, and other clients may get it for up to
+# the replicas' lag plus CACHE_TTL_SECONDS. A client that has just written
+# reads from the primary (crm_wrote_at cookie) and skips cache lookups
+# until then, so it always sees its own changes; what it loads replaces
+# the cached entry.
+#
+# With the memory backend every worker has its own cache and only sees its
+# own invalidations, so other workers may serve a changed row for up to
+# CACHE_TTL_SECONDS. Use the redis backend to share one cache between workers.
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS") or 60)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES") or 10000)
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class CacheStats:
+    """
+    Hit and miss counters of a cache, per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def record(self, name, count=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class MemoryCache:
+    """
+    Thread-safe LRU cache whose entries expire after ttl seconds.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.stats.record("hits")
+                    return value
+                del self._entries[key]
+        self.stats.record("misses")
+        return None
+
+    def set(self, key, value, guard: Optional[Tuple[str, int]] = None) -> None:
+        with self._lock:
+            if guard is not None and self._generations.get(guard[0], 0) != guard[1]:
+                return
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.stats.record("evictions", evicted)
+
+    def delete(self, *keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        self.stats.record("invalidations", len(keys))
+
+    def generation(self, name) -> int:
+        with self._lock:
+            return self._generations.get(name, 0)
+
+    def bump(self, name) -> None:
+        # Generations are not entries, they must survive LRU eviction
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+        self.stats.record("invalidations")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+        self.stats.reset()
+
+    def size(self) -> Optional[int]:
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisCache:
+    """
+    Cache shared by all workers through Redis; expiry is left to Redis and
+    eviction to its maxmemory policy.
+    """
+
+    name = "redis"
+
+    def __init__(self, url=CACHE_REDIS_URL, ttl=CACHE_TTL_SECONDS, prefix="crm:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self._client = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+
+    def get(self, key) -> Optional[Any]:
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            self.stats.record("misses")
+            return None
+        self.stats.record("hits")
+        return orjson.loads(raw)
+
+    def set(self, key, value, guard: Optional[Tuple[str, int]] = None) -> None:
+        if guard is None:
+            self._client.set(self.prefix + key, orjson.dumps(value), px=int(self.ttl * 1000))
+            return
+        name, generation = guard
+        generation_key = f"{self.prefix}gen:{name}"
+        with self._client.pipeline() as pipe:
+            try:
+                # Fails at execute() if the generation is bumped meanwhile
+                pipe.watch(generation_key)
+                if int(pipe.get(generation_key) or 0) != generation:
+                    return
+                pipe.multi()
+                pipe.set(self.prefix + key, orjson.dumps(value), px=int(self.ttl * 1000))
+                pipe.execute()
+            except self._watch_error:
+                pass
+
+    def delete(self, *keys) -> None:
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+        self.stats.record("invalidations", len(keys))
+
+    def generation(self, name) -> int:
+        return int(self._client.get(f"{self.prefix}gen:{name}") or 0)
+
+    def bump(self, name) -> None:
+        self._client.incr(f"{self.prefix}gen:{name}")
+        self.stats.record("invalidations")
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+        self.stats.reset()
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class NullCache:
+    """
+    Cache that stores nothing, for CACHE_BACKEND=none.
+    """
+
+    name = "none"
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key) -> Optional[Any]:
+        self.stats.record("misses")
+        return None
+
+    def set(self, key, value, guard: Optional[Tuple[str, int]] = None) -> None:
+        pass
+
+    def delete(self, *keys) -> None:
+        pass
+
+    def generation(self, name) -> int:
+        return 0
+
+    def bump(self, name) -> None:
+        pass
+
+    def clear(self) -> None:
+        self.stats.reset()
+
+    def size(self) -> Optional[int]:
+        return 0
+
+
+def create_cache(backend: str = CACHE_BACKEND):
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "redis":
+        return RedisCache()
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND {backend!r}, expected memory, redis or none")
+
+
+response_cache = create_cache()
+
+
+def cache_status() -> dict:
+    return {"backend": response_cache.name, "entries": response_cache.size(), **response_cache.stats.as_dict()}
+
+
+def entity_key(kind: str, entity_id: int) -> str:
+    return f"{kind}:{entity_id}"
+
+
+def collection_key(*collections: str, **params) -> str:
+    """
+    Key of one list request, valid until one of the collections it reads
+    changes.
+    """
+    generations = ",".join(f"{name}.{response_cache.generation(name)}" for name in collections)
+    query = urlencode(sorted((name, "" if value is None else value) for name, value in params.items()))
+    return f"list:{generations}:{query}"
+
+
+# Headers set by load that are part of a cached response
+_CACHED_HEADERS = (NEXT_CURSOR_HEADER,)
+
+
+async def cached_response(
+    key: str,
+    request: Request,
+    response: Response,
+    adapter: TypeAdapter,
+    load: Callable[[], Awaitable[Any]],
+    tag: str,
+    version: Callable[[], Awaitable[Tuple[int, Optional[datetime]]]],
+    guard: Optional[str] = None,
+) -> Response:
+    """
+    Response for key from the cache, or from load() which is then cached.
+
+    load returns what the endpoint would (ORM rows or schemas); it is
+    validated and rendered to JSON once by adapter (one of the schema
+    adapters) and the text is cached, so a hit is sent as is without going
+    through the endpoint's response_model again. Pagination headers set by
+    load are stored and replayed with the body.
+
+    The response carries an ETag made of tag and version(), which is looked
+    up before load. When the client already has that version it gets a 304
+    and nothing is loaded or serialized; on a cache hit not even version()
+    is needed.
+
+    guard is the collection whose generation changes with key (the
+    collection of an entity_key); the loaded response is not cached if it
+    changed during the load. Clients that wrote recently always load, see
+    app/database/replicas.py.
+    """
+    # Clients reading their own writes skip what replicas may have cached
+    entry = None if wrote_recently(request) else response_cache.get(key)
+    if entry is None:
+        generation = None if guard is None else (guard, response_cache.generation(guard))
+        headers = validator_headers(tag, await version())
+        if is_not_modified(request, headers):
+            return not_modified(headers)
+        result = await load()
+        body = adapter.dump_json(adapter.validate_python(result)).decode()
+        headers.update((name, response.headers[name]) for name in _CACHED_HEADERS if name in response.headers)
+        entry = {"body": body, "headers": headers}
+        response_cache.set(key, entry, generation)
+    elif is_not_modified(request, entry["headers"]):
+        return not_modified(entry["headers"])
+    return Response(content=entry["body"], media_type="application/json", headers=entry["headers"])
+
+
+# Invalidation, once the change has committed. Notes embed their contact ids
+# and contact lists are ordered by last_contacted, so link changes touch both.
+# Generations are bumped first, so guarded fills racing with the change fail.
+
+@subscribe("contact.created", after_commit=True)
+def _invalidate_new_contacts(contact_ids):
+    response_cache.bump("contacts")
+
+@subscribe("contact.updated", after_commit=True)
+@subscribe("contact.deleted", after_commit=True)
+def _invalidate_contacts(contact_ids):
+    response_cache.bump("contacts")
+    response_cache.delete(*(entity_key("contact", i) for i in contact_ids))
+
+@subscribe("note.created", after_commit=True)
+def _invalidate_new_notes(note_ids):
+    response_cache.bump("notes")
+
+@subscribe("note.updated", after_commit=True)
+@subscribe("note.deleted", after_commit=True)
+def _invalidate_notes(note_ids):
+    response_cache.bump("notes")
+    response_cache.delete(*(entity_key("note", i) for i in note_ids))
+
+@subscribe("link.added", after_commit=True)
+@subscribe("link.removed", after_commit=True)
+def _invalidate_links(links):
+    response_cache.bump("notes")
+    response_cache.delete(*{entity_key("note", note_id) for _, note_id in links})
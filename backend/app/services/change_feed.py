@@ -0,0 +1,247 @@
+import base64
+import binascii
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.change import Change
+from app.models.contact import Contact
+from app.models.note import Note
+from app.schemas.change import Change as ChangeSchema, ChangeFeed
+from app.schemas.contact import Contact as ContactSchema
+from app.services.events import subscribe
+from app.services.jobs import enqueue, job_handler
+from app.services.note_contacts import with_contacts
+
+# Feed entries older than this are pruned (0 keeps them all). A since token
+# from before the pruned entries, or no token once the start of the feed is
+# gone, gets a 410: the client resyncs from a full export and follows the
+# feed from the token of the 410 on, see get_changes
+CHANGE_RETENTION_DAYS = float(os.getenv("CHANGE_RETENTION_DAYS") or 30)
+# How often each process queues the pruning job, while it writes changes
+CHANGE_PRUNE_SECONDS = float(os.getenv("CHANGE_PRUNE_SECONDS") or 3600)
+
+_TOKEN_PREFIX = "v1:"
+# Session info key: feed entries of the transaction, written at commit
+_CHANGES_KEY = "pending_changes"
+# PostgreSQL advisory lock serializing the commits that write feed entries
+CHANGE_FEED_LOCK_ID = 0x63726D66  # "crmf"
+
+_prune_lock = threading.Lock()
+_next_prune = 0.0
+
+
+def encode_token(change_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{_TOKEN_PREFIX}{change_id}".encode()).decode().rstrip("=")
+
+
+def decode_token(token: Optional[str]) -> int:
+    """
+    Position in the feed for a since token; no token means the beginning.
+    """
+    if not token:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        if not raw.startswith(_TOKEN_PREFIX):
+            raise ValueError(raw)
+        return int(raw[len(_TOKEN_PREFIX):])
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid change token")
+
+
+def record_changes(db: Session, entity_type: str, action: str, rows: Iterable[dict]) -> None:
+    rows = [{"entity_type": entity_type, "action": action, **row} for row in rows]
+    if rows:
+        db.info.setdefault(_CHANGES_KEY, []).extend(rows)
+
+
+# Feed entries are written in the same transaction as the change itself,
+# but only when it commits: clients page on the entry ids, so ids must be
+# handed out in commit order. PostgreSQL assigns sequence values before
+# commit, so a later id could otherwise become visible before an earlier
+# one and a client past it would never see the earlier entry. The inserts
+# and the commit are serialized with an advisory lock, held only for that
+# last step; SQLite already serializes write transactions.
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session):
+    rows = session.info.pop(_CHANGES_KEY, None)
+    if not rows:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(select(func.pg_advisory_xact_lock(CHANGE_FEED_LOCK_ID)))
+    session.execute(insert(Change), rows)
+    if _prune_due():
+        enqueue(session, "prune_changes")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
+
+
+def _prune_due() -> bool:
+    global _next_prune
+    if CHANGE_RETENTION_DAYS <= 0:
+        return False
+    now = time.monotonic()
+    with _prune_lock:
+        if now < _next_prune:
+            return False
+        _next_prune = now + CHANGE_PRUNE_SECONDS
+        return True
+
+
+@job_handler("prune_changes", concurrency=1)
+def prune_changes(db: Session, retention_days: Optional[float] = None) -> dict:
+    """
+    Delete the feed entries older than the retention period. The newest
+    entry is always kept, so ids are never reused and the oldest remaining
+    id tells which tokens have expired.
+    """
+    retention_days = CHANGE_RETENTION_DAYS if retention_days is None else retention_days
+    newest = db.scalar(select(func.max(Change.id)))
+    if retention_days <= 0 or newest is None:
+        return {"pruned": 0}
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    result = db.execute(delete(Change).where(Change.changed_at < cutoff, Change.id < newest))
+    return {"pruned": result.rowcount}
+
+@subscribe("contact.created")
+def _contact_created(db, contact_ids):
+    record_changes(db, "contact", "created", ({"contact_id": i} for i in contact_ids))
+
+@subscribe("contact.updated")
+def _contact_updated(db, contact_ids):
+    record_changes(db, "contact", "updated", ({"contact_id": i} for i in contact_ids))
+
+@subscribe("contact.deleted")
+def _contact_deleted(db, contact_ids):
+    record_changes(db, "contact", "deleted", ({"contact_id": i} for i in contact_ids))
+
+@subscribe("note.created")
+def _note_created(db, note_ids):
+    record_changes(db, "note", "created", ({"note_id": i} for i in note_ids))
+
+@subscribe("note.updated")
+def _note_updated(db, note_ids):
+    record_changes(db, "note", "updated", ({"note_id": i} for i in note_ids))
+
+@subscribe("note.deleted")
+def _note_deleted(db, note_ids):
+    record_changes(db, "note", "deleted", ({"note_id": i} for i in note_ids))
+
+@subscribe("link.added")
+def _link_added(db, links):
+    record_changes(db, "link", "created", ({"contact_id": c, "note_id": n} for c, n in links))
+
+@subscribe("link.removed")
+def _link_removed(db, links):
+    record_changes(db, "link", "deleted", ({"contact_id": c, "note_id": n} for c, n in links))
+
+
+def get_changes(db: Session, since: Optional[str] = None, limit: int = 500) -> ChangeFeed:
+    """
+    The changes recorded after the since token, oldest first.
+
+    Created/updated entries carry the current state of their contact or
+    note, loaded with one query per entity type for the whole page.
+
+    When entries the client has not seen were pruned, the feed cannot bring
+    it up to date: that is a 410 whose detail has the token of the newest
+    entry. The client then takes a full snapshot from GET /export/ and
+    follows the feed from that token; changes made meanwhile may come
+    twice, which upserts and tombstones tolerate.
+    """
+    position = decode_token(since)
+    # A token points at an entry the client has seen; the entries after it
+    # are all there unless the oldest one left is further on. Without a
+    # token that means the first entry (1) is gone.
+    oldest = db.scalar(select(func.min(Change.id)))
+    if oldest is not None and position < oldest - 1:
+        raise HTTPException(status_code=410, detail={
+            "message": "Change token expired, resync from GET /export/ and continue from next_token",
+            "resync": "/export/",
+            "next_token": encode_token(db.scalar(select(func.max(Change.id)))),
+        })
+    rows: List[Change] = (
+        db.query(Change)
+        .filter(Change.id > position)
+        .order_by(Change.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    contact_ids = {r.contact_id for r in rows if r.entity_type == "contact" and r.action != "deleted"}
+    note_ids = {r.note_id for r in rows if r.entity_type == "note" and r.action != "deleted"}
+
+    contacts = {}
+    if contact_ids:
+        for contact in db.query(Contact).filter(Contact.id.in_(contact_ids)):
+            contacts[contact.id] = ContactSchema.model_validate(contact).model_dump(mode="json")
+    notes = {}
+    if note_ids:
+        for note in with_contacts(db, db.query(Note).filter(Note.id.in_(note_ids)).all()):
+            notes[note.id] = note.model_dump(mode="json", exclude={"contacts"})
+
+    changes = []
+    for row in rows:
+        data = None
+        if row.action != "deleted":
+            if row.entity_type == "contact":
+                data = contacts.get(row.contact_id)
+            elif row.entity_type == "note":
+                data = notes.get(row.note_id)
+        changes.append(ChangeSchema(
+            entity=row.entity_type,
+            action=row.action,
+            contact_id=row.contact_id,
+            note_id=row.note_id,
+            changed_at=row.changed_at,
+            data=data,
+        ))
+
+    next_position = rows[-1].id if rows else position
+    return ChangeFeed(changes=changes, next_token=encode_token(next_position), has_more=has_more)
+
+
+def latest_change(db: Session, *criteria) -> Tuple[int, Optional[datetime]]:
+    """
+    Id and time of the newest change matching criteria, (0, None) if none.
+
+    The id works as a version: it grows with every write to what the
+    criteria select, which is what ETags of the read endpoints are made of.
+    """
+    row = db.execute(
+        select(Change.id, Change.changed_at).where(*criteria).order_by(Change.id.desc()).limit(1)
+    ).first()
+    return (row.id, row.changed_at) if row else (0, None)
+
+
+def contact_version(db: Session, contact_id: int) -> Tuple[int, Optional[datetime]]:
+    return latest_change(db, Change.contact_id == contact_id, Change.entity_type == "contact")
+
+
+def note_version(db: Session, note_id: int) -> Tuple[int, Optional[datetime]]:
+    # Link changes alter the note's contact_ids
+    return latest_change(db, Change.note_id == note_id)
+
+
+def collection_version(db: Session, *entity_types: str) -> Tuple[int, Optional[datetime]]:
+    """
+    Version of everything of entity_types, or of all data without any.
+    """
+    if len(entity_types) == 1:
+        return latest_change(db, Change.entity_type == entity_types[0])
+    if entity_types:
+        return latest_change(db, Change.entity_type.in_(entity_types))
+    return latest_change(db)
@@ -0,0 +1,313 @@
+import csv
+import io
+import json
+import re
+import time
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.contact import Contact
+from app.schemas.contact import ContactCreate, ContactImportError, ContactImportResult
+from app.services.events import emit
+
+# A parsed record: (row number in the upload, raw field values)
+Record = Tuple[int, Dict[str, Any]]
+
+# Uploads are kept in memory up to this size, then spill to a temp file
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# Only the first rows' errors are listed in the response
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ("csv", "vcard", "jsonl")
+
+# Content types that imply an import format when none is given
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "text/vcard": "vcard",
+    "text/x-vcard": "vcard",
+    "text/directory": "vcard",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+    "application/x-jsonlines": "jsonl",
+}
+
+# Column headers accepted for each contact field (after normalization);
+# covers our own export and LinkedIn's Connections.csv
+FIELD_ALIASES = {
+    "first_name": {"first_name", "firstname", "first", "given_name"},
+    "last_name": {"last_name", "lastname", "last", "surname", "family_name"},
+    "nickname": {"nickname", "nick"},
+    "city": {"city", "location", "town"},
+    "how_we_met": {"how_we_met", "met", "context"},
+    "linkedin_url": {"linkedin_url", "linkedin", "url", "profile_url", "linkedin_profile"},
+}
+_ALIAS_TO_FIELD = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+
+def _normalize_header(header: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", header.strip().lower()).strip("_")
+
+
+def parse_csv(stream: io.TextIOBase) -> Iterator[Record]:
+    """
+    Parse contacts from CSV with a header row.
+
+    Lines before the header (LinkedIn exports start with a few lines of
+    notes) are skipped: the header is the first row naming both a first
+    and a last name column.
+    """
+    reader = csv.reader(stream)
+    fields = None
+    for row in reader:
+        if fields is None:
+            candidate = [_ALIAS_TO_FIELD.get(_normalize_header(cell)) for cell in row]
+            if "first_name" in candidate and "last_name" in candidate:
+                fields = candidate
+            continue
+        if not any(cell.strip() for cell in row):
+            continue
+
+        record = {}
+        for field, value in zip(fields, row):
+            if field is not None and value.strip():
+                record[field] = value.strip()
+        yield reader.line_num, record
+
+
+def _unfold_lines(stream: io.TextIOBase) -> Iterator[Tuple[int, str]]:
+    # vCard continuation lines start with a space or tab
+    pending = None
+    pending_number = 0
+    for number, line in enumerate(stream, start=1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_number, pending
+        pending, pending_number = line, number
+    if pending is not None:
+        yield pending_number, pending
+
+
+def _unescape_vcard(value: str) -> str:
+    return re.sub(r"\\([\\,;nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _split_vcard(value: str, separator: str) -> List[str]:
+    return [_unescape_vcard(part) for part in re.split(rf"(?<!\\){separator}", value)]
+
+
+def parse_vcard(stream: io.TextIOBase) -> Iterator[Record]:
+    """
+    Parse contacts from vCard 3.0/4.0 cards (N, FN, NICKNAME, ADR, URL).
+
+    The row number of a card is the line of its BEGIN:VCARD.
+    """
+    card = None
+    start = 0
+    for number, line in _unfold_lines(stream):
+        if ":" not in line:
+            continue
+        name_and_params, value = line.split(":", 1)
+        name = name_and_params.split(";", 1)[0].split(".")[-1].upper()
+        params = name_and_params.upper()
+
+        if name == "BEGIN" and value.strip().upper() == "VCARD":
+            card, start = {}, number
+        elif card is None:
+            continue
+        elif name == "END":
+            yield start, card
+            card = None
+        elif name == "N":
+            parts = _split_vcard(value, ";") + ["", ""]
+            if parts[0].strip():
+                card["last_name"] = parts[0].strip()
+            if parts[1].strip():
+                card["first_name"] = parts[1].strip()
+        elif name == "FN" and ("first_name" not in card or "last_name" not in card):
+            # Only used when N is missing or incomplete
+            first, _, last = _unescape_vcard(value).strip().partition(" ")
+            card.setdefault("first_name", first)
+            if last:
+                card.setdefault("last_name", last.strip())
+        elif name == "NICKNAME" and value.strip():
+            card["nickname"] = _split_vcard(value, ",")[0].strip()
+        elif name == "ADR" and "city" not in card:
+            parts = _split_vcard(value, ";")
+            if len(parts) > 3 and parts[3].strip():
+                card["city"] = parts[3].strip()
+        elif name in ("URL", "X-SOCIALPROFILE") and (
+            "linkedin.com" in value.lower() or "LINKEDIN" in params
+        ):
+            card["linkedin_url"] = _unescape_vcard(value).strip()
+
+
+def parse_jsonl(stream: io.TextIOBase) -> Iterator[Record]:
+    """
+    Parse contacts from JSON lines, one contact object per line.
+
+    Lines that are not JSON objects are yielded as non-dict values so the
+    importer reports them as row errors.
+    """
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, f"Invalid JSON: {exc}"
+
+
+PARSERS = {
+    "csv": parse_csv,
+    "vcard": parse_vcard,
+    "jsonl": parse_jsonl,
+}
+
+
+def format_for_content_type(content_type: Optional[str]) -> str:
+    """
+    Work out the import format from a request's Content-Type.
+    """
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if media_type not in CONTENT_TYPE_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Cannot import {media_type or 'this content'}; pass format=csv, vcard or jsonl",
+        )
+    return CONTENT_TYPE_FORMATS[media_type]
+
+
+async def spool_request_body(request: Request) -> SpooledTemporaryFile:
+    """
+    Copy the request body into a spooled temporary file as it arrives.
+
+    Memory use is bounded by SPOOL_MAX_MEMORY; larger uploads spill to disk.
+    The caller owns (and must close) the returned file.
+    """
+    upload = SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+b")
+    async for chunk in request.stream():
+        upload.write(chunk)
+    upload.seek(0)
+    return upload
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def import_records(
+    db: Session,
+    records: Iterable[Record],
+    batch_size: int = 1000,
+    single_transaction: bool = False,
+) -> ContactImportResult:
+    """
+    Validate records and insert the valid ones in executemany batches.
+
+    Invalid rows are skipped and reported. In chunked mode every batch is
+    committed on its own, so a batch that fails in the database only loses
+    that batch; in single-transaction mode everything is committed at the
+    end and any database error rolls back the whole import.
+    """
+    start = time.perf_counter()
+    received = created = failed = batches = 0
+    errors: List[ContactImportError] = []
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    def add_error(row: int, message: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(ContactImportError(row=row, error=message))
+
+    def flush_batch():
+        nonlocal created, batches
+        if not batch:
+            return
+        try:
+            contact_ids = db.execute(
+                insert(Contact).returning(Contact.id), [values for _, values in batch]
+            ).scalars().all()
+            emit(db, "contact.created", contact_ids=contact_ids)
+            if not single_transaction:
+                db.commit()
+        except SQLAlchemyError as exc:
+            db.rollback()
+            if single_transaction:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Import rolled back, database error at rows {batch[0][0]}-{batch[-1][0]}: {exc.orig or exc}",
+                )
+            for row, _ in batch:
+                add_error(row, f"Database error: {exc.orig or exc}")
+        else:
+            created += len(batch)
+            batches += 1
+        batch.clear()
+
+    for row, raw in records:
+        received += 1
+        if not isinstance(raw, dict):
+            add_error(row, raw if isinstance(raw, str) else "Expected a contact object")
+            continue
+        try:
+            contact = ContactCreate.model_validate(raw)
+        except ValidationError as exc:
+            add_error(row, _validation_message(exc))
+            continue
+
+        batch.append((row, contact.model_dump()))
+        if len(batch) >= batch_size:
+            flush_batch()
+
+    flush_batch()
+    if single_transaction:
+        try:
+            db.commit()
+        except SQLAlchemyError as exc:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Import rolled back: {exc.orig or exc}")
+
+    elapsed = time.perf_counter() - start
+    return ContactImportResult(
+        received=received,
+        created=created,
+        failed=failed,
+        errors=errors,
+        batches=batches,
+        elapsed_seconds=round(elapsed, 4),
+        rows_per_second=round(created / elapsed, 1) if elapsed > 0 else 0.0,
+    )
+
+
+def import_upload(
+    db: Session,
+    upload: SpooledTemporaryFile,
+    import_format: str,
+    batch_size: int = 1000,
+    single_transaction: bool = False,
+) -> ContactImportResult:
+    """
+    Parse a spooled upload in a streaming fashion and import it.
+    """
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return import_records(db, PARSERS[import_format](stream), batch_size, single_transaction)
+    finally:
+        # Leave closing the underlying file to the caller
+        stream.detach()
@@ -0,0 +1,193 @@
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.contact import Contact
+from app.models.contact_note import contact_notes
+from app.models.contact_stats import ContactStats
+from app.models.note import Note
+from app.schemas.contact import Contact as ContactSchema, DueContact
+from app.services.events import subscribe
+
+# Who is due for a catch-up. Every contact has a contact_stats row with its
+# interaction count, first and last interaction and a due_at:
+#
+#   due_at = last interaction (or when the contact was added) + cadence
+#
+# The cadence is the contact's own cadence_days when set. Otherwise it is
+# the average gap between their past interactions, clamped to
+# [MIN_CADENCE_DAYS, MAX_CADENCE_DAYS], so people seen often come due
+# sooner; with fewer than two interactions it is DEFAULT_CADENCE_DAYS.
+#
+# The overdue score is the number of days past due_at, which orders exactly
+# like due_at: ranking is a scan of the due_at index, no aggregation. Rows
+# are recomputed for just the contacts a change touches, in the change's
+# transaction.
+
+DEFAULT_CADENCE_DAYS = int(os.getenv("CONTACT_DEFAULT_CADENCE_DAYS") or 90)
+MIN_CADENCE_DAYS = 7
+MAX_CADENCE_DAYS = 365
+
+
+def effective_cadence(
+    cadence_days: Optional[int],
+    interaction_count: int,
+    first_interaction: Optional[datetime],
+    last_interaction: Optional[datetime],
+) -> int:
+    if cadence_days:
+        return cadence_days
+    if interaction_count >= 2 and first_interaction is not None and last_interaction is not None:
+        average_gap = (last_interaction - first_interaction).total_seconds() / 86400 / (interaction_count - 1)
+        return int(min(max(round(average_gap), MIN_CADENCE_DAYS), MAX_CADENCE_DAYS))
+    return DEFAULT_CADENCE_DAYS
+
+
+def _upsert(db: Session, rows: List[dict]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(ContactStats)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(ContactStats)
+    else:
+        raise NotImplementedError(f"contact_stats upserts are not implemented for {dialect}")
+    # cadence_days belongs to the user and is never overwritten here
+    statement = statement.on_conflict_do_update(
+        index_elements=[ContactStats.contact_id],
+        set_={
+            name: statement.excluded[name]
+            for name in (
+                "interaction_count", "first_interaction", "last_interaction",
+                "effective_cadence_days", "due_at", "updated_at",
+            )
+        },
+    )
+    db.execute(statement, rows)
+
+
+def refresh_contact_stats(db: Session, contact_ids: Iterable[int]) -> None:
+    """
+    Recompute the contact_stats rows of contact_ids from their notes.
+    """
+    contact_ids = set(contact_ids)
+    if not contact_ids:
+        return
+
+    aggregates = db.execute(
+        select(
+            Contact.id,
+            Contact.created_at,
+            ContactStats.cadence_days,
+            func.count(Note.id),
+            func.min(Note.interaction_date),
+            func.max(Note.interaction_date),
+        )
+        .select_from(Contact)
+        .outerjoin(ContactStats, ContactStats.contact_id == Contact.id)
+        .outerjoin(contact_notes, contact_notes.c.contact_id == Contact.id)
+        .outerjoin(Note, Note.id == contact_notes.c.note_id)
+        .where(Contact.id.in_(contact_ids))
+        .group_by(Contact.id, Contact.created_at, ContactStats.cadence_days)
+    ).all()
+
+    now = datetime.utcnow()
+    rows = []
+    for contact_id, created_at, cadence_days, count, first, last in aggregates:
+        cadence = effective_cadence(cadence_days, count, first, last)
+        anchor = last or created_at or now
+        rows.append({
+            "contact_id": contact_id,
+            "interaction_count": count,
+            "first_interaction": first,
+            "last_interaction": last,
+            "effective_cadence_days": cadence,
+            "due_at": anchor + timedelta(days=cadence),
+            "updated_at": now,
+        })
+    if rows:
+        _upsert(db, rows)
+
+    # Contacts that no longer exist
+    missing = contact_ids - {row["contact_id"] for row in rows}
+    if missing:
+        db.execute(delete(ContactStats).where(ContactStats.contact_id.in_(missing)))
+
+
+def _due_contact(contact: Contact, stats: ContactStats, now: datetime) -> DueContact:
+    return DueContact(
+        **ContactSchema.model_validate(contact).model_dump(),
+        cadence_days=stats.cadence_days,
+        effective_cadence_days=stats.effective_cadence_days,
+        interaction_count=stats.interaction_count,
+        last_interaction=stats.last_interaction,
+        due_at=stats.due_at,
+        overdue_days=round((now - stats.due_at).total_seconds() / 86400, 2),
+    )
+
+
+def get_due_contacts(
+    db: Session,
+    limit: int = 50,
+    skip: int = 0,
+    include_upcoming: bool = False,
+) -> List[DueContact]:
+    """
+    Contacts ordered from most to least overdue.
+
+    Only contacts already due unless include_upcoming is set.
+    """
+    now = datetime.utcnow()
+    query = (
+        db.query(Contact, ContactStats)
+        .join(ContactStats, ContactStats.contact_id == Contact.id)
+        .order_by(ContactStats.due_at, ContactStats.contact_id)
+    )
+    if not include_upcoming:
+        query = query.filter(ContactStats.due_at <= now)
+    return [_due_contact(contact, stats, now) for contact, stats in query.offset(skip).limit(limit)]
+
+
+def set_cadence(db: Session, contact_id: int, cadence_days: Optional[int]) -> DueContact:
+    """
+    Set (or with None, clear) a contact's desired cadence.
+    """
+    contact = db.get(Contact, contact_id)
+    if contact is None:
+        raise HTTPException(status_code=404, detail="Contact not found")
+
+    statement = update(ContactStats).where(ContactStats.contact_id == contact_id).values(cadence_days=cadence_days)
+    if db.execute(statement).rowcount == 0:
+        # No stats row yet, create it first
+        refresh_contact_stats(db, [contact_id])
+        db.execute(statement)
+    refresh_contact_stats(db, [contact_id])
+    db.commit()
+
+    stats = db.get(ContactStats, contact_id, populate_existing=True)
+    return _due_contact(contact, stats, datetime.utcnow())
+
+
+# Maintenance, in the transaction of the change
+
+@subscribe("contact.created")
+@subscribe("contact.deleted")
+def _contacts_changed(db, contact_ids):
+    refresh_contact_stats(db, contact_ids)
+
+@subscribe("link.added")
+@subscribe("link.removed")
+def _links_changed(db, links):
+    refresh_contact_stats(db, (contact_id for contact_id, _ in links))
+
+@subscribe("note.updated")
+def _notes_changed(db, note_ids):
+    # The interaction date may have moved
+    contact_ids = db.execute(
+        select(contact_notes.c.contact_id).where(contact_notes.c.note_id.in_(note_ids))
+    ).scalars().all()
+    refresh_contact_stats(db, contact_ids)
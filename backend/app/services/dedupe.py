@@ -0,0 +1,255 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.contact import Contact
+from app.models.contact_block_key import ContactBlockKey
+from app.schemas.contact import DuplicateCandidate
+from app.services.events import subscribe
+
+# Duplicate contacts, found without comparing every pair.
+#
+# Each contact gets a few blocking keys, kept in contact_block_keys:
+#
+#   name:<soundex of first name><soundex of last name>   first name with nicknames
+#                                                        resolved, codes sorted so a
+#                                                        swapped first/last matches
+#   linkedin:<profile slug>                              normalized linkedin_url
+#
+# Candidate pairs are the contacts sharing a key, so the work grows with
+# the size of the blocks rather than with n². Blocks larger than
+# MAX_BLOCK_SIZE (a very common name) are skipped. Candidates are then
+# scored on name similarity, city and LinkedIn profile.
+
+MAX_BLOCK_SIZE = 50
+DEFAULT_MIN_SCORE = 0.8
+
+# Common English nickname -> given name
+NICKNAMES = {
+    "abby": "abigail", "al": "albert", "alex": "alexander", "andy": "andrew", "ben": "benjamin",
+    "beth": "elizabeth", "bill": "william", "billy": "william", "bob": "robert", "bobby": "robert",
+    "cathy": "catherine", "chris": "christopher", "chuck": "charles", "dan": "daniel", "danny": "daniel",
+    "dave": "david", "dick": "richard", "ed": "edward", "eddie": "edward", "fred": "frederick",
+    "greg": "gregory", "jack": "john", "jake": "jacob", "jim": "james", "jimmy": "james", "joe": "joseph",
+    "johnny": "john", "jon": "jonathan", "kate": "katherine", "kathy": "katherine", "katie": "katherine",
+    "ken": "kenneth", "larry": "lawrence", "liz": "elizabeth", "maggie": "margaret", "matt": "matthew",
+    "meg": "margaret", "mike": "michael", "nate": "nathan", "nick": "nicholas", "pat": "patrick",
+    "peggy": "margaret", "pete": "peter", "rich": "richard", "rick": "richard", "rob": "robert",
+    "ron": "ronald", "sam": "samuel", "steve": "stephen", "sue": "susan", "ted": "edward",
+    "tim": "timothy", "tom": "thomas", "tony": "anthony", "will": "william", "zach": "zachary",
+}
+
+_SOUNDEX_CODES = {
+    letter: digit
+    for digit, letters in (("1", "bfpv"), ("2", "cgjkqsxz"), ("3", "dt"), ("4", "l"), ("5", "mn"), ("6", "r"))
+    for letter in letters
+}
+
+_LINKEDIN_RE = re.compile(r"linkedin\.com/(?:in|pub)/([^/?#]+)", re.IGNORECASE)
+_SLUG_RE = re.compile(r"^[\w-]+$")
+
+
+def fold(value: Optional[str]) -> str:
+    """
+    Lowercase ASCII letters of a name: "Zoë O'Brien" -> "zoeobrien".
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if "a" <= c.lower() <= "z").lower()
+
+
+def given_name(first_name: Optional[str]) -> str:
+    folded = fold(first_name)
+    return NICKNAMES.get(folded, folded)
+
+
+def soundex(name: str) -> str:
+    """
+    American Soundex code of a folded name, "" for an empty one.
+    """
+    if not name:
+        return ""
+    code = name[0].upper()
+    previous = _SOUNDEX_CODES.get(name[0], "")
+    for letter in name[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code
+        if letter not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def linkedin_slug(url: Optional[str]) -> str:
+    """
+    Profile slug of a LinkedIn URL in any of its usual forms, or "".
+
+    "https://www.linkedin.com/in/Ada-Lovelace/?trk=x", "linkedin.com/in/ada-lovelace"
+    and a bare "ada-lovelace" all give "ada-lovelace".
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    match = _LINKEDIN_RE.search(url)
+    if match:
+        return match.group(1).lower()
+    if _SLUG_RE.match(url):
+        return url.lower()
+    return ""
+
+
+def blocking_keys(first_name: str, last_name: str, nickname: Optional[str], linkedin_url: Optional[str]) -> Set[str]:
+    keys = set()
+    last_code = soundex(fold(last_name))
+    for name in (first_name, nickname):
+        first_code = soundex(given_name(name))
+        if first_code and last_code:
+            keys.add("name:" + "".join(sorted((first_code, last_code))))
+    slug = linkedin_slug(linkedin_url)
+    if slug:
+        keys.add("linkedin:" + slug[:70])
+    return keys
+
+
+def score(a: Contact, b: Contact) -> Tuple[float, List[str]]:
+    """
+    How likely two contacts are the same person, from 0 to 1, and why.
+    """
+    slug_a, slug_b = linkedin_slug(a.linkedin_url), linkedin_slug(b.linkedin_url)
+    if slug_a and slug_a == slug_b:
+        return 1.0, ["same LinkedIn profile"]
+
+    reasons = []
+
+    def similarity(x: str, y: str) -> float:
+        return SequenceMatcher(None, x, y).ratio() if x and y else 0.0
+
+    first_a, first_b = given_name(a.first_name), given_name(b.first_name)
+    last_a, last_b = fold(a.last_name), fold(b.last_name)
+    straight = 0.45 * similarity(first_a, first_b) + 0.45 * similarity(last_a, last_b)
+    swapped = 0.45 * similarity(first_a, last_b) + 0.45 * similarity(last_a, first_b)
+    value = max(straight, swapped)
+    if swapped > straight:
+        reasons.append("first and last name swapped")
+    elif first_a == first_b and fold(a.first_name) != fold(b.first_name):
+        reasons.append("nickname of the same first name")
+    if (first_a, last_a) == (first_b, last_b) or (first_a, last_a) == (last_b, first_b):
+        reasons.append("same name")
+    else:
+        reasons.append("similar names")
+
+    if a.city and b.city:
+        if fold(a.city) == fold(b.city):
+            value += 0.1
+            reasons.append("same city")
+        else:
+            value -= 0.1
+    if slug_a and slug_b:
+        # Two different profiles
+        value -= 0.3
+    return round(max(0.0, min(value, 1.0)), 3), reasons
+
+
+def refresh_block_keys(db: Session, contact_ids: Iterable[int]) -> None:
+    """
+    Bring the blocking keys of contact_ids up to date.
+
+    Contacts are read with their current keys in one query and only keys
+    that changed are written, so the frequent updates that do not touch a
+    name (last_contacted) cost a single SELECT.
+    """
+    contact_ids = set(contact_ids)
+    if not contact_ids:
+        return
+    rows = db.execute(
+        select(
+            Contact.id, Contact.first_name, Contact.last_name, Contact.nickname, Contact.linkedin_url,
+            ContactBlockKey.key,
+        )
+        .outerjoin(ContactBlockKey, ContactBlockKey.contact_id == Contact.id)
+        .where(Contact.id.in_(contact_ids))
+    ).all()
+
+    current: Dict[int, Set[str]] = {}
+    wanted: Dict[int, Set[str]] = {}
+    for contact_id, first_name, last_name, nickname, linkedin_url, key in rows:
+        if contact_id not in wanted:
+            wanted[contact_id] = blocking_keys(first_name, last_name, nickname, linkedin_url)
+            current[contact_id] = set()
+        if key is not None:
+            current[contact_id].add(key)
+
+    stale = [contact_id for contact_id in wanted if wanted[contact_id] != current[contact_id]]
+    if not stale:
+        return
+    db.execute(delete(ContactBlockKey).where(ContactBlockKey.contact_id.in_(stale)))
+    keys = [{"contact_id": contact_id, "key": key} for contact_id in stale for key in sorted(wanted[contact_id])]
+    if keys:
+        db.execute(insert(ContactBlockKey), keys)
+
+
+def candidate_pairs(db: Session) -> Set[Tuple[int, int]]:
+    """
+    (lower id, higher id) of every two contacts sharing a blocking key.
+    """
+    sizes = func.count(ContactBlockKey.contact_id)
+    blocks = (
+        select(ContactBlockKey.key)
+        .group_by(ContactBlockKey.key)
+        .having(sizes > 1, sizes <= MAX_BLOCK_SIZE)
+    )
+    rows = db.execute(
+        select(ContactBlockKey.key, ContactBlockKey.contact_id)
+        .where(ContactBlockKey.key.in_(blocks))
+        .order_by(ContactBlockKey.key, ContactBlockKey.contact_id)
+    ).all()
+
+    members: Dict[str, List[int]] = {}
+    for key, contact_id in rows:
+        members.setdefault(key, []).append(contact_id)
+    return {pair for ids in members.values() for pair in combinations(ids, 2)}
+
+
+def find_duplicates(db: Session, min_score: float = DEFAULT_MIN_SCORE, limit: int = 100) -> List[DuplicateCandidate]:
+    """
+    Likely duplicate pairs, most likely first.
+    """
+    pairs = candidate_pairs(db)
+    contact_ids = sorted({contact_id for pair in pairs for contact_id in pair})
+    contacts = {}
+    for start in range(0, len(contact_ids), 1000):
+        chunk = contact_ids[start:start + 1000]
+        contacts.update((c.id, c) for c in db.query(Contact).filter(Contact.id.in_(chunk)))
+
+    candidates = []
+    for a, b in pairs:
+        value, reasons = score(contacts[a], contacts[b])
+        if value >= min_score:
+            candidates.append((value, a, b, reasons))
+    candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return [
+        DuplicateCandidate(contact=contacts[a], duplicate=contacts[b], score=value, reasons=reasons)
+        for value, a, b, reasons in candidates[:limit]
+    ]
+
+
+# Maintenance, in the transaction of the change
+
+@subscribe("contact.created")
+@subscribe("contact.updated")
+def _contacts_changed(db, contact_ids):
+    refresh_block_keys(db, contact_ids)
+
+
+@subscribe("contact.deleted")
+def _contacts_deleted(db, contact_ids):
+    db.execute(delete(ContactBlockKey).where(ContactBlockKey.contact_id.in_(contact_ids)))
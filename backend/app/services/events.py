@@ -0,0 +1,59 @@
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Domain events emitted by the CRUD layer after a change has been flushed:
+#
+#   contact.created / contact.updated / contact.deleted   contact_ids=[...]
+#   note.created / note.updated / note.deleted            note_ids=[...]
+#   note.changing                                          note_ids=[...]
+#   link.added / link.removed                              links=[(contact_id, note_id), ...]
+#
+# note.changing comes before a note's interaction date or type is changed
+# and before it is deleted, while its rows still hold the old values.
+#
+# Listeners registered with after_commit=False run immediately with the
+# session, so whatever they write commits or rolls back with the change.
+# after_commit=True listeners run without a session once the transaction has
+# committed (for in-memory state) and are dropped if it rolls back.
+
+_listeners: Dict[str, List[Callable]] = defaultdict(list)
+_after_commit_listeners: Dict[str, List[Callable]] = defaultdict(list)
+
+_PENDING_KEY = "pending_events"
+
+
+def subscribe(event_name: str, after_commit: bool = False):
+    """
+    Decorator registering a listener for event_name.
+    """
+    def decorator(fn):
+        registry = _after_commit_listeners if after_commit else _listeners
+        registry[event_name].append(fn)
+        return fn
+    return decorator
+
+
+def emit(db: Session, event_name: str, **payload) -> None:
+    """
+    Notify listeners of a change made in db's current transaction.
+    """
+    for listener in _listeners[event_name]:
+        listener(db, **payload)
+    if _after_commit_listeners[event_name]:
+        db.info.setdefault(_PENDING_KEY, []).append((event_name, payload))
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_listeners(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    for event_name, payload in pending or ():
+        for listener in _after_commit_listeners[event_name]:
+            listener(**payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,141 @@
+import csv
+import io
+from datetime import date, datetime
+from typing import AsyncIterator, Optional
+
+import orjson
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.database.connection import close_db, stream_partitions
+from app.models.contact import Contact
+from app.models.note import Note
+from app.models.contact_note import contact_notes
+from app.services.events import subscribe
+
+# Rows fetched from the database per batch
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_ENTITIES = ("contacts", "notes", "links")
+
+# Column names can be str subclasses (quoted_name), which orjson only takes
+# as keys with OPT_NON_STR_KEYS
+_NDJSON_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+# Record type written in NDJSON for each entity
+RECORD_TYPES = {"contacts": "contact", "notes": "note", "links": "link"}
+
+# Notes created in the current transaction, whose links need no bump
+_CREATED_KEY = "export_created_notes"
+
+
+def _changed_since(model, since: datetime):
+    return func.coalesce(model.updated_at, model.created_at) >= since
+
+
+def export_statement(entity: str, since: Optional[datetime] = None) -> Select:
+    """
+    Query for one entity of the export, in primary key order.
+
+    With since, only contacts/notes created or updated at or after since are
+    included, plus the links of those notes and contacts; linking or
+    unlinking a contact counts as an update of the note. Deleted rows and
+    removed links are not in an incremental export, GET /changes has them.
+    """
+    if entity == "contacts":
+        statement = select(Contact.__table__).order_by(Contact.id)
+        if since is not None:
+            statement = statement.where(_changed_since(Contact, since))
+        return statement
+
+    if entity == "notes":
+        statement = select(Note.__table__).order_by(Note.id)
+        if since is not None:
+            statement = statement.where(_changed_since(Note, since))
+        return statement
+
+    if entity == "links":
+        statement = select(contact_notes.c.contact_id, contact_notes.c.note_id).order_by(
+            contact_notes.c.note_id, contact_notes.c.contact_id
+        )
+        if since is not None:
+            changed_notes = select(Note.id).where(_changed_since(Note, since))
+            changed_contacts = select(Contact.id).where(_changed_since(Contact, since))
+            statement = statement.where(
+                or_(
+                    contact_notes.c.note_id.in_(changed_notes),
+                    contact_notes.c.contact_id.in_(changed_contacts),
+                )
+            )
+        return statement
+
+    raise ValueError(f"Unknown export entity: {entity}")
+
+
+# contact_notes has no timestamps, so a link change marks its note updated
+# and the link is exported with the note
+
+@subscribe("note.created")
+def _notes_created(db, note_ids):
+    db.info.setdefault(_CREATED_KEY, set()).update(note_ids)
+
+@subscribe("link.added")
+@subscribe("link.removed")
+def _links_changed(db, links):
+    created = db.info.get(_CREATED_KEY, set())
+    note_ids = {note_id for _, note_id in links} - created
+    if note_ids:
+        db.execute(update(Note).where(Note.id.in_(note_ids)).values(updated_at=datetime.utcnow()))
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_created(session):
+    session.info.pop(_CREATED_KEY, None)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def export_ndjson(db, since: Optional[datetime] = None) -> AsyncIterator[bytes]:
+    """
+    Stream contacts, notes and links as NDJSON, one batch of lines at a time.
+
+    Every line is an object with a "type" of contact, note or link. Closes
+    the session when done, as it outlives the request handler.
+    """
+    try:
+        for entity in EXPORT_ENTITIES:
+            record_type = RECORD_TYPES[entity]
+            async for rows in stream_partitions(db, export_statement(entity, since), EXPORT_BATCH_SIZE):
+                yield b"".join(
+                    orjson.dumps({"type": record_type, **row._mapping}, option=_NDJSON_OPTIONS)
+                    for row in rows
+                )
+    finally:
+        await close_db(db)
+
+
+async def export_csv(db, entity: str, since: Optional[datetime] = None) -> AsyncIterator[bytes]:
+    """
+    Stream one entity as CSV with a header row.
+    """
+    try:
+        statement = export_statement(entity, since)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([column.name for column in statement.selected_columns])
+        yield buffer.getvalue().encode()
+
+        async for rows in stream_partitions(db, statement, EXPORT_BATCH_SIZE):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(value) for value in row] for row in rows)
+            yield buffer.getvalue().encode()
+    finally:
+        await close_db(db)
@@ -0,0 +1,338 @@
+import heapq
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from itertools import combinations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database.replicas import read_primary
+from app.models.contact import Contact
+from app.models.contact_note import contact_notes
+from app.schemas.graph import ContactNetwork, ContactPath, Graph
+from app.services.events import subscribe
+
+# Who knows whom: two contacts are connected when they are in the same note,
+# weighted by the number of notes they share.
+#
+# The adjacency lives in memory in CSR form: a sorted array of contact ids,
+# an array of offsets into one array of neighbour ids and one of weights,
+# 12 bytes per direction of an edge. It is built with one scan of
+# contact_notes on first use. Link events are then applied after commit to
+# an overlay of weight deltas, read together with the arrays and folded
+# into new arrays once it grows past GRAPH_COMPACT_RATIO of the graph, so
+# queries never go back to contact_notes.
+#
+# Each worker keeps its own graph and only sees its own events; it is
+# rebuilt after GRAPH_MAX_AGE_SECONDS to pick up other workers' changes
+# (0 keeps it until the process exits).
+
+GRAPH_MAX_AGE_SECONDS = float(os.getenv("GRAPH_MAX_AGE_SECONDS") or 300)
+GRAPH_COMPACT_RATIO = 0.1
+# Smallest overlay worth compacting, so small graphs are not rebuilt on
+# every change
+MIN_COMPACT_ENTRIES = 1024
+
+
+class ContactGraph:
+    """
+    Weighted co-occurrence graph of contacts, built from (note_id,
+    contact_id) links.
+
+    Safe to use from several threads; nothing in it does I/O.
+    """
+
+    def __init__(self, links: Iterable[Tuple[int, int]]):
+        self._lock = threading.RLock()
+        # Contacts of every note, to know which edges a link change touches
+        self._members: Dict[int, Tuple[int, ...]] = {}
+        for note_id, contact_id in links:
+            self._members[note_id] = self._members.get(note_id, ()) + (contact_id,)
+
+        pairs = Counter()
+        for members in self._members.values():
+            pairs.update(combinations(sorted(members), 2))
+        self._compact(pairs)
+
+    def _compact(self, pairs: Dict[Tuple[int, int], int]) -> None:
+        # pairs: (a, b) with a < b -> weight
+        adjacency = defaultdict(list)
+        for (a, b), weight in pairs.items():
+            if weight > 0:
+                adjacency[a].append((b, weight))
+                adjacency[b].append((a, weight))
+
+        nodes = array("q", sorted(adjacency))
+        offsets = array("q", [0])
+        neighbors = array("q")
+        weights = array("i")
+        for node in nodes:
+            for other, weight in sorted(adjacency[node]):
+                neighbors.append(other)
+                weights.append(weight)
+            offsets.append(len(neighbors))
+
+        self._nodes, self._offsets, self._neighbors, self._weights = nodes, offsets, neighbors, weights
+        # contact id -> {neighbour id: weight delta}, symmetric
+        self._overlay: Dict[int, Dict[int, int]] = defaultdict(dict)
+        self._overlay_entries = 0
+
+    def _pairs(self) -> Dict[Tuple[int, int], int]:
+        return {(a, b): weight for a, b, weight in self.edges()}
+
+    def _add(self, a: int, b: int, delta: int) -> None:
+        for x, y in ((a, b), (b, a)):
+            deltas = self._overlay[x]
+            if y not in deltas:
+                self._overlay_entries += 1
+            deltas[y] = deltas.get(y, 0) + delta
+
+    def _maybe_compact(self) -> None:
+        limit = max(MIN_COMPACT_ENTRIES, GRAPH_COMPACT_RATIO * len(self._neighbors))
+        if self._overlay_entries > limit:
+            self._compact(self._pairs())
+
+    def apply(self, added: bool, links: Iterable[Tuple[int, int]]) -> None:
+        """
+        Apply link.added/link.removed (contact_id, note_id) pairs.
+
+        Idempotent: a link already (or no longer) present is skipped, so
+        events that a fresh build has already seen can be replayed.
+        """
+        with self._lock:
+            for contact_id, note_id in links:
+                members = self._members.get(note_id, ())
+                if (contact_id in members) == added:
+                    continue
+                if added:
+                    self._members[note_id] = members + (contact_id,)
+                else:
+                    members = tuple(m for m in members if m != contact_id)
+                    if members:
+                        self._members[note_id] = members
+                    else:
+                        del self._members[note_id]
+                for other in members:
+                    if other != contact_id:
+                        self._add(contact_id, other, 1 if added else -1)
+            self._maybe_compact()
+
+    def neighbors(self, contact_id: int) -> Dict[int, int]:
+        """
+        Neighbour id -> weight of a contact.
+        """
+        with self._lock:
+            result = {}
+            i = bisect_left(self._nodes, contact_id)
+            if i < len(self._nodes) and self._nodes[i] == contact_id:
+                start, end = self._offsets[i], self._offsets[i + 1]
+                result = dict(zip(self._neighbors[start:end], self._weights[start:end]))
+            for other, delta in self._overlay.get(contact_id, {}).items():
+                weight = result.get(other, 0) + delta
+                if weight > 0:
+                    result[other] = weight
+                else:
+                    result.pop(other, None)
+            return result
+
+    def edges(self) -> Iterator[Tuple[int, int, int]]:
+        """
+        Every edge once, as (a, b, weight) with a < b.
+        """
+        with self._lock:
+            nodes = set(self._nodes) | set(self._overlay)
+            edges = [
+                (a, b, weight)
+                for a in sorted(nodes)
+                for b, weight in self.neighbors(a).items()
+                if a < b
+            ]
+        return iter(edges)
+
+    def shortest_path(self, source: int, target: int, max_depth: int) -> Optional[List[int]]:
+        """
+        Fewest-hop path from source to target, or None.
+
+        Stronger connections are tried first, so among equally short paths
+        the one through the strongest first hops wins.
+        """
+        if source == target:
+            return [source]
+        parents = {source: None}
+        queue = deque([(source, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if depth >= max_depth:
+                continue
+            for other, _ in sorted(self.neighbors(node).items(), key=lambda item: (-item[1], item[0])):
+                if other in parents:
+                    continue
+                parents[other] = node
+                if other == target:
+                    path = [target]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return path[::-1]
+                queue.append((other, depth + 1))
+        return None
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "contacts": len(self._nodes),
+                "edges": len(self._neighbors) // 2,
+                "notes": len(self._members),
+                "overlay_entries": self._overlay_entries,
+            }
+
+
+_lock = threading.Lock()
+_graph: Optional[ContactGraph] = None
+_built_at = 0.0
+# Events that arrive while a graph is being built, one list per build
+_collectors: List[list] = []
+
+
+def get_graph(db: Session) -> ContactGraph:
+    """
+    The current graph, (re)built from contact_notes on the primary when
+    missing or too old.
+
+    No lock is held while reading the database, so an async handler never
+    blocks the event loop; concurrent builds just race and the last wins.
+    """
+    global _graph, _built_at
+    with _lock:
+        if _graph is not None and (not GRAPH_MAX_AGE_SECONDS or time.monotonic() - _built_at < GRAPH_MAX_AGE_SECONDS):
+            return _graph
+        collector = []
+        _collectors.append(collector)
+    read_primary(db)
+    try:
+        links = db.execute(select(contact_notes.c.note_id, contact_notes.c.contact_id)).all()
+        graph = ContactGraph(links)
+    except BaseException:
+        with _lock:
+            _collectors.remove(collector)
+        raise
+    with _lock:
+        _collectors.remove(collector)
+        # Changes committed during the scan may or may not be in it
+        for added, links in collector:
+            graph.apply(added, links)
+        _graph, _built_at = graph, time.monotonic()
+        return graph
+
+
+def reset_graph() -> None:
+    """
+    Drop the graph; the next query rebuilds it.
+    """
+    global _graph
+    with _lock:
+        _graph = None
+
+
+def graph_status() -> Dict:
+    with _lock:
+        graph, built_at = _graph, _built_at
+    if graph is None:
+        return {"built": False}
+    return {"built": True, "age_seconds": round(time.monotonic() - built_at, 1), **graph.status()}
+
+
+@subscribe("link.added", after_commit=True)
+def _links_added(links):
+    _apply(True, links)
+
+@subscribe("link.removed", after_commit=True)
+def _links_removed(links):
+    _apply(False, links)
+
+def _apply(added: bool, links):
+    with _lock:
+        for collector in _collectors:
+            collector.append((added, links))
+        if _graph is not None:
+            _graph.apply(added, links)
+
+
+# Queries
+
+def _contacts(db: Session, contact_ids: Iterable[int]) -> Dict[int, Dict]:
+    rows = db.execute(
+        select(Contact.id, Contact.first_name, Contact.last_name, Contact.nickname)
+        .where(Contact.id.in_(set(contact_ids)))
+    ).mappings()
+    return {row["id"]: dict(row) for row in rows}
+
+
+def get_network(db: Session, contact_id: int, min_weight: int = 1, limit: int = 100) -> ContactNetwork:
+    """
+    A contact's connections, strongest first.
+    """
+    neighbors = get_graph(db).neighbors(contact_id)
+    strongest = heapq.nsmallest(
+        limit,
+        ((other, weight) for other, weight in neighbors.items() if weight >= min_weight),
+        key=lambda item: (-item[1], item[0]),
+    )
+    contacts = _contacts(db, [contact_id] + [other for other, _ in strongest])
+    if contact_id not in contacts:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return ContactNetwork(
+        contact=contacts[contact_id],
+        connections=[
+            {"contact": contacts[other], "weight": weight}
+            for other, weight in strongest
+            if other in contacts
+        ],
+    )
+
+
+def get_graph_view(db: Session, min_weight: int = 1, limit: int = 1000) -> Graph:
+    """
+    The limit strongest edges of the graph and the contacts they join.
+    """
+    graph = get_graph(db)
+    degrees = Counter()
+    candidates = []
+    for a, b, weight in graph.edges():
+        degrees[a] += 1
+        degrees[b] += 1
+        if weight >= min_weight:
+            candidates.append((a, b, weight))
+    strongest = heapq.nsmallest(limit, candidates, key=lambda edge: (-edge[2], edge[0], edge[1]))
+
+    contacts = _contacts(db, (node for a, b, _ in strongest for node in (a, b)))
+    return Graph(
+        nodes=[{**contact, "degree": degrees[contact_id]} for contact_id, contact in sorted(contacts.items())],
+        edges=[
+            {"source": a, "target": b, "weight": weight}
+            for a, b, weight in strongest
+            if a in contacts and b in contacts
+        ],
+    )
+
+
+def find_path(db: Session, source_id: int, target_id: int, max_depth: int = 6) -> ContactPath:
+    """
+    How source knows target: the shortest chain of shared notes.
+    """
+    graph = get_graph(db)
+    path = graph.shortest_path(source_id, target_id, max_depth)
+    contacts = _contacts(db, path or (source_id, target_id))
+    if source_id not in contacts or target_id not in contacts:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    if path is None or any(contact_id not in contacts for contact_id in path):
+        raise HTTPException(status_code=404, detail=f"No path within {max_depth} hops")
+    return ContactPath(
+        contacts=[contacts[contact_id] for contact_id in path],
+        weights=[graph.neighbors(a)[b] for a, b in zip(path, path[1:])],
+    )
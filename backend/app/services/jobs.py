@@ -0,0 +1,248 @@
+import logging
+import os
+import socket
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# Background jobs: rows in the jobs table, run by a pool of worker threads
+# in each app process.
+#
+# enqueue() adds a job in the caller's transaction and the workers are woken
+# once it commits. A worker claims the oldest due job with one UPDATE ...
+# RETURNING (SKIP LOCKED on PostgreSQL, so several processes can share the
+# table) and runs its handler in a session of its own; the handler's writes
+# and the job's success are committed together. A failing job is retried
+# with exponential backoff up to its max_attempts, then marked failed. A job
+# left running by a crashed process is claimed again once its lease expires.
+#
+# JOBS_WORKERS bounds the jobs running at once per process; a handler can
+# also limit its own kind with concurrency=.
+
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS") or 2)
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS") or 3)
+JOBS_RETRY_SECONDS = float(os.getenv("JOBS_RETRY_SECONDS") or 5)
+JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS") or 1)
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS") or 300)
+
+# Response header carrying the id of a job queued by a request
+JOB_ID_HEADER = "X-Job-Id"
+
+_ENQUEUED_KEY = "jobs_enqueued"
+
+
+class JobHandler:
+    def __init__(self, kind: str, fn: Callable, concurrency: Optional[int], max_attempts: Optional[int]):
+        self.kind = kind
+        self.fn = fn
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+
+
+_handlers: Dict[str, JobHandler] = {}
+# Claims are serialized within a process so concurrency limits hold
+_claim_lock = threading.Lock()
+_running: Counter = Counter()
+# Set when a job is committed, to wake idle workers
+_wakeup = threading.Event()
+
+
+def job_handler(kind: str, concurrency: Optional[int] = None, max_attempts: Optional[int] = None):
+    """
+    Decorator registering fn(db, **payload) as the handler of kind.
+
+    The handler's return value (JSON) is stored as the job's result. At most
+    concurrency jobs of the kind run at once in a process.
+    """
+    def decorator(fn):
+        _handlers[kind] = JobHandler(kind, fn, concurrency, max_attempts)
+        return fn
+    return decorator
+
+
+def enqueue(db: Session, kind: str, max_attempts: Optional[int] = None, **payload) -> Job:
+    """
+    Add a job in db's current transaction; it runs once that commits.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"No job handler registered for {kind!r}")
+    job = Job(
+        kind=kind,
+        payload=payload,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or _handlers[kind].max_attempts or JOBS_MAX_ATTEMPTS,
+        run_after=datetime.utcnow(),
+    )
+    db.add(job)
+    db.flush()
+    db.info[_ENQUEUED_KEY] = True
+    return job
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session):
+    if session.info.pop(_ENQUEUED_KEY, False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session):
+    session.info.pop(_ENQUEUED_KEY, None)
+
+
+def get_job(db: Session, job_id: int) -> Job:
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _claimable(now: datetime):
+    lease_cutoff = now - timedelta(seconds=JOBS_LEASE_SECONDS)
+    return or_(
+        and_(Job.status == "queued", Job.run_after <= now),
+        and_(Job.status == "running", Job.locked_at < lease_cutoff),
+    )
+
+
+def _available_kinds() -> List[str]:
+    return [
+        kind for kind, handler in _handlers.items()
+        if handler.concurrency is None or _running[kind] < handler.concurrency
+    ]
+
+
+def _claim(db: Session, worker: str):
+    with _claim_lock:
+        kinds = _available_kinds()
+        if not kinds:
+            return None
+        now = datetime.utcnow()
+        candidate = (
+            select(Job.id)
+            .where(_claimable(now), Job.kind.in_(kinds))
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            candidate = candidate.with_for_update(skip_locked=True)
+        # Re-checking the status makes the claim safe without row locks
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == candidate.scalar_subquery(), _claimable(now))
+            .values(status="running", locked_by=worker, locked_at=now, attempts=Job.attempts + 1)
+            .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        ).first()
+        db.commit()
+        if claimed is not None:
+            _running[claimed.kind] += 1
+        return claimed
+
+
+def run_next(db: Session, worker: Optional[str] = None) -> bool:
+    """
+    Claim and run one due job. Returns False when there was none.
+    """
+    claimed = _claim(db, worker or f"{socket.gethostname()}:{os.getpid()}")
+    if claimed is None:
+        return False
+
+    job_id, kind, payload, attempts, max_attempts = claimed
+    try:
+        if attempts > max_attempts:
+            # Claimed again after its worker was lost on the last attempt
+            raise RuntimeError("worker lost while running the last attempt")
+        result = _handlers[kind].fn(db, **payload)
+        db.execute(
+            update(Job).where(Job.id == job_id)
+            .values(status="succeeded", result=result, last_error=None, finished_at=datetime.utcnow())
+        )
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        error = f"{type(exc).__name__}: {exc}"
+        now = datetime.utcnow()
+        if attempts < max_attempts:
+            logger.warning("Job %s (%s) failed, attempt %s of %s: %s", job_id, kind, attempts, max_attempts, error)
+            values = {
+                "status": "queued",
+                "run_after": now + timedelta(seconds=JOBS_RETRY_SECONDS * 2 ** (attempts - 1)),
+            }
+        else:
+            logger.error("Job %s (%s) failed after %s attempts: %s", job_id, kind, attempts, error)
+            values = {"status": "failed", "finished_at": now}
+        db.execute(update(Job).where(Job.id == job_id).values(last_error=error, locked_at=None, **values))
+        db.commit()
+    finally:
+        with _claim_lock:
+            _running[kind] -= 1
+    return True
+
+
+def run_pending(db: Session, worker: Optional[str] = None) -> int:
+    """
+    Run due jobs until there are none left; returns how many ran.
+    """
+    count = 0
+    while run_next(db, worker):
+        count += 1
+    return count
+
+
+class JobWorkerPool:
+    """
+    Threads running jobs with sessions from session_factory.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], workers: int = JOBS_WORKERS,
+                 poll_seconds: float = JOBS_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stopping.clear()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{prefix}:{i}",), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Stop taking jobs and wait for the running ones to finish.
+        """
+        self._stopping.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, worker: str) -> None:
+        while not self._stopping.is_set():
+            try:
+                with self.session_factory() as db:
+                    ran = run_next(db, worker)
+            except Exception:
+                logger.exception("Job worker %s failed to claim a job", worker)
+                ran = False
+            if not ran and not self._stopping.is_set():
+                _wakeup.wait(self.poll_seconds)
+                _wakeup.clear()
+
+    def status(self) -> Dict:
+        with _claim_lock:
+            running = {kind: count for kind, count in _running.items() if count}
+        return {"workers": len(self._threads), "running": running}
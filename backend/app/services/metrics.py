@@ -0,0 +1,140 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# Request metrics in the Prometheus text format (GET /metrics). They are
+# kept per process: with several uvicorn workers each one reports its own
+# and the scraper sees whichever worker answered, so scrape every worker
+# (or run one) when the numbers matter.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the request duration histogram, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class RequestMetrics:
+    """
+    Counters and histograms of the requests seen by ProfilingMiddleware.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = defaultdict(int)
+            self._duration_buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+            self._duration_sum = defaultdict(float)
+            self._duration_count = defaultdict(int)
+            self._db_seconds = defaultdict(float)
+            self._db_statements = defaultdict(int)
+            self._db_rows = defaultdict(int)
+            self._n_plus_one = defaultdict(int)
+            self._slow_profiles = 0
+
+    def observe(self, method, route, status, seconds, db_seconds, statements, rows):
+        route_labels = (("method", method), ("route", route))
+        with self._lock:
+            self._requests[route_labels + (("status", str(status)),)] += 1
+            buckets = self._duration_buckets[route_labels]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            self._duration_sum[route_labels] += seconds
+            self._duration_count[route_labels] += 1
+            self._db_seconds[route_labels] += db_seconds
+            self._db_statements[route_labels] += statements
+            self._db_rows[route_labels] += rows
+
+    def record_n_plus_one(self, method, route):
+        with self._lock:
+            self._n_plus_one[(("method", method), ("route", route))] += 1
+
+    def record_slow_profile(self):
+        with self._lock:
+            self._slow_profiles += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            lines = []
+            lines += _family(
+                "crm_http_requests_total", "counter", "HTTP requests handled", self._requests.items()
+            )
+            lines += [
+                "# HELP crm_http_request_duration_seconds Wall time of HTTP requests",
+                "# TYPE crm_http_request_duration_seconds histogram",
+            ]
+            for labels, buckets in self._duration_buckets.items():
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(
+                        f"crm_http_request_duration_seconds_bucket{_format_labels(labels + (('le', bound),))} {count}"
+                    )
+                lines.append(
+                    f"crm_http_request_duration_seconds_bucket{_format_labels(labels + (('le', '+Inf'),))} "
+                    f"{self._duration_count[labels]}"
+                )
+                lines.append(
+                    f"crm_http_request_duration_seconds_sum{_format_labels(labels)} "
+                    f"{_format_value(self._duration_sum[labels])}"
+                )
+                lines.append(f"crm_http_request_duration_seconds_count{_format_labels(labels)} {self._duration_count[labels]}")
+            lines += _family(
+                "crm_db_query_seconds_total", "counter", "Time spent executing SQL", self._db_seconds.items()
+            )
+            lines += _family(
+                "crm_db_statements_total", "counter", "SQL statements executed", self._db_statements.items()
+            )
+            lines += _family(
+                "crm_db_rows_total", "counter", "ORM rows loaded plus rows written", self._db_rows.items()
+            )
+            lines += _family(
+                "crm_n_plus_one_total", "counter", "Requests flagged with an N+1 query pattern",
+                self._n_plus_one.items()
+            )
+            lines += _family(
+                "crm_slow_request_profiles_total", "counter", "Profiles captured for slow requests",
+                [((), self._slow_profiles)]
+            )
+            return lines
+
+
+def _family(name: str, metric_type: str, help_text: str, samples: Iterable[Tuple[Labels, object]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+    return lines
+
+
+def gauge_lines(prefix: str, help_text: str, values: Dict[str, object], labels: Labels = ()) -> List[str]:
+    """
+    One gauge per numeric entry of a status dict such as pool_status().
+    """
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"{prefix}_{key}"
+        lines += _family(name, "gauge", f"{help_text}: {key}", [(labels, value)])
+    return lines
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.fields import Fields, partial_model
+from app.models.contact import Contact
+from app.models.note import Note
+from app.models.contact_note import contact_notes
+from app.schemas.note import NoteContact, NoteWithContacts
+
+
+def load_contact_ids(db: Session, note_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """
+    Map each note id to its contact ids with one query on contact_notes.
+    """
+    note_ids = list(note_ids)
+    contact_ids = defaultdict(list)
+    if not note_ids:
+        return contact_ids
+
+    rows = db.execute(
+        select(contact_notes.c.note_id, contact_notes.c.contact_id)
+        .where(contact_notes.c.note_id.in_(note_ids))
+        .order_by(contact_notes.c.note_id, contact_notes.c.contact_id)
+    )
+    for note_id, contact_id in rows:
+        contact_ids[note_id].append(contact_id)
+    return contact_ids
+
+
+def load_contact_summaries(db: Session, note_ids: Iterable[int]) -> Dict[int, List[NoteContact]]:
+    """
+    Map each note id to summaries of its contacts with one joined query.
+    """
+    note_ids = list(note_ids)
+    summaries = defaultdict(list)
+    if not note_ids:
+        return summaries
+
+    rows = db.execute(
+        select(
+            contact_notes.c.note_id,
+            Contact.id,
+            Contact.first_name,
+            Contact.last_name,
+            Contact.nickname,
+        )
+        .join(Contact, Contact.id == contact_notes.c.contact_id)
+        .where(contact_notes.c.note_id.in_(note_ids))
+        .order_by(contact_notes.c.note_id, Contact.id)
+    )
+    for note_id, contact_id, first_name, last_name, nickname in rows:
+        summaries[note_id].append(
+            NoteContact(id=contact_id, first_name=first_name, last_name=last_name, nickname=nickname)
+        )
+    return summaries
+
+
+def with_contacts(
+    db: Session, notes: List[Note], include_contacts: bool = False, fields: Optional[Fields] = None
+) -> List[NoteWithContacts]:
+    """
+    Build NoteWithContacts responses for a page of notes.
+
+    Contact ids (and optionally contact summaries) for the whole page come
+    from a single extra query instead of lazy-loading note.contacts per row.
+
+    With fields (a sparse fieldset, see app/api/fields.py) the responses
+    are of a model with only those fields, the notes' other columns are not
+    read and the contacts are only queried when asked for.
+    """
+    model = NoteWithContacts if fields is None else partial_model(NoteWithContacts, fields)
+    wanted = model.model_fields
+    note_ids = [note.id for note in notes]
+    summaries = contact_ids = None
+    if include_contacts and "contacts" in wanted:
+        summaries = load_contact_summaries(db, note_ids)
+        contact_ids = {note_id: [contact.id for contact in items] for note_id, items in summaries.items()}
+    elif "contact_ids" in wanted:
+        contact_ids = load_contact_ids(db, note_ids)
+
+    columns = [column.key for column in Note.__table__.columns if column.key in wanted]
+    responses = []
+    for note in notes:
+        # Read the column attributes only; note.contacts must not be touched
+        # as that would lazy-load the relationship for every row
+        data = {key: getattr(note, key) for key in columns}
+        if contact_ids is not None and "contact_ids" in wanted:
+            data["contact_ids"] = contact_ids.get(note.id, [])
+        if summaries is not None:
+            data["contacts"] = summaries.get(note.id, [])
+        responses.append(model(**data))
+    return responses
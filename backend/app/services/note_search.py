@@ -0,0 +1,398 @@
+import heapq
+import math
+import operator
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database.replicas import read_primary
+from app.models.note import Note
+from app.schemas.note import NoteSearchResult
+from app.services.events import subscribe
+from app.services.note_contacts import with_contacts
+
+# Full-text search over notes, ranked with BM25.
+#
+# The inverted index lives in memory. Notes are numbered in id order and
+# every term maps to two arrays: the numbers of the notes containing it and
+# how often it occurs in each, 8 bytes per posting. Note lengths are one
+# more array. It is built with one scan of notes (title and content) on
+# first use.
+#
+# Changed notes are not re-read in the transaction that changes them: the
+# note events only mark their ids stale after commit, and the next search
+# reads the stale notes in one query. The new versions go to an overlay
+# (deleted or replaced notes are only flagged in the arrays) that is folded
+# into new arrays once it grows past SEARCH_COMPACT_RATIO of the index.
+#
+# As with the contact graph, each worker keeps its own index and only sees
+# its own events; it is rebuilt after SEARCH_MAX_AGE_SECONDS (0 keeps it
+# until the process exits).
+
+SEARCH_MAX_AGE_SECONDS = float(os.getenv("SEARCH_MAX_AGE_SECONDS") or 300)
+SEARCH_COMPACT_RATIO = 0.1
+# Smallest overlay worth compacting, see app/services/graph.py
+MIN_COMPACT_ENTRIES = 1024
+
+# BM25 term frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOP_WORDS = frozenset("""
+    a about after all also am an and any are as at be been but by can could did do does for from
+    had has have he her him his how i if in into is it its just me my no not of on or our out she
+    so than that the their them then there they this to too up us was we were what when which who
+    will with would you your
+""".split())
+
+_WORD_RE = re.compile(r"\w+")
+# Longest first; only stripped when at least 3 characters remain
+_SUFFIXES = ("ing", "ed", "es", "s", "e")
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """
+    Crude English suffix stripping: "moving", "moved" and "moves" all give
+    "mov". It only has to be the same for notes and queries.
+    """
+    if word.endswith("ss"):
+        return word
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: Optional[str]) -> Iterator[str]:
+    """
+    Stemmed terms of text, lowercased and without accents or stop words.
+    """
+    if not text:
+        return
+    text = text.casefold()
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    for word in _WORD_RE.findall(text):
+        if word not in STOP_WORDS:
+            yield stem(word)
+
+
+def _note_text(title: Optional[str], content: Optional[str]) -> str:
+    return f"{title or ''}\n{content or ''}"
+
+
+class NoteIndex:
+    """
+    BM25 index of notes, built from (note_id, text) in increasing id order.
+
+    Safe to use from several threads; nothing in it does I/O.
+    """
+
+    def __init__(self, notes: Iterable[Tuple[int, str]]):
+        self._lock = threading.RLock()
+        # Sequence number of the change last applied to a note, see update()
+        self._applied: Dict[int, int] = {}
+        self._reset()
+        for note_id, text in notes:
+            self._append(note_id, Counter(tokenize(text)))
+
+    def _reset(self) -> None:
+        # term -> (positions of the notes containing it, occurrences in each)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # Note ids in increasing order and their lengths in terms
+        self._note_ids = array("q")
+        self._lengths = array("i")
+        self._deleted = bytearray()
+        self._deleted_count = 0
+        self._total_length = 0
+        # note id -> term counts of the notes indexed since, by term as well
+        self._added: Dict[int, Counter] = {}
+        self._added_terms: Dict[str, Set[int]] = defaultdict(set)
+
+    def _append(self, note_id: int, terms: Counter) -> None:
+        # note_id must be above every id in the arrays
+        if not terms:
+            return
+        position = len(self._note_ids)
+        length = sum(terms.values())
+        self._note_ids.append(note_id)
+        self._lengths.append(length)
+        self._deleted.append(0)
+        self._total_length += length
+        for term, count in terms.items():
+            entry = self._postings.get(term)
+            if entry is None:
+                entry = self._postings[term] = (array("i"), array("i"))
+            entry[0].append(position)
+            entry[1].append(count)
+
+    def _position(self, note_id: int) -> Optional[int]:
+        i = bisect_left(self._note_ids, note_id)
+        if i < len(self._note_ids) and self._note_ids[i] == note_id:
+            return i
+        return None
+
+    def _replace(self, note_id: int, text: Optional[str]) -> None:
+        terms = self._added.pop(note_id, None)
+        if terms is not None:
+            for term in terms:
+                self._added_terms[term].discard(note_id)
+                if not self._added_terms[term]:
+                    del self._added_terms[term]
+            self._total_length -= sum(terms.values())
+        else:
+            i = self._position(note_id)
+            if i is not None and not self._deleted[i]:
+                self._deleted[i] = 1
+                self._deleted_count += 1
+                self._total_length -= self._lengths[i]
+
+        terms = Counter(tokenize(text))
+        if terms:
+            self._added[note_id] = terms
+            for term in terms:
+                self._added_terms[term].add(note_id)
+            self._total_length += sum(terms.values())
+
+    def _maybe_compact(self) -> None:
+        limit = max(MIN_COMPACT_ENTRIES, SEARCH_COMPACT_RATIO * len(self._note_ids))
+        if len(self._added) + self._deleted_count <= limit:
+            return
+        postings, note_ids, lengths, deleted = self._postings, self._note_ids, self._lengths, self._deleted
+        added, added_terms = self._added, self._added_terms
+
+        # New positions of the notes kept from the arrays (-1 if deleted)
+        # and of the added ones, in id order
+        order = sorted(
+            [(note_ids[i], i) for i in range(len(note_ids)) if not deleted[i]]
+            + [(note_id, -1) for note_id in added]
+        )
+        remap = array("i", [-1]) * len(note_ids)
+        added_positions = {}
+        self._reset()
+        for position, (note_id, old) in enumerate(order):
+            if old >= 0:
+                remap[old] = position
+                length = lengths[old]
+            else:
+                added_positions[note_id] = position
+                length = sum(added[note_id].values())
+            self._note_ids.append(note_id)
+            self._lengths.append(length)
+            self._total_length += length
+        self._deleted = bytearray(len(order))
+
+        for term in postings.keys() | added_terms.keys():
+            docs, counts = array("i"), array("i")
+            for i, count in zip(*postings.get(term, ((), ()))):
+                if remap[i] >= 0:
+                    docs.append(remap[i])
+                    counts.append(count)
+            for note_id in added_terms.get(term, ()):
+                docs.append(added_positions[note_id])
+                counts.append(added[note_id][term])
+            if docs:
+                self._postings[term] = (docs, counts)
+
+    def update(self, changes: Dict[int, Tuple[Optional[str], int]]) -> None:
+        """
+        Apply note_id -> (new text or None when deleted, sequence number).
+
+        A change older than the one already applied to a note is skipped, so
+        two searches refreshing the same note at once cannot go backwards.
+        """
+        with self._lock:
+            for note_id, (text, seq) in changes.items():
+                if self._applied.get(note_id, -1) > seq:
+                    continue
+                self._applied[note_id] = seq
+                self._replace(note_id, text)
+            self._maybe_compact()
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """
+        (note_id, score) of the best matches of query, best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._note_ids) - self._deleted_count + len(self._added)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count
+            norm = BM25_K1 * (1 - BM25_B)
+            per_length = BM25_K1 * BM25_B / average_length
+
+            # Keyed by position in the arrays, and by id for the overlay
+            scores: Dict[int, float] = {}
+            added_scores: Dict[int, float] = defaultdict(float)
+            lengths, deleted = self._lengths, self._deleted
+            for term in terms:
+                docs, counts = self._postings.get(term, ((), ()))
+                added = self._added_terms.get(term, ())
+                # Deleted notes still count towards the document frequency
+                # until the next compaction, as in Lucene
+                frequency = len(docs) + len(added)
+                if not frequency:
+                    continue
+                weight = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5)) * (BM25_K1 + 1)
+                matches = [
+                    (i, weight * tf / (tf + norm + per_length * lengths[i]))
+                    for i, tf in zip(docs, counts)
+                    if not deleted[i]
+                ]
+                if not scores:
+                    scores = dict(matches)
+                else:
+                    for i, value in matches:
+                        scores[i] = scores.get(i, 0.0) + value
+                for note_id in added:
+                    terms_of_note = self._added[note_id]
+                    tf = terms_of_note[term]
+                    length = sum(terms_of_note.values())
+                    added_scores[note_id] += weight * tf / (tf + norm + per_length * length)
+
+            # Positions follow note ids, so -position puts lower ids first on ties
+            best = heapq.nlargest(limit, zip(scores.values(), map(operator.neg, scores.keys())))
+            results = [(self._note_ids[-position], score) for score, position in best] + list(added_scores.items())
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return [(note_id, round(score, 4)) for note_id, score in results[:limit]]
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "notes": len(self._note_ids) - self._deleted_count + len(self._added),
+                "terms": len(self._postings),
+                "overlay_entries": len(self._added) + self._deleted_count,
+            }
+
+
+_lock = threading.Lock()
+_index: Optional[NoteIndex] = None
+_built_at = 0.0
+# note id -> sequence number of its last change not yet read into the index
+_stale: Dict[int, int] = {}
+_seq = 0
+# Changes that arrive while an index is being built, one dict per build
+_collectors: List[Dict[int, int]] = []
+
+# Notes read per query when refreshing stale ones
+REFRESH_CHUNK = 1000
+
+
+def get_index(db: Session) -> NoteIndex:
+    """
+    The current index, (re)built when missing or too old, with the notes
+    changed since the last search read in.
+
+    Like get_graph, no lock is held while reading the database, which is
+    the primary: rows missing from a lagging replica would stay missing.
+    """
+    global _index, _built_at
+    with _lock:
+        index = _index
+        if index is not None and SEARCH_MAX_AGE_SECONDS and time.monotonic() - _built_at >= SEARCH_MAX_AGE_SECONDS:
+            index = None
+        if index is None:
+            collector = {}
+            _collectors.append(collector)
+    if index is None:
+        read_primary(db)
+        try:
+            rows = db.execute(select(Note.id, Note.title, Note.content).order_by(Note.id))
+            index = NoteIndex((note_id, _note_text(title, content)) for note_id, title, content in rows)
+        except BaseException:
+            with _lock:
+                _collectors.remove(collector)
+            raise
+        with _lock:
+            _collectors.remove(collector)
+            # Changes committed during the scan may or may not be in it
+            for note_id, seq in collector.items():
+                _stale[note_id] = max(seq, _stale.get(note_id, 0))
+            _index, _built_at = index, time.monotonic()
+    _refresh(db, index)
+    return index
+
+
+def _refresh(db: Session, index: NoteIndex) -> None:
+    with _lock:
+        if not _stale:
+            return
+        pending = dict(_stale)
+        _stale.clear()
+    read_primary(db)
+    try:
+        note_ids = sorted(pending)
+        texts = {}
+        for start in range(0, len(note_ids), REFRESH_CHUNK):
+            rows = db.execute(
+                select(Note.id, Note.title, Note.content)
+                .where(Note.id.in_(note_ids[start:start + REFRESH_CHUNK]))
+            )
+            texts.update((note_id, _note_text(title, content)) for note_id, title, content in rows)
+    except BaseException:
+        with _lock:
+            for note_id, seq in pending.items():
+                _stale[note_id] = max(seq, _stale.get(note_id, 0))
+        raise
+    index.update({note_id: (texts.get(note_id), seq) for note_id, seq in pending.items()})
+
+
+def reset_index() -> None:
+    """
+    Drop the index; the next search rebuilds it.
+    """
+    global _index
+    with _lock:
+        _index = None
+        _stale.clear()
+
+
+def index_status() -> Dict:
+    with _lock:
+        index, built_at, stale = _index, _built_at, len(_stale)
+    if index is None:
+        return {"built": False}
+    return {"built": True, "age_seconds": round(time.monotonic() - built_at, 1), "stale": stale, **index.status()}
+
+
+@subscribe("note.created", after_commit=True)
+@subscribe("note.updated", after_commit=True)
+@subscribe("note.deleted", after_commit=True)
+def _notes_changed(note_ids):
+    global _seq
+    with _lock:
+        if _index is None and not _collectors:
+            # The next build reads them anyway
+            return
+        _seq += 1
+        for note_id in note_ids:
+            _stale[note_id] = _seq
+            for collector in _collectors:
+                collector[note_id] = _seq
+
+
+def search_notes(db: Session, query: str, limit: int = 20, include_contacts: bool = False) -> List[NoteSearchResult]:
+    """
+    Notes best matching query, with their scores.
+    """
+    hits = get_index(db).search(query, limit)
+    if not hits:
+        return []
+    notes = {note.id: note for note in db.query(Note).filter(Note.id.in_([note_id for note_id, _ in hits]))}
+    scores = dict(hits)
+    # A note deleted by another worker may still be in this one's index
+    found = with_contacts(db, [notes[note_id] for note_id, _ in hits if note_id in notes], include_contacts)
+    return [NoteSearchResult(**note.model_dump(), score=scores[note.id]) for note in found]
@@ -0,0 +1,82 @@
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.job import Job
+from app.models.note import Note
+from app.services.events import emit
+from app.services.jobs import enqueue, job_handler
+
+# Note refinement: notes.refined_content is a cleaned-up version of a note's
+# content, written by a background job (see app/services/jobs.py) so note
+# creation never waits for it.
+#
+# The refiner is picked with NOTE_REFINER. "basic" is a local, rule-based
+# cleanup; "none" turns refinement off. Others (a summarization model, an
+# external service) are added with register_refiner.
+
+NOTE_REFINER = os.getenv("NOTE_REFINER", "basic").strip().lower()
+
+_refiners: Dict[str, Callable[[str], str]] = {}
+
+
+def register_refiner(name: str):
+    """
+    Decorator registering fn(content) -> refined content under name.
+    """
+    def decorator(fn):
+        _refiners[name] = fn
+        return fn
+    return decorator
+
+
+def get_refiner() -> Callable[[str], str]:
+    if NOTE_REFINER not in _refiners:
+        raise ValueError(f"NOTE_REFINER must be one of {sorted(_refiners)} or 'none', not {NOTE_REFINER!r}")
+    return _refiners[NOTE_REFINER]
+
+
+_SENTENCE_END_RE = re.compile(r"([.!?])\s+([a-z])")
+
+
+@register_refiner("basic")
+def basic_refiner(content: str) -> str:
+    """
+    Collapse whitespace, capitalize sentences and end with a full stop.
+    """
+    lines = [" ".join(line.split()) for line in content.strip().splitlines()]
+    text = "\n".join(line for line in lines if line)
+    if not text:
+        return text
+    text = _SENTENCE_END_RE.sub(lambda m: f"{m.group(1)} {m.group(2).upper()}", text)
+    text = text[0].upper() + text[1:]
+    if text[-1] not in ".!?":
+        text += "."
+    return text
+
+
+def enqueue_refinement(db: Session, note_ids: List[int]) -> Optional[Job]:
+    """
+    Queue refinement of note_ids in db's transaction, unless it is off.
+    """
+    if NOTE_REFINER == "none" or not note_ids:
+        return None
+    return enqueue(db, "refine_note", note_ids=list(note_ids))
+
+
+@job_handler("refine_note", concurrency=2)
+def refine_notes(db: Session, note_ids: List[int]) -> Dict:
+    refiner = get_refiner()
+    refined = []
+    for note in db.query(Note).filter(Note.id.in_(note_ids)):
+        # Always from the current content, in case it changed since
+        refined_content = refiner(note.content)
+        if refined_content != note.refined_content:
+            note.refined_content = refined_content
+            refined.append(note.id)
+    db.flush()
+    if refined:
+        emit(db, "note.updated", note_ids=refined)
+    return {"refined": len(refined)}
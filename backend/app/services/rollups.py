@@ -0,0 +1,280 @@
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Date, and_, delete, event, func, select, true, tuple_, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.contact import Contact
+from app.models.contact_note import contact_notes
+from app.models.interaction_rollup import ContactDailyInteractions, DailyInteractions
+from app.models.note import Note
+from app.schemas.stats import ContactActivity, Timeline, TimelinePoint
+from app.services.events import subscribe
+
+# Interaction counts for dashboards, from two rollup tables:
+#
+#   daily_interactions            (day, interaction_type)              -> notes
+#   contact_daily_interactions    (day, interaction_type, contact_id)  -> notes
+#
+# They are updated with deltas in the transaction of every change: a new
+# note adds 1 to its day, a new link to its contact's day. A note whose date
+# or type changes, or that is deleted, is taken out of its old day on
+# note.changing, while its rows still hold the old values, and added to the
+# new one on note.updated. Reports then read O(days) rows, not O(notes).
+
+# Rollup key of notes without an interaction type
+UNKNOWN_TYPE = "unknown"
+
+PERIODS = ("day", "week", "month")
+
+# Notes taken out of the rollups on note.changing, added back on note.updated
+_CHANGING_KEY = "rollups_changing"
+
+
+def _day(column):
+    # A date on PostgreSQL; 'YYYY-MM-DD' text parsed as a date on SQLite
+    return type_coerce(func.date(column), Date)
+
+
+def _type(column):
+    return func.coalesce(column, UNKNOWN_TYPE)
+
+
+def _insert(db: Session, model):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Interaction rollups are not implemented for {dialect}")
+
+
+def _add(db: Session, model, keys: List[str], source) -> None:
+    """
+    Add the notes column of source's rows to model's rows with the same keys.
+    """
+    statement = _insert(db, model).from_select(keys + ["notes"], source)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={"notes": model.notes + statement.excluded.notes},
+    )
+    db.execute(statement)
+
+
+def _add_notes(db: Session, note_ids: List[int], sign: int) -> None:
+    day, interaction_type = _day(Note.interaction_date), _type(Note.interaction_type)
+    _add(db, DailyInteractions, ["day", "interaction_type"], (
+        select(day, interaction_type, func.count() * sign)
+        .where(Note.id.in_(note_ids))
+        .group_by(day, interaction_type)
+    ))
+
+
+def _add_note_links(db: Session, link_filter, sign: int) -> None:
+    day, interaction_type = _day(Note.interaction_date), _type(Note.interaction_type)
+    _add(db, ContactDailyInteractions, ["day", "interaction_type", "contact_id"], (
+        select(day, interaction_type, contact_notes.c.contact_id, func.count() * sign)
+        .join(contact_notes, contact_notes.c.note_id == Note.id)
+        .where(link_filter)
+        .group_by(day, interaction_type, contact_notes.c.contact_id)
+    ))
+
+
+def _remove_links(db: Session, links: List[Tuple[int, int]]) -> None:
+    # Links of a deleted contact (delete, merge) went with the contact: its
+    # rows are deleted on contact.deleted, and new ones would break the
+    # foreign key
+    contact_ids = set(db.scalars(
+        select(Contact.id).where(Contact.id.in_({contact_id for contact_id, _ in links}))
+    ))
+    links = [(contact_id, note_id) for contact_id, note_id in links if contact_id in contact_ids]
+    if not links:
+        return
+    # The links are gone from contact_notes; their notes give the keys
+    note_ids = {note_id for _, note_id in links}
+    keys = dict(
+        (note_id, (day, interaction_type))
+        for note_id, day, interaction_type in db.execute(
+            select(Note.id, _day(Note.interaction_date), _type(Note.interaction_type))
+            .where(Note.id.in_(note_ids))
+        )
+    )
+    deltas = Counter(
+        keys[note_id] + (contact_id,) for contact_id, note_id in links if note_id in keys
+    )
+    if not deltas:
+        return
+    statement = _insert(db, ContactDailyInteractions)
+    statement = statement.on_conflict_do_update(
+        index_elements=["day", "interaction_type", "contact_id"],
+        set_={"notes": ContactDailyInteractions.notes + statement.excluded.notes},
+    )
+    db.execute(statement, [
+        {"day": day, "interaction_type": interaction_type, "contact_id": contact_id, "notes": -count}
+        for (day, interaction_type, contact_id), count in deltas.items()
+    ])
+
+
+def rebuild_rollups(db: Session) -> None:
+    """
+    Recompute both tables from notes and contact_notes, e.g. after a bulk
+    load that bypassed the CRUD layer.
+    """
+    db.execute(delete(ContactDailyInteractions))
+    db.execute(delete(DailyInteractions))
+    day, interaction_type = _day(Note.interaction_date), _type(Note.interaction_type)
+    _add(db, DailyInteractions, ["day", "interaction_type"], (
+        # SQLite needs a WHERE to tell ON CONFLICT from a join's ON
+        select(day, interaction_type, func.count()).where(true()).group_by(day, interaction_type)
+    ))
+    _add_note_links(db, true(), 1)
+
+
+# Maintenance, in the transaction of the change
+
+@subscribe("note.created")
+def _notes_created(db, note_ids):
+    _add_notes(db, note_ids, 1)
+
+@subscribe("note.changing")
+def _notes_changing(db, note_ids):
+    _add_notes(db, note_ids, -1)
+    _add_note_links(db, contact_notes.c.note_id.in_(note_ids), -1)
+    db.info.setdefault(_CHANGING_KEY, set()).update(note_ids)
+
+@subscribe("note.updated")
+def _notes_updated(db, note_ids):
+    changing = db.info.get(_CHANGING_KEY, set())
+    note_ids = [note_id for note_id in note_ids if note_id in changing]
+    if note_ids:
+        changing.difference_update(note_ids)
+        _add_notes(db, note_ids, 1)
+        _add_note_links(db, contact_notes.c.note_id.in_(note_ids), 1)
+
+@subscribe("note.deleted")
+def _notes_deleted(db, note_ids):
+    db.info.get(_CHANGING_KEY, set()).difference_update(note_ids)
+
+@subscribe("link.added")
+def _links_added(db, links):
+    # The note_id filter lets SQLite use an index, row values alone do not
+    _add_note_links(db, and_(
+        contact_notes.c.note_id.in_({note_id for _, note_id in links}),
+        tuple_(contact_notes.c.contact_id, contact_notes.c.note_id).in_(links),
+    ), 1)
+
+@subscribe("link.removed")
+def _links_removed(db, links):
+    # Links of a note being deleted were taken out with the note
+    changing = db.info.get(_CHANGING_KEY, set())
+    links = [(contact_id, note_id) for contact_id, note_id in links if note_id not in changing]
+    if links:
+        _remove_links(db, links)
+
+@subscribe("contact.deleted")
+def _contacts_deleted(db, contact_ids):
+    db.execute(delete(ContactDailyInteractions).where(ContactDailyInteractions.contact_id.in_(contact_ids)))
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_changing(session):
+    session.info.pop(_CHANGING_KEY, None)
+
+
+# Reports
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _points(rows: Iterable[Tuple[date, Optional[str], int]], period: str) -> List[TimelinePoint]:
+    counts: Dict[Tuple[date, Optional[str]], int] = Counter()
+    for day, group, notes in rows:
+        counts[period_start(day, period), group] += notes
+    return [
+        TimelinePoint(start=start, group=group, count=count)
+        for (start, group), count in sorted(counts.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+        if count > 0
+    ]
+
+
+def _between(model, since: Optional[date], until: Optional[date]) -> list:
+    filters = []
+    if since is not None:
+        filters.append(model.day >= since)
+    if until is not None:
+        filters.append(model.day <= until)
+    return filters
+
+
+def get_timeline(
+    db: Session,
+    period: str = "week",
+    group_by: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    interaction_type: Optional[str] = None,
+) -> Timeline:
+    """
+    Interactions per period, optionally split by interaction type or by
+    the contacts' city.
+
+    Without group_by or by interaction type, notes are counted; by city,
+    a group note counts once for each contact (and city) it involves.
+    """
+    if group_by == "city":
+        model = ContactDailyInteractions
+        groups = [Contact.city]
+        query = select(model.day, func.sum(model.notes), *groups).join(Contact, Contact.id == model.contact_id)
+    else:
+        model = DailyInteractions
+        groups = [model.interaction_type] if group_by == "interaction_type" else []
+        query = select(model.day, func.sum(model.notes), *groups)
+    filters = _between(model, since, until)
+    if interaction_type is not None:
+        filters.append(model.interaction_type == interaction_type)
+    rows = (
+        (day, group[0] if group else None, notes)
+        for day, notes, *group in db.execute(query.where(*filters).group_by(model.day, *groups))
+    )
+    return Timeline(period=period, group_by=group_by, points=_points(rows, period))
+
+
+def get_contact_activity(
+    db: Session,
+    contact_id: int,
+    period: str = "month",
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> ContactActivity:
+    """
+    A contact's interactions per period and per interaction type.
+    """
+    if db.get(Contact, contact_id) is None:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    model = ContactDailyInteractions
+    rows = db.execute(
+        select(model.day, model.interaction_type, model.notes)
+        .where(model.contact_id == contact_id, model.notes > 0, *_between(model, since, until))
+        .order_by(model.day)
+    ).all()
+
+    by_type = Counter()
+    for _, interaction_type, notes in rows:
+        by_type[interaction_type] += notes
+    return ContactActivity(
+        contact_id=contact_id,
+        total=sum(by_type.values()),
+        first_day=rows[0].day if rows else None,
+        last_day=rows[-1].day if rows else None,
+        by_type=dict(sorted(by_type.items())),
+        period=period,
+        timeline=_points(((day, None, notes) for day, _, notes in rows), period),
+    )
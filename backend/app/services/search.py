@@ -0,0 +1,222 @@
+import os
+import re
+from typing import Dict, List, Type
+
+from sqlalchemy import DDL, column, event, func, literal_column, or_, table
+from sqlalchemy.orm import Query, Session
+
+from app.database.connection import Base
+from app.models.contact import Contact
+
+# Name of the SQLite FTS5 table mirroring the searchable contact columns
+FTS_TABLE = "contacts_fts"
+
+# Words in a search string (letters/digits in any script, no underscores so
+# tokens never contain LIKE wildcards)
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(search: str) -> List[str]:
+    """
+    Split a search string into the words that are matched individually.
+    """
+    return _TOKEN_RE.findall(search)
+
+
+class SearchBackend:
+    """
+    Base class for contact search strategies.
+
+    A backend receives a Contact query plus the raw search string and
+    returns the query filtered to matching contacts and ordered by relevance.
+    """
+    name = "base"
+
+    def apply(self, query: Query, search: str) -> Query:
+        raise NotImplementedError
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Portable fallback using ILIKE substring matching.
+
+    This cannot use an index, so it is only the default for databases that
+    have no dedicated backend.
+    """
+    name = "like"
+
+    def apply(self, query: Query, search: str) -> Query:
+        search_terms = [term.strip() for term in search.split() if term.strip()]
+        if not search_terms:
+            return query
+
+        if len(search_terms) == 1:
+            # Single word - search in first_name OR last_name OR nickname
+            term = search_terms[0]
+            return query.filter(
+                or_(
+                    Contact.first_name.ilike(f"%{term}%"),
+                    Contact.last_name.ilike(f"%{term}%"),
+                    Contact.nickname.ilike(f"%{term}%")
+                )
+            )
+
+        # Multiple words - first word is first_name, second word is last_name,
+        # and the whole phrase is also searched in nickname
+        first_term, second_term = search_terms[:2]
+        name_filter = Contact.first_name.ilike(f"%{first_term}%") & Contact.last_name.ilike(f"%{second_term}%")
+        return query.filter(
+            or_(
+                name_filter,
+                Contact.nickname.ilike(f"%{search}%")
+            )
+        )
+
+
+class SqliteFtsSearchBackend(SearchBackend):
+    """
+    SQLite FTS5 search over first_name, last_name and nickname.
+
+    Every word must prefix-match a word of one of the columns; unlike the
+    like backend it does not match inside words ("ali" finds "Alice", "ice"
+    does not). The FTS table uses the
+    unicode61 tokenizer with diacritics removed, so "jose" finds "José".
+    Results are ordered by bm25 rank.
+    """
+    name = "fts5"
+
+    fts = table(FTS_TABLE, column("rowid"))
+
+    def match_expression(self, search: str) -> str:
+        # Quote each word so FTS5 syntax characters are treated literally,
+        # and add * for prefix matching (type-ahead)
+        return " ".join(f'"{token}"*' for token in tokenize(search))
+
+    def apply(self, query: Query, search: str) -> Query:
+        match = self.match_expression(search)
+        if not match:
+            return query
+
+        return (
+            query.join(self.fts, self.fts.c.rowid == Contact.id)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+            .order_by(func.bm25(literal_column(FTS_TABLE)), Contact.id)
+        )
+
+
+class PostgresTrigramSearchBackend(SearchBackend):
+    """
+    PostgreSQL search using pg_trgm over an accent-folded name document.
+
+    Each word must either appear as a substring of the document or be
+    similar to one of its words (word_similarity), which tolerates typos.
+    Both operators are served by the GIN trigram index created in the
+    search migration; the document expression below must stay identical to
+    the indexed one.
+    """
+    name = "trigram"
+
+    @staticmethod
+    def document():
+        space = literal_column("' '")
+        return func.crm_unaccent(
+            func.lower(
+                Contact.first_name + space + Contact.last_name + space
+                + func.coalesce(Contact.nickname, literal_column("''"))
+            )
+        )
+
+    def apply(self, query: Query, search: str) -> Query:
+        terms = tokenize(search)
+        if not terms:
+            return query
+
+        document = self.document()
+        filters = []
+        for term in terms:
+            normalized = func.crm_unaccent(func.lower(term))
+            filters.append(
+                or_(
+                    document.contains(normalized, autoescape=False),
+                    normalized.op("<%")(document),
+                )
+            )
+
+        rank = func.word_similarity(func.crm_unaccent(func.lower(" ".join(terms))), document)
+        return query.filter(*filters).order_by(rank.desc(), Contact.id)
+
+
+# Registered backends by name; other modules can add their own
+SEARCH_BACKENDS: Dict[str, Type[SearchBackend]] = {
+    LikeSearchBackend.name: LikeSearchBackend,
+    SqliteFtsSearchBackend.name: SqliteFtsSearchBackend,
+    PostgresTrigramSearchBackend.name: PostgresTrigramSearchBackend,
+}
+
+# Backend used for each dialect when CONTACT_SEARCH_BACKEND is not set
+DEFAULT_BACKENDS = {
+    "sqlite": SqliteFtsSearchBackend.name,
+    "postgresql": PostgresTrigramSearchBackend.name,
+}
+
+
+def register_search_backend(backend: Type[SearchBackend]) -> None:
+    """
+    Make a search backend selectable through CONTACT_SEARCH_BACKEND.
+    """
+    SEARCH_BACKENDS[backend.name] = backend
+
+
+def get_search_backend(db: Session) -> SearchBackend:
+    """
+    Pick the search backend for the session's database.
+    """
+    name = os.getenv("CONTACT_SEARCH_BACKEND")
+    if not name:
+        name = DEFAULT_BACKENDS.get(db.get_bind().dialect.name, LikeSearchBackend.name)
+
+    if name not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown contact search backend: {name}")
+    return SEARCH_BACKENDS[name]()
+
+
+# Keep the SQLite FTS table in step with metadata.create_all()/drop_all()
+# (used by init_db and the tests); deployed databases get it from the
+# Alembic migration instead.
+_SQLITE_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        first_name, last_name, nickname,
+        content='contacts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, nickname)
+        VALUES (new.id, new.first_name, new.last_name, new.nickname);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, nickname)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.nickname);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF first_name, last_name, nickname ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, nickname)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.nickname);
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, nickname)
+        VALUES (new.id, new.first_name, new.last_name, new.nickname);
+    END
+    """,
+]
+
+for statement in _SQLITE_FTS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"),
+)
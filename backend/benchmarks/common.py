@@ -0,0 +1,94 @@
+import json
+import os
+import statistics
+from typing import Dict, Iterable, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+# Shared helpers of the benchmark scripts: engines, percentiles and the
+# stored baselines that runs are checked against.
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Allowed slowdown of a timing against its baseline before a run fails;
+# query counts must not grow at all
+DEFAULT_TOLERANCE = 0.5
+
+
+def make_engine(url: str):
+    """
+    Engine for a benchmark database; in-memory SQLite is shared across threads.
+    """
+    if make_url(url).get_backend_name() == "sqlite" and make_url(url).database in (None, "", ":memory:"):
+        return create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    return create_engine(url)
+
+
+def backend_name(url: str) -> str:
+    return make_url(url).get_backend_name()
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """
+    Percentiles in milliseconds of a list of timings.
+    """
+    ordered = sorted(seconds)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    if len(ordered) > 1:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ordered[0]
+    return {
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def baseline_path(name: str, backend: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}-{backend}.json")
+
+
+def load_baseline(name: str, backend: str) -> Dict:
+    path = baseline_path(name, backend)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(name: str, backend: str, results: Dict) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(name, backend)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def compare(results: Dict, baseline: Dict, timing_keys: Iterable[str], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Regressions of results against baseline, as messages.
+
+    A timing regresses when it is more than tolerance slower than its
+    baseline; a query count when it is higher at all.
+    """
+    problems = []
+    for name, expected in baseline.get("results", {}).items():
+        actual = results.get(name)
+        if actual is None:
+            problems.append(f"{name}: missing from this run")
+            continue
+        if "queries" in expected and actual.get("queries", 0) > expected["queries"]:
+            problems.append(f"{name}: {actual['queries']} queries, baseline {expected['queries']}")
+        for key in timing_keys:
+            if key in expected and actual[key] > expected[key] * (1 + tolerance):
+                problems.append(
+                    f"{name}: {key} {actual[key]:.2f}, baseline {expected[key]:.2f} (+{tolerance:.0%} allowed)"
+                )
+    return problems
@@ -0,0 +1,202 @@
+"""
+Synthetic data for the benchmarks.
+
+Fills a database with N contacts and M notes. Note links follow what a
+personal CRM tends to look like: most notes are about one person, about one
+in seven is a group note with 2-6 people, and a few contacts appear in far
+more notes than the rest (Zipf-like popularity). The same seed always gives
+the same data.
+
+Run from backend/:
+
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --contacts 10000 --notes 50000 --reset
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict
+
+# The app creates its engine on import; the benchmarks bring their own
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# ...and their own job workers, if any
+os.environ.setdefault("JOBS_WORKERS", "0")
+
+from sqlalchemy import func, inspect, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from app.database.connection import Base
+from app.models.contact import Contact
+from app.models.contact_note import contact_notes
+from app.models.note import Note
+from app.services.contact_stats import refresh_contact_stats
+from app.services.dedupe import refresh_block_keys
+from app.services.rollups import rebuild_rollups
+from benchmarks.common import make_engine
+# Importing the app registers every model's table on Base.metadata
+import main  # noqa: F401
+
+FIRST_NAMES = [
+    "Ada", "Alan", "Amélie", "Ana", "Björn", "Carlos", "Chloé", "Daniel", "Dmitri", "Elena", "Emma",
+    "François", "Grace", "Hannah", "Hiroshi", "Ingrid", "Jamal", "José", "Julia", "Katarzyna", "Lars",
+    "Leila", "Lucas", "María", "Mohammed", "Noah", "Olga", "Priya", "Rafael", "Sofia", "Søren", "Tomás",
+    "Wei", "Yuki", "Zoë",
+]
+LAST_NAMES = [
+    "Andersen", "Bauer", "Chen", "Costa", "Dubois", "Dvořák", "García", "Hansen", "Hopper", "Ivanova",
+    "Jansen", "Kowalski", "Lovelace", "Martínez", "Müller", "Nakamura", "Nguyen", "O'Brien", "Patel",
+    "Rossi", "Schmidt", "Silva", "Smith", "Suzuki", "Turing", "Weber", "Williams", "Yılmaz",
+]
+CITIES = ["Berlin", "Lisbon", "London", "New York", "Paris", "São Paulo", "Tokyo", "Zürich", None]
+HOW_WE_MET = ["Conference", "University", "Former colleague", "Introduced by a friend", "Meetup", None]
+INTERACTION_TYPES = ["meeting", "call", "coffee", "email", "dinner"]
+TOPICS = [
+    "product roadmap", "hiring", "a new job", "fundraising", "the conference", "travel plans",
+    "open source", "their startup", "family news", "a book recommendation",
+]
+
+# Share of group notes and their size range
+GROUP_NOTE_SHARE = 0.15
+GROUP_SIZE = (2, 6)
+# Exponent of the contact popularity distribution
+POPULARITY_EXPONENT = 0.8
+
+BATCH_SIZE = 5000
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _contact_rows(count: int, rng: random.Random):
+    for contact_id in range(1, count + 1):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = NOW - timedelta(days=rng.randint(30, 3 * 365), seconds=rng.randint(0, 86399))
+        yield {
+            "id": contact_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "nickname": first_name[:3] if rng.random() < 0.1 else None,
+            "city": rng.choice(CITIES),
+            "how_we_met": rng.choice(HOW_WE_MET),
+            "linkedin_url": (
+                f"https://www.linkedin.com/in/{first_name.lower()}-{last_name.lower()}-{contact_id}"
+                if rng.random() < 0.6 else None
+            ),
+            "last_contacted": None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def _note_rows(count: int, contact_count: int, rng: random.Random, links: list):
+    # Cumulative weights make every weighted choice a bisect
+    cumulative = list(accumulate(1 / rank ** POPULARITY_EXPONENT for rank in range(1, contact_count + 1)))
+    population = list(range(1, contact_count + 1))
+    rng.shuffle(population)
+
+    for note_id in range(1, count + 1):
+        is_group = rng.random() < GROUP_NOTE_SHARE
+        size = rng.randint(*GROUP_SIZE) if is_group else 1
+        contact_ids = set(rng.choices(population, cum_weights=cumulative, k=size))
+        links.extend({"contact_id": contact_id, "note_id": note_id} for contact_id in contact_ids)
+
+        interaction_date = NOW - timedelta(days=rng.randint(0, 2 * 365), minutes=rng.randint(0, 1439))
+        interaction_type = rng.choice(INTERACTION_TYPES)
+        topic = rng.choice(TOPICS)
+        yield {
+            "id": note_id,
+            "title": f"{interaction_type.capitalize()} about {topic}",
+            "content": f"Talked about {topic}. " * rng.randint(1, 8),
+            "interaction_type": interaction_type,
+            "interaction_date": interaction_date,
+            "is_group": len(contact_ids) > 1,
+            "refined_content": None,
+            "created_at": interaction_date,
+            "updated_at": interaction_date,
+        }
+
+
+def generate(engine, contacts: int = 10000, notes: int = 50000, seed: int = 42, reset: bool = False) -> Dict:
+    """
+    Create the schema and fill it; returns row counts and the time taken.
+
+    Refuses to touch a database that already has contacts unless reset is
+    set, in which case all tables are dropped first.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+
+    if reset:
+        Base.metadata.drop_all(engine)
+    elif inspect(engine).has_table("contacts"):
+        with engine.connect() as connection:
+            if connection.execute(select(func.count()).select_from(Contact)).scalar():
+                raise SystemExit("The benchmark database already has contacts, pass --reset to replace them")
+    Base.metadata.create_all(engine)
+
+    links = []
+    with engine.begin() as connection:
+        for batch in _batches(_contact_rows(contacts, rng)):
+            connection.execute(insert(Contact), batch)
+        for batch in _batches(_note_rows(notes, contacts, rng, links)):
+            connection.execute(insert(Note), batch)
+        for batch in _batches(links):
+            connection.execute(insert(contact_notes), batch)
+
+        newest = (
+            select(func.max(Note.interaction_date))
+            .join(contact_notes, contact_notes.c.note_id == Note.id)
+            .where(contact_notes.c.contact_id == Contact.id)
+            .scalar_subquery()
+        )
+        connection.execute(update(Contact).values(last_contacted=newest))
+
+        session = Session(bind=connection)
+        for batch in _batches(range(1, contacts + 1)):
+            refresh_contact_stats(session, batch)
+            refresh_block_keys(session, batch)
+        rebuild_rollups(session)
+
+        if engine.dialect.name == "postgresql":
+            # Ids were given explicitly, move the sequences past them
+            for table in ("contacts", "notes"):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                ))
+        # Fresh statistics, so the planner sees the real table sizes
+        connection.execute(text("ANALYZE"))
+
+    return {
+        "contacts": contacts,
+        "notes": notes,
+        "links": len(links),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic CRM data")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--contacts", type=int, default=10000)
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    stats = generate(make_engine(args.database_url), args.contacts, args.notes, args.seed, args.reset)
+    print(f"{stats['contacts']} contacts, {stats['notes']} notes, {stats['links']} links in {stats['seconds']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Local load test: concurrent clients against a real uvicorn server.
+
+Starts the app with uvicorn on a free port (or targets --url), keeps
+--concurrency clients sending a weighted mix of reads and writes for
+--duration seconds, and reports p50/p95/p99 latency per endpoint and the
+overall throughput.
+
+Run from backend/:
+
+    python -m benchmarks.loadtest                                # SQLite file, generated on first use
+    python -m benchmarks.loadtest --database-url postgresql+psycopg2://localhost/crm_bench --generate
+    python -m benchmarks.loadtest --workers 4 --concurrency 64 --duration 30
+    python -m benchmarks.loadtest --check                        # fail on regressions
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.engine import make_url
+
+from benchmarks.common import (
+    DEFAULT_TOLERANCE, backend_name, compare, load_baseline, make_engine, save_baseline, summarize,
+)
+from benchmarks.datagen import FIRST_NAMES, LAST_NAMES, generate
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE_URL = "sqlite:///" + os.path.join(tempfile.gettempdir(), "personal_crm_bench.db")
+
+# (name, weight); roughly a client browsing contacts and adding notes
+REQUEST_MIX = [
+    ("list_contacts", 20),
+    ("search_contacts", 20),
+    ("get_contact", 25),
+    ("contact_notes", 20),
+    ("list_notes", 10),
+    ("create_note", 5),
+]
+
+TIMING_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _request(name: str, rng: random.Random, contacts: int) -> Tuple[str, str, Optional[dict]]:
+    if name == "list_contacts":
+        return "GET", "/contacts/?limit=50", None
+    if name == "search_contacts":
+        return "GET", f"/contacts/?search={rng.choice(FIRST_NAMES + LAST_NAMES)[:4]}&limit=20", None
+    if name == "get_contact":
+        return "GET", f"/contacts/{rng.randint(1, contacts)}", None
+    if name == "contact_notes":
+        return "GET", f"/contacts/{rng.randint(1, min(contacts, 200))}/notes?limit=50", None
+    if name == "list_notes":
+        return "GET", "/notes/?limit=50", None
+    contact_ids = rng.sample(range(1, contacts + 1), 2)
+    return "POST", "/notes/", {"content": "Load test note", "contact_ids": contact_ids}
+
+
+async def _client(http: httpx.AsyncClient, deadline: float, contacts: int, seed: int,
+                  timings: Dict[str, List[float]], errors: Dict[str, int]):
+    rng = random.Random(seed)
+    names = [name for name, _ in REQUEST_MIX]
+    weights = [weight for _, weight in REQUEST_MIX]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, body = _request(name, rng, contacts)
+        start = time.perf_counter()
+        try:
+            response = await http.request(method, path, json=body)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if failed:
+            errors[name] += 1
+        else:
+            timings[name].append(time.perf_counter() - start)
+
+
+async def run_load(url: str, contacts: int, concurrency: int, duration: float, seed: int = 7) -> Dict:
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as http:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            _client(http, deadline, contacts, seed + i, timings, errors) for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    results = {name: {**summarize(values), "requests": len(values)} for name, values in timings.items()}
+    everything = [value for values in timings.values() for value in values]
+    completed = len(everything)
+    return {
+        "results": results,
+        "overall": {
+            **summarize(everything),
+            "requests": completed,
+            "errors": sum(errors.values()),
+            "requests_per_second": round(completed / elapsed, 1),
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_url: str, workers: int, cache: bool) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {**os.environ, "DATABASE_URL": database_url}
+    if not cache:
+        env["CACHE_BACKEND"] = "none"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"uvicorn exited with {server.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("uvicorn did not become healthy within 30 s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the CRM API")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--generate", action="store_true", help="(re)create the data first")
+    parser.add_argument("--contacts", type=int, default=10000)
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--cache", action="store_true", help="leave the read cache on")
+    parser.add_argument("--check", action="store_true", help="exit with 1 on regressions against the baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    if make_url(args.database_url).database in (None, "", ":memory:"):
+        sys.exit("The server runs in another process, use a SQLite file or a server database")
+
+    server = None
+    url = args.url
+    if url is None:
+        database = make_url(args.database_url).database
+        is_new = backend_name(args.database_url) == "sqlite" and not os.path.exists(database)
+        if args.generate or is_new:
+            stats = generate(make_engine(args.database_url), args.contacts, args.notes, reset=True)
+            print(f"Generated {stats['contacts']} contacts, {stats['notes']} notes, {stats['links']} links "
+                  f"in {stats['seconds']} s")
+        server, url = start_server(args.database_url, args.workers, args.cache)
+
+    try:
+        print(f"Load testing {url}: {args.concurrency} clients for {args.duration:.0f} s")
+        report = asyncio.run(run_load(url, args.contacts, args.concurrency, args.duration))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+    print(f"\n{'endpoint':<18}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, result in sorted(report["results"].items()):
+        print(f"{name:<18}{result['requests']:>10}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}")
+    overall = report["overall"]
+    print(f"{'overall':<18}{overall['requests']:>10}{overall['p50_ms']:>10.2f}{overall['p95_ms']:>10.2f}"
+          f"{overall['p99_ms']:>10.2f}")
+    print(f"\n{overall['requests_per_second']} requests/s, {overall['errors']} errors")
+
+    backend = backend_name(args.database_url)
+    settings = {"contacts": args.contacts, "notes": args.notes, "workers": args.workers,
+                "concurrency": args.concurrency, "cache": args.cache}
+    if args.update_baseline:
+        path = save_baseline("load", backend, {"settings": settings, **report})
+        print(f"\nBaseline written to {path}")
+    elif args.check:
+        baseline = load_baseline("load", backend)
+        if not baseline:
+            sys.exit(f"No load baseline for {backend}, run with --update-baseline first")
+        if baseline.get("settings") != settings:
+            print(f"\nWarning: baseline was recorded with {baseline.get('settings')}")
+        problems = compare(report["results"], baseline, TIMING_KEYS, args.tolerance)
+        expected_rps = baseline["overall"]["requests_per_second"]
+        if overall["requests_per_second"] < expected_rps * (1 - args.tolerance):
+            problems.append(f"throughput {overall['requests_per_second']} requests/s, baseline {expected_rps}")
+        if overall["errors"]:
+            problems.append(f"{overall['errors']} failed requests")
+        if problems:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(problems))
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Micro-benchmarks of the main read and write endpoints.
+
+Requests go through the whole FastAPI app in-process (routing, validation,
+database, serialization), without a network hop, against a database filled
+by benchmarks.datagen. The read cache is bypassed so the database work is
+what gets measured. Every benchmark reports p50/p95/p99 latency and the SQL
+statements per request; timings can vary between machines, statement
+counts cannot.
+
+Run from backend/:
+
+    python -m benchmarks.micro                                   # in-memory SQLite, fresh data
+    python -m benchmarks.micro --database-url postgresql+psycopg2://localhost/crm_bench --generate
+    python -m benchmarks.micro --check                           # fail on regressions
+    python -m benchmarks.micro --update-baseline
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict
+
+# The app creates its engine on import; the benchmarks bring their own
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# ...and their own job workers, if any
+os.environ.setdefault("JOBS_WORKERS", "0")
+# The autocomplete index is built from the benchmark database on first use
+os.environ.setdefault("AUTOCOMPLETE_PRELOAD", "off")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import get_db
+from app.services import cache
+from benchmarks.common import (
+    DEFAULT_TOLERANCE, backend_name, compare, load_baseline, make_engine, save_baseline, summarize,
+)
+from benchmarks.datagen import FIRST_NAMES, LAST_NAMES, TOPICS, generate
+from main import app
+
+TIMING_KEYS = ("p50_ms", "p95_ms")
+
+
+def _benchmarks(client: TestClient, rng: random.Random, contacts: int) -> Dict[str, Callable]:
+    """
+    Name -> function making one request; ids and terms are drawn from rng.
+    """
+    second_page = client.get("/contacts/?limit=50").headers["X-Next-Cursor"]
+    # Datagen makes low ids the most popular contacts
+    popular_ids = list(range(1, min(contacts, 50) + 1))
+    search_terms = [name[:4] for name in FIRST_NAMES + LAST_NAMES]
+    note_terms = [topic.split()[-1] for topic in TOPICS]
+
+    def create_note():
+        contact_ids = rng.sample(range(1, contacts + 1), 2)
+        return client.post("/notes/", json={"content": "Benchmark note", "contact_ids": contact_ids})
+
+    return {
+        "list_contacts": lambda: client.get("/contacts/?limit=50"),
+        "list_contacts_cursor": lambda: client.get(f"/contacts/?limit=50&cursor={second_page}"),
+        "list_contacts_fields": lambda: client.get("/contacts/?limit=50&fields=id,first_name,last_name"),
+        "search_contacts": lambda: client.get(f"/contacts/?search={rng.choice(search_terms)}&limit=20"),
+        "autocomplete": lambda: client.get(f"/contacts/autocomplete?prefix={rng.choice(search_terms)[:2]}"),
+        "get_contact": lambda: client.get(f"/contacts/{rng.randint(1, contacts)}"),
+        "contact_notes": lambda: client.get(f"/contacts/{rng.choice(popular_ids)}/notes?limit=50"),
+        "list_notes": lambda: client.get("/notes/?limit=50&include_contacts=true"),
+        "list_notes_fields": lambda: client.get("/notes/?limit=50&fields=id,title,interaction_date"),
+        "due_contacts": lambda: client.get("/contacts/due?limit=50"),
+        "timeline": lambda: client.get("/stats/timeline?period=week&group_by=interaction_type"),
+        "contact_network": lambda: client.get(f"/contacts/{rng.choice(popular_ids)}/network?limit=50"),
+        "search_notes": lambda: client.get(f"/notes/search?q={rng.choice(note_terms)}&limit=20"),
+        "create_note": create_note,
+    }
+
+
+def run(engine, contacts: int, iterations: int = 200, warmup: int = 10, seed: int = 7,
+        only=None, use_cache: bool = False) -> Dict[str, Dict]:
+    """
+    Run the benchmarks against engine's (already filled) database.
+    """
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    statements = [0]
+
+    def count_statement(*args):
+        statements[0] += 1
+
+    rng = random.Random(seed)
+    saved_cache = cache.response_cache
+    if not use_cache:
+        cache.response_cache = cache.NullCache()
+    app.dependency_overrides[get_db] = override_get_db
+    event.listen(engine, "before_cursor_execute", count_statement)
+    results = {}
+    try:
+        with TestClient(app) as client:
+            for name, request in _benchmarks(client, rng, contacts).items():
+                if only and name not in only:
+                    continue
+                for _ in range(warmup):
+                    request()
+                statements[0] = 0
+                timings = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    response = request()
+                    timings.append(time.perf_counter() - start)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+                results[name] = {**summarize(timings), "queries": round(statements[0] / iterations)}
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        app.dependency_overrides.pop(get_db, None)
+        cache.response_cache = saved_cache
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the CRM endpoints")
+    parser.add_argument("--database-url", default="sqlite:///:memory:")
+    parser.add_argument("--generate", action="store_true",
+                        help="(re)create the data first; always done for in-memory SQLite")
+    parser.add_argument("--contacts", type=int, default=10000)
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--only", nargs="*", help="names of the benchmarks to run")
+    parser.add_argument("--cache", action="store_true", help="leave the read cache on")
+    parser.add_argument("--check", action="store_true", help="exit with 1 on regressions against the baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url)
+    backend = backend_name(args.database_url)
+    if args.generate or args.database_url.startswith("sqlite:///:memory:"):
+        stats = generate(engine, args.contacts, args.notes, reset=True)
+        print(f"Generated {stats['contacts']} contacts, {stats['notes']} notes, {stats['links']} links "
+              f"in {stats['seconds']} s")
+
+    results = run(engine, args.contacts, args.iterations, only=args.only, use_cache=args.cache)
+
+    print(f"\n{'benchmark':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, result in results.items():
+        print(f"{name:<22}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['queries']:>9}")
+
+    dataset = {"contacts": args.contacts, "notes": args.notes}
+    if args.update_baseline:
+        path = save_baseline("micro", backend, {"dataset": dataset, "results": results})
+        print(f"\nBaseline written to {path}")
+    elif args.check:
+        baseline = load_baseline("micro", backend)
+        if not baseline:
+            sys.exit(f"No micro baseline for {backend}, run with --update-baseline first")
+        if baseline.get("dataset") != dataset:
+            print(f"\nWarning: baseline was recorded with {baseline.get('dataset')}")
+        if args.only:
+            baseline["results"] = {k: v for k, v in baseline["results"].items() if k in args.only}
+        problems = compare(results, baseline, TIMING_KEYS, args.tolerance)
+        if problems:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(problems))
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
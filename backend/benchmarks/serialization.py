@@ -0,0 +1,91 @@
+"""
+Serialization cost of a page of 1,000 contacts.
+
+Compares the ways a contacts page can be turned into a response body:
+
+- fastapi-json: FastAPI's stock path used before responses went through
+  orjson (response_model validation, jsonable_encoder, json.dumps)
+- fastapi-orjson: the same with ORJSONResponse, now the app's default
+  response class
+- adapter: ContactListAdapter.dump_json, the path of the read cache
+
+Run from backend/:
+
+    DATABASE_URL=sqlite:// python -m benchmarks.serialization [--rows 1000] [--repeat 50]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models.contact import Contact
+from app.schemas.contact import Contact as ContactSchema, ContactListAdapter
+
+
+def make_contacts(count: int) -> List[Contact]:
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    return [
+        Contact(
+            id=i,
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            nickname=None if i % 3 else f"Nick{i}",
+            city="Zürich" if i % 2 else "Lisbon",
+            how_we_met="Met at a conference about distributed systems",
+            linkedin_url=f"https://www.linkedin.com/in/person-{i}",
+            last_contacted=now - timedelta(days=i),
+            created_at=now - timedelta(days=365, seconds=i),
+            updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    contacts = make_contacts(args.rows)
+    field = create_model_field("Response", List[ContactSchema], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path(response_class):
+        def render():
+            content = loop.run_until_complete(serialize_response(field=field, response_content=contacts))
+            return response_class(content).body
+        return render
+
+    def adapter_path():
+        return ContactListAdapter.dump_json(ContactListAdapter.validate_python(contacts))
+
+    paths = {
+        "fastapi-json": fastapi_path(JSONResponse),
+        "fastapi-orjson": fastapi_path(ORJSONResponse),
+        "adapter": adapter_path,
+    }
+
+    print(f"{args.rows} contacts, median of {args.repeat} runs")
+    baseline = None
+    for name, render in paths.items():
+        render()  # warm up
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            body = render()
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings) * 1000
+        baseline = baseline or median
+        print(f"  {name:<15} {median:8.2f} ms  {baseline / median:5.2f}x  {len(body) / 1024:7.1f} KiB")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
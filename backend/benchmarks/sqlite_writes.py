@@ -0,0 +1,144 @@
+"""
+Concurrent note creation and reads on a SQLite file: SQLite's default
+settings against the deployment mode of app/database/sqlite.py (WAL,
+pragmas, queue pool and the serialized writer).
+
+Both modes start from a copy of the same generated database. --writers
+threads create notes and --readers threads list notes and read contacts,
+through the CRUD functions, for --duration seconds; the report has the
+latency percentiles per operation, the operations per second and the
+failures ("database is locked").
+
+Run from backend/:
+
+    python -m benchmarks.sqlite_writes
+    python -m benchmarks.sqlite_writes --writers 16 --readers 4 --duration 20
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+# The app creates its engine on import; the benchmark brings its own
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JOBS_WORKERS", "0")
+
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from main import app  # noqa: F401  (imports the event subscribers of the app)
+from app.crud import contact as contact_crud, note as note_crud
+from app.database.pool import pool_options
+from app.database.sqlite import configure_engine
+from app.schemas.note import NoteCreate
+from benchmarks.common import summarize
+from benchmarks.datagen import generate
+
+MODES = ("default", "tuned")
+
+
+def _engine(path: str, mode: str, connections: int):
+    url = f"sqlite:///{path}"
+    if mode == "default":
+        return create_engine(url, pool_size=connections, max_overflow=0)
+    engine = create_engine(url, **{**pool_options(url), "pool_size": connections, "max_overflow": 0})
+    configure_engine(engine, tuned=True)
+    return engine
+
+
+def run(path: str, mode: str, contacts: int, writers: int, readers: int, duration: float) -> Dict:
+    engine = _engine(path, mode, writers + readers)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def create_note(db, rng):
+        note = NoteCreate(content="Benchmark note", contact_ids=rng.sample(range(1, contacts + 1), 2))
+        note_crud.create_note(db, note)
+
+    def list_notes(db, rng):
+        note_crud.get_notes(db, Response(), limit=50, include_contacts=True)
+
+    def get_contact(db, rng):
+        contact_crud.get_contact(db, rng.randint(1, contacts))
+
+    def client(seed, operations):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            operation = rng.choice(operations)
+            start = time.perf_counter()
+            try:
+                with SessionLocal() as db:
+                    operation(db, rng)
+            except OperationalError as exc:
+                with lock:
+                    errors[f"{operation.__name__}: {exc.orig}"] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                timings[operation.__name__].append(elapsed)
+
+    threads = [
+        threading.Thread(target=client, args=(i, [create_note]))
+        for i in range(writers)
+    ] + [
+        threading.Thread(target=client, args=(writers + i, [list_notes, get_contact]))
+        for i in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    results = {name: {**summarize(seconds), "ops": len(seconds)} for name, seconds in sorted(timings.items())}
+    return {
+        "results": results,
+        "ops_per_second": round(sum(len(seconds) for seconds in timings.values()) / duration, 1),
+        "errors": dict(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite default settings vs the deployment mode")
+    parser.add_argument("--contacts", type=int, default=2000)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--modes", nargs="*", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="crm-sqlite-")
+    try:
+        source = os.path.join(directory, "source.db")
+        stats = generate(create_engine(f"sqlite:///{source}"), args.contacts, args.notes, reset=True)
+        print(f"Generated {stats['contacts']} contacts, {stats['notes']} notes in {stats['seconds']} s; "
+              f"{args.writers} writers, {args.readers} readers, {args.duration:g} s per mode")
+
+        for mode in args.modes:
+            path = os.path.join(directory, f"{mode}.db")
+            shutil.copyfile(source, path)
+            report = run(path, mode, args.contacts, args.writers, args.readers, args.duration)
+            print(f"\n{mode}: {report['ops_per_second']} ops/s")
+            print(f"  {'operation':<14}{'ops':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+            for name, result in report["results"].items():
+                print(f"  {name:<14}{result['ops']:>8}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                      f"{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}")
+            for error, count in report["errors"].items():
+                print(f"  {count} x {error}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,51 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
-from app.api.endpoints import contact, note
+from app.api.endpoints import contact, note, export, changes, graph, jobs, stats
+from app.api.profiling import ProfilingMiddleware
+from app.database.connection import SessionLocal, replica_set, request_engine
+from app.database.pool import pool_status
+from app.services import autocomplete
+from app.services.cache import cache_status
+from app.services.graph import graph_status
+from app.services.jobs import JobWorkerPool
+from app.services.note_search import index_status
+from app.services import metrics
 
 # Load environment variables
 load_dotenv()
 
-# Create FastAPI instance
-app = FastAPI(title="Personal CRM API")
+# Background job workers (JOBS_WORKERS threads, none when 0)
+job_workers = JobWorkerPool(SessionLocal)
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(autocomplete.preload, SessionLocal)
+    job_workers.start()
+    if replica_set is not None:
+        replica_set.start()
+    yield
+    await run_in_threadpool(job_workers.stop)
+    if replica_set is not None:
+        await run_in_threadpool(replica_set.stop)
+
+# Create FastAPI instance; responses are rendered with orjson
+app = FastAPI(title="Personal CRM API", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Per-request timings and query counts, enabled with PROFILING=on|debug
+app.add_middleware(ProfilingMiddleware)
 
 # Include contact routes
 app.include_router(contact.router, prefix="/contacts", tags=["contacts"])
 app.include_router(note.router, prefix="/notes", tags=["notes"])
+app.include_router(export.router, prefix="/export", tags=["export"])
+app.include_router(changes.router, prefix="/changes", tags=["changes"])
+app.include_router(graph.router, prefix="/graph", tags=["graph"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+app.include_router(stats.router, prefix="/stats", tags=["stats"])
 
 @app.get("/")
 async def root():
@@ -18,7 +53,28 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "database": {
+            "pool": pool_status(request_engine()),
+            "replicas": replica_set.status() if replica_set is not None else [],
+        },
+        "cache": cache_status(),
+        "graph": graph_status(),
+        "jobs": job_workers.status(),
+        "search": index_status(),
+        "autocomplete": autocomplete.index_status(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """
+    Request, database pool and cache metrics in the Prometheus text format.
+    """
+    lines = metrics.request_metrics.render()
+    lines += metrics.gauge_lines("crm_db_pool", "Database connection pool", pool_status(request_engine()))
+    lines += metrics.gauge_lines("crm_cache", "Read cache", cache_status())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=metrics.CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
@@ -5,16 +5,31 @@ import os
 # Add the parent directory to path so pytest can find the app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# The app engine is never used by the tests, but it is created on import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Jobs are run explicitly with app.services.jobs.run_pending
+os.environ.setdefault("JOBS_WORKERS", "0")
+# ...and the autocomplete index is built on first use, from the test database
+os.environ.setdefault("AUTOCOMPLETE_PRELOAD", "off")
+# The change feed is pruned explicitly with prune_changes
+os.environ.setdefault("CHANGE_RETENTION_DAYS", "0")
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.database.connection import Base, get_db
+from app.services.cache import response_cache
+from app.services import autocomplete
+from app.services.graph import reset_graph
+from app.services.note_search import reset_index
 from main import app
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -23,6 +38,15 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    # SQLite leaves foreign keys unenforced unless asked; PostgreSQL always
+    # enforces them, so the tests should too
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+event.listen(engine, "connect", _enable_foreign_keys)
+
 @pytest.fixture(scope="session")
 def db_engine():
     Base.metadata.create_all(bind=engine)
@@ -41,8 +65,37 @@ def db_session(db_engine):
     transaction.rollback()
     connection.close()
 
+@pytest.fixture(scope="function", params=["sync", "async"])
+def db_mode(request):
+    """
+    Run every API test against both DATABASE_MODE settings.
+    """
+    return request.param
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # Test databases are rolled back or thrown away, ids get reused
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+@pytest.fixture(autouse=True)
+def clear_contact_graph():
+    # Like the cache, the in-memory indexes outlive each test's database
+    reset_graph()
+    reset_index()
+    autocomplete.reset_index()
+    yield
+    reset_graph()
+    reset_index()
+    autocomplete.reset_index()
+
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_mode, db_session):
+    if db_mode == "async":
+        yield from _async_client()
+        return
+    
     def override_get_db():
         try:
             yield db_session
@@ -51,5 +104,62 @@ def client(db_session):
     
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
+        test_client.db_engine = engine
         yield test_client
-    app.dependency_overrides.clear() 
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+def _async_client():
+    # A fresh in-memory database per test; it has to be created on the
+    # client's event loop, which only exists once the client is started
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        poolclass=StaticPool,
+    )
+    event.listen(async_engine.sync_engine, "connect", _enable_foreign_keys)
+    AsyncTestingSessionLocal = async_sessionmaker(
+        async_engine, autocommit=False, autoflush=False, expire_on_commit=False
+    )
+    
+    async def create_tables():
+        async with async_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+    
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+    
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        test_client.portal.call(create_tables)
+        test_client.db_engine = async_engine.sync_engine
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="function")
+def query_counter(client):
+    """
+    Count the SQL statements executed on the test engine.
+    
+    Use as a context manager: `with query_counter() as queries:` and then
+    check `queries.count`.
+    """
+    db_engine = client.db_engine
+    
+    class QueryCounter:
+        def __init__(self):
+            self.count = 0
+            self.statements = []
+        
+        def __enter__(self):
+            event.listen(db_engine, "before_cursor_execute", self._record)
+            return self
+        
+        def __exit__(self, *exc_info):
+            event.remove(db_engine, "before_cursor_execute", self._record)
+        
+        def _record(self, conn, cursor, statement, parameters, context, executemany):
+            self.count += 1
+            self.statements.append(statement)
+    
+    return QueryCounter
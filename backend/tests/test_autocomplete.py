@@ -0,0 +1,95 @@
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.services import autocomplete
+from app.services.autocomplete import PrefixIndex
+
+CONTACTS = [
+    (1, "Ada", "Lovelace", None),
+    (2, "José", "Álvarez", "Pepe"),
+    (3, "John", "Adams", "Johnny"),
+    (4, "Joan", "Baez", None),
+]
+
+def _ids(results):
+    return [result[0] for result in results]
+
+def test_prefix_search():
+    index = PrefixIndex(CONTACTS)
+    # In the order of the matching words: ada, adams
+    assert _ids(index.search("ad", 10)) == [1, 3]
+    assert _ids(index.search("Jo", 10)) == [4, 3, 2]
+    assert _ids(index.search("jo", 2)) == [4, 3]
+    # Accents and case are ignored; nicknames match
+    assert _ids(index.search("alv", 10)) == [2]
+    assert _ids(index.search("PEP", 10)) == [2]
+    # Every word must match
+    assert _ids(index.search("ada lov", 10)) == [1]
+    assert _ids(index.search("lov ada", 10)) == [1]
+    assert index.search("ada baez", 10) == []
+    assert index.search("-", 10) == []
+    assert index.search("lovelace", 10) == [(1, "Ada", "Lovelace", None)]
+
+def test_prefix_index_updates():
+    index = PrefixIndex(CONTACTS)
+    index.update({1: (("Ada", "King", None), 1), 4: (None, 1), 5: (("Adele", "Adkins", None), 1)})
+    assert _ids(index.search("ad", 10)) == [1, 3, 5]
+    assert index.search("lov", 10) == []
+    assert _ids(index.search("king", 10)) == [1]
+    assert index.search("joan", 10) == []
+    # An older change is skipped
+    index.update({1: (("Ada", "Lovelace", None), 0)})
+    assert index.search("lov", 10) == []
+    assert index.status() == {"contacts": 4, "words": 10}
+
+    rebuilt = PrefixIndex([(1, "Ada", "King", None), CONTACTS[1], CONTACTS[2], (5, "Adele", "Adkins", None)])
+    assert index._words == rebuilt._words
+    assert index._ids == rebuilt._ids
+
+@pytest.mark.parametrize("db_mode", ["sync"])
+def test_autocomplete_endpoint(client, db_engine):
+    ada = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()
+    response = client.get("/contacts/autocomplete?prefix=ad")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"id": ada["id"], "first_name": "Ada", "last_name": "Lovelace", "nickname": None}]
+
+    # Unchanged contacts are answered without the database
+    statements = []
+    counter = lambda *args: statements.append(args)
+    event.listen(db_engine, "before_cursor_execute", counter)
+    try:
+        assert len(client.get("/contacts/autocomplete?prefix=lov").json()) == 1
+    finally:
+        event.remove(db_engine, "before_cursor_execute", counter)
+    assert statements == []
+
+    # Changes are seen by the next lookup
+    client.put(f"/contacts/{ada['id']}", json={"last_name": "King"})
+    grace = client.post("/contacts/", json={"first_name": "Grace", "last_name": "Hopper", "nickname": "Amazing"}).json()
+    assert client.get("/contacts/autocomplete?prefix=lov").json() == []
+    assert [c["id"] for c in client.get("/contacts/autocomplete?prefix=a").json()] == [ada["id"], grace["id"]]
+    client.delete(f"/contacts/{grace['id']}")
+    assert client.get("/contacts/autocomplete?prefix=am").json() == []
+    assert autocomplete.index_status()["contacts"] == 1
+
+def test_autocomplete_validation(client):
+    assert client.get("/contacts/autocomplete?prefix=").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/contacts/autocomplete?prefix=a&limit=51").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/contacts/autocomplete?prefix=a").json() == []
+
+def test_preload(db_session, monkeypatch):
+    monkeypatch.setattr(autocomplete, "AUTOCOMPLETE_PRELOAD", True)
+
+    class Factory:
+        def __call__(self):
+            return self
+
+        def __enter__(self):
+            return db_session
+
+        def __exit__(self, *exc):
+            return False
+
+    autocomplete.preload(Factory())
+    assert autocomplete.index_status()["built"] is True
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.models.contact import Contact
+from app.models.contact_note import contact_notes
+from benchmarks import datagen, micro, sqlite_writes
+from benchmarks.common import compare, load_baseline, make_engine, summarize
+
+@pytest.fixture(scope="module")
+def bench_engine():
+    engine = make_engine("sqlite:///:memory:")
+    datagen.generate(engine, contacts=200, notes=600, reset=True)
+    yield engine
+    engine.dispose()
+
+def test_datagen_is_reproducible(bench_engine):
+    other = make_engine("sqlite:///:memory:")
+    datagen.generate(other, contacts=200, notes=600, reset=True)
+
+    def snapshot(engine):
+        with engine.connect() as connection:
+            names = connection.execute(select(Contact.first_name, Contact.last_name).order_by(Contact.id)).all()
+            links = connection.execute(select(func.count()).select_from(contact_notes)).scalar()
+            contacted = connection.execute(
+                select(func.count()).select_from(Contact).where(Contact.last_contacted.is_not(None))
+            ).scalar()
+        return names, links, contacted
+
+    names, links, contacted = snapshot(bench_engine)
+    assert snapshot(other) == (names, links, contacted)
+    # Group notes make links outnumber notes
+    assert links > 600
+    assert 0 < contacted <= 200
+
+def test_micro_benchmark_query_counts_match_baseline(bench_engine):
+    """
+    Statement counts do not depend on the machine, so they are checked on
+    every test run; timings are only checked by `benchmarks.micro --check`.
+    """
+    results = micro.run(bench_engine, contacts=200, iterations=3, warmup=1)
+
+    baseline = load_baseline("micro", "sqlite")
+    assert set(results) == set(baseline["results"])
+    assert compare(results, baseline, timing_keys=()) == []
+
+def test_sqlite_writes_benchmark(tmp_path):
+    path = str(tmp_path / "writes.db")
+    datagen.generate(make_engine(f"sqlite:///{path}"), contacts=50, notes=100, reset=True)
+
+    report = sqlite_writes.run(path, "tuned", contacts=50, writers=4, readers=2, duration=0.5)
+    assert report["errors"] == {}
+    assert report["results"]["create_note"]["ops"] > 0
+    assert report["ops_per_second"] > 0
+
+def test_compare_reports_regressions():
+    baseline = {"results": {"list": {"p50_ms": 10.0, "queries": 2}}}
+
+    assert compare({"list": {"p50_ms": 14.0, "queries": 2}}, baseline, ["p50_ms"], tolerance=0.5) == []
+    problems = compare({"list": {"p50_ms": 16.0, "queries": 3}}, baseline, ["p50_ms"], tolerance=0.5)
+    assert len(problems) == 2
+
+def test_summarize_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)])
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+    assert summary["max_ms"] == 100
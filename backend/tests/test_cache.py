@@ -0,0 +1,150 @@
+import pytest
+from fastapi import status
+from datetime import datetime, UTC
+
+from app.api.endpoints import contact as contact_endpoints
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.services import cache
+from app.services.cache import MemoryCache, response_cache
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" is now the least recently used entry
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.as_dict()["evictions"] == 1
+
+def test_memory_cache_expires_entries():
+    now = [0.0]
+    cache = MemoryCache(max_entries=10, ttl=30, clock=lambda: now[0])
+    cache.set("a", 1)
+
+    now[0] = 29.0
+    assert cache.get("a") == 1
+    now[0] = 30.0
+    assert cache.get("a") is None
+    assert cache.size() == 0
+
+    stats = cache.stats.as_dict()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+def test_memory_cache_guarded_set():
+    cache = MemoryCache(max_entries=10, ttl=60)
+    generation = cache.generation("contacts")
+    cache.set("a", 1, ("contacts", generation))
+    assert cache.get("a") == 1
+
+    # Invalidated while "b" was loading
+    cache.bump("contacts")
+    cache.set("b", 2, ("contacts", generation))
+    assert cache.get("b") is None
+
+def test_contact_loaded_before_a_change_is_not_cached(client, query_counter, monkeypatch):
+    contact_id = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+    get_contact = contact_endpoints.crud.get_contact
+
+    def racing_get_contact(*args):
+        contact = get_contact(*args)
+        # A write commits and invalidates after this read
+        cache._invalidate_contacts([contact_id])
+        return contact
+
+    monkeypatch.setattr(contact_endpoints.crud, "get_contact", racing_get_contact)
+    client.get(f"/contacts/{contact_id}")
+    monkeypatch.setattr(contact_endpoints.crud, "get_contact", get_contact)
+
+    # The possibly stale response was not stored
+    with query_counter() as queries:
+        client.get(f"/contacts/{contact_id}")
+    assert queries.count > 0
+    with query_counter() as queries:
+        client.get(f"/contacts/{contact_id}")
+    assert queries.count == 0
+
+def test_read_contact_is_served_from_cache(client, query_counter):
+    contact_id = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+
+    first = client.get(f"/contacts/{contact_id}")
+    with query_counter() as queries:
+        second = client.get(f"/contacts/{contact_id}")
+
+    assert second.json() == first.json()
+    assert queries.count == 0
+
+def test_update_contact_invalidates_cache(client):
+    contact_id = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+    client.get(f"/contacts/{contact_id}")
+    client.get("/contacts/")
+
+    client.put(f"/contacts/{contact_id}", json={"first_name": "Augusta"})
+
+    assert client.get(f"/contacts/{contact_id}").json()["first_name"] == "Augusta"
+    assert client.get("/contacts/").json()[0]["first_name"] == "Augusta"
+
+def test_delete_contact_invalidates_cache(client):
+    contact_id = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+    client.get(f"/contacts/{contact_id}")
+    client.get(f"/contacts/{contact_id}/notes")
+
+    client.delete(f"/contacts/{contact_id}")
+
+    assert client.get(f"/contacts/{contact_id}").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"/contacts/{contact_id}/notes").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/contacts/").json() == []
+
+def test_cached_list_replays_next_cursor(client, query_counter):
+    for first_name in ("Ada", "Grace", "Edsger"):
+        client.post("/contacts/", json={"first_name": first_name, "last_name": "Test"})
+
+    first = client.get("/contacts/?limit=2")
+    with query_counter() as queries:
+        second = client.get("/contacts/?limit=2")
+
+    assert queries.count == 0
+    assert second.json() == first.json()
+    assert second.headers[NEXT_CURSOR_HEADER] == first.headers[NEXT_CURSOR_HEADER]
+
+def test_note_mutations_invalidate_cache(client):
+    ada = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+    grace = client.post("/contacts/", json={"first_name": "Grace", "last_name": "Hopper"}).json()["id"]
+    note_id = client.post("/notes/", json={
+        "title": "Coffee",
+        "content": "Talked about engines",
+        "contact_ids": [ada],
+        "interaction_date": datetime.now(UTC).isoformat()
+    }).json()["id"]
+
+    assert client.get(f"/notes/{note_id}").json()["contact_ids"] == [ada]
+    assert client.get(f"/contacts/{grace}").json()["last_contacted"] is None
+    assert client.get(f"/contacts/{grace}/notes").json() == []
+
+    # Linking updates the note, the contact's notes and its last_contacted
+    client.post(f"/notes/{note_id}/contacts/{grace}")
+    assert sorted(client.get(f"/notes/{note_id}").json()["contact_ids"]) == sorted([ada, grace])
+    assert client.get(f"/contacts/{grace}").json()["last_contacted"] is not None
+    assert [n["id"] for n in client.get(f"/contacts/{grace}/notes").json()] == [note_id]
+
+    client.put(f"/notes/{note_id}", json={"title": "Tea"})
+    assert client.get(f"/notes/{note_id}").json()["title"] == "Tea"
+    assert client.get("/notes/").json()[0]["title"] == "Tea"
+
+    client.delete(f"/notes/{note_id}")
+    assert client.get(f"/notes/{note_id}").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/notes/").json() == []
+
+def test_health_reports_cache_stats(client):
+    contact_id = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+    client.get(f"/contacts/{contact_id}")
+    client.get(f"/contacts/{contact_id}")
+
+    cache = client.get("/health").json()["cache"]
+    assert cache["backend"] == response_cache.name
+    assert cache["hits"] == 1
+    assert cache["misses"] == 1
+    assert cache["hit_ratio"] == 0.5
@@ -0,0 +1,119 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from sqlalchemy import func, select, update
+
+from app.models.change import Change
+from app.services import change_feed
+
+def _feed(client, since=None):
+    url = "/changes/" if since is None else f"/changes/?since={since}"
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+def _summary(feed):
+    return [(c["entity"], c["action"], c["contact_id"], c["note_id"]) for c in feed["changes"]]
+
+def test_change_feed_records_changes_in_order(client):
+    start = _feed(client)["next_token"]
+    
+    contact_id = client.post("/contacts/", json={"first_name": "Felix", "last_name": "Feed"}).json()["id"]
+    client.put(f"/contacts/{contact_id}", json={"city": "Rome"})
+    note_id = client.post("/notes/", json={"content": "Espresso", "contact_ids": [contact_id]}).json()["id"]
+    
+    feed = _feed(client, start)
+    assert _summary(feed) == [
+        ("contact", "created", contact_id, None),
+        ("contact", "updated", contact_id, None),
+        ("note", "created", None, note_id),
+        ("link", "created", contact_id, note_id),
+        ("contact", "updated", contact_id, None),
+    ]
+    # Upserts carry the current state
+    assert feed["changes"][0]["data"]["city"] == "Rome"
+    assert feed["changes"][2]["data"]["contact_ids"] == [contact_id]
+    assert feed["has_more"] is False
+    
+    # Nothing new after the returned token
+    assert _feed(client, feed["next_token"])["changes"] == []
+
+def test_change_feed_tombstones(client):
+    contact_id = client.post("/contacts/", json={"first_name": "Tomb", "last_name": "Stone"}).json()["id"]
+    other_id = client.post("/contacts/", json={"first_name": "Other", "last_name": "Stone"}).json()["id"]
+    note_id = client.post("/notes/", json={"content": "Walk", "contact_ids": [contact_id, other_id]}).json()["id"]
+    start = _feed(client)["next_token"]
+    while True:
+        page = _feed(client, start)
+        if not page["has_more"]:
+            start = page["next_token"]
+            break
+        start = page["next_token"]
+    
+    client.delete(f"/notes/{note_id}/contacts/{other_id}")
+    client.delete(f"/contacts/{contact_id}")
+    
+    changes = _feed(client, start)["changes"]
+    assert _summary({"changes": changes}) == [
+        ("link", "deleted", other_id, note_id),
+        ("link", "deleted", contact_id, note_id),
+        ("contact", "deleted", contact_id, None),
+    ]
+    assert all(change["data"] is None for change in changes)
+
+def test_change_feed_paging_and_invalid_token(client):
+    for i in range(3):
+        client.post("/contacts/", json={"first_name": f"Pager{i}", "last_name": "Feed"})
+    
+    feed = client.get("/changes/?limit=2").json()
+    assert len(feed["changes"]) == 2
+    assert feed["has_more"] is True
+    
+    response = client.get("/changes/?since=garbage")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.parametrize("db_mode", ["sync"])
+def test_change_feed_entries_are_written_at_commit(client, db_session):
+    before = db_session.scalar(select(func.count(Change.id)))
+    change_feed.record_changes(db_session, "contact", "updated", [{"contact_id": 1}])
+    # Ids are handed out at commit, in commit order
+    assert db_session.scalar(select(func.count(Change.id))) == before
+    db_session.commit()
+    assert db_session.scalar(select(func.count(Change.id))) == before + 1
+
+@pytest.mark.parametrize("db_mode", ["sync"])
+def test_pruned_change_feed_expires_old_tokens(client, db_session):
+    client.post("/contacts/", json={"first_name": "Old", "last_name": "Feed"})
+    old_token = _feed(client)["next_token"]
+    client.post("/contacts/", json={"first_name": "Older", "last_name": "Feed"})
+    client.post("/contacts/", json={"first_name": "Recent", "last_name": "Feed"})
+    recent = client.get(f"/changes/?since={old_token}&limit=1").json()["next_token"]
+    
+    # Everything but the newest entry is past retention
+    newest = db_session.scalar(select(func.max(Change.id)))
+    db_session.execute(
+        update(Change).where(Change.id < newest).values(changed_at=datetime.utcnow() - timedelta(days=40))
+    )
+    assert change_feed.prune_changes(db_session, retention_days=30)["pruned"] > 0
+    assert change_feed.prune_changes(db_session, retention_days=0)["pruned"] == 0
+    db_session.commit()
+    assert db_session.scalar(select(Change.id)) == newest
+    
+    # A client that saw every pruned entry still gets the rest
+    feed = _feed(client, recent)
+    assert [change["data"]["first_name"] for change in feed["changes"]] == ["Recent"]
+    
+    # Older tokens, and starting without one, would miss "Old" and "Older"
+    for url in (f"/changes/?since={old_token}", "/changes/"):
+        response = client.get(url)
+        assert response.status_code == status.HTTP_410_GONE
+        detail = response.json()["detail"]
+        assert detail["resync"] == "/export/"
+    # The snapshot has everything, and the feed goes on from the 410's token
+    records = [json.loads(line) for line in client.get(detail["resync"]).text.splitlines()]
+    assert [r["first_name"] for r in records if r["type"] == "contact"] == ["Old", "Older", "Recent"]
+    assert _feed(client, detail["next_token"])["changes"] == []
+    client.post("/contacts/", json={"first_name": "Later", "last_name": "Feed"})
+    assert _summary(_feed(client, detail["next_token"]))[0][:2] == ("contact", "created")
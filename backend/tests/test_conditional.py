@@ -0,0 +1,94 @@
+import pytest
+from fastapi import status
+
+from app.services.cache import response_cache
+
+def _create_contact(client, first_name="Ada"):
+    return client.post("/contacts/", json={"first_name": first_name, "last_name": "Lovelace"}).json()["id"]
+
+def test_read_contact_if_none_match(client):
+    contact_id = _create_contact(client)
+
+    response = client.get(f"/contacts/{contact_id}")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "Last-Modified" in response.headers
+
+    response = client.get(f"/contacts/{contact_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    # Lists of tags and the weak/strong form both match
+    response = client.get(f"/contacts/{contact_id}", headers={"If-None-Match": f'"other", {etag[2:]}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.put(f"/contacts/{contact_id}", json={"first_name": "Augusta"})
+    response = client.get(f"/contacts/{contact_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["first_name"] == "Augusta"
+    assert response.headers["ETag"] != etag
+
+def test_not_modified_skips_loading(client, query_counter):
+    contact_id = _create_contact(client)
+    etag = client.get(f"/contacts/{contact_id}").headers["ETag"]
+    response_cache.clear()
+
+    # Only the version is looked up, the contact itself is not loaded
+    with query_counter() as queries:
+        response = client.get(f"/contacts/{contact_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert queries.count == 1
+    assert "changes" in queries.statements[0]
+
+def test_read_contact_if_modified_since(client):
+    contact_id = _create_contact(client)
+    last_modified = client.get(f"/contacts/{contact_id}").headers["Last-Modified"]
+
+    response = client.get(f"/contacts/{contact_id}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = client.get(f"/contacts/{contact_id}", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get(f"/contacts/{contact_id}", headers={"If-Modified-Since": "not a date"})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_missing_contact_is_not_304(client):
+    response = client.get("/contacts/999999", headers={"If-None-Match": "*"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_empty_list_has_no_etag(client):
+    response = client.get("/contacts/", headers={"If-None-Match": "*"})
+    assert response.status_code == status.HTTP_200_OK
+    assert "ETag" not in response.headers
+
+@pytest.mark.parametrize("url", ["/contacts/", "/notes/", "/notes/?include_contacts=true"])
+def test_list_etag_changes_with_collection(client, url):
+    contact_id = _create_contact(client)
+    client.post("/notes/", json={"content": "Coffee", "contact_ids": [contact_id]})
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    contact_id = _create_contact(client, "Grace")
+    client.post("/notes/", json={"content": "Tea", "contact_ids": [contact_id]})
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+def test_note_etag_changes_with_links(client):
+    ada = _create_contact(client)
+    grace = _create_contact(client, "Grace")
+    note_id = client.post("/notes/", json={"content": "Coffee", "contact_ids": [ada]}).json()["id"]
+    etag = client.get(f"/notes/{note_id}").headers["ETag"]
+    contacts_etag = client.get(f"/contacts/{grace}/notes").headers["ETag"]
+
+    client.post(f"/notes/{note_id}/contacts/{grace}")
+
+    response = client.get(f"/notes/{note_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(response.json()["contact_ids"]) == sorted([ada, grace])
+    response = client.get(f"/contacts/{grace}/notes", headers={"If-None-Match": contacts_etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert [note["id"] for note in response.json()] == [note_id]
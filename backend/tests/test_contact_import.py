@@ -0,0 +1,94 @@
+import pytest
+from fastapi import status
+
+LINKEDIN_CSV = """Notes:
+"When exporting your connection data, you may notice that some of the email addresses are missing."
+
+First Name,Last Name,URL,Email Address,Company,Position,Connected On
+Ingrid,Import,https://www.linkedin.com/in/ingrid-import,,Acme,Engineer,01 Jan 2024
+Oscar,Orbit,https://www.linkedin.com/in/oscar-orbit,,Acme,Manager,02 Jan 2024
+,Nofirst,https://www.linkedin.com/in/nofirst,,,,03 Jan 2024
+"""
+
+VCARDS = """BEGIN:VCARD
+VERSION:3.0
+N:Vega;Valentina;;;
+FN:Valentina Vega
+NICKNAME:Val
+ADR;TYPE=home:;;1 Main St;Lisbon;;1000;Portugal
+URL:https://www.linkedin.com/in/valentina
+ -vega
+END:VCARD
+BEGIN:VCARD
+VERSION:4.0
+FN:Walter White
+END:VCARD
+"""
+
+def test_bulk_create_contacts(client):
+    payload = [
+        {"first_name": "Bulk", "last_name": "One"},
+        {"first_name": "Bulk", "last_name": "Two", "city": "Oslo"},
+        {"last_name": "Missing first name"},
+        {"first_name": "Bulk", "last_name": "Three"},
+    ]
+    response = client.post("/contacts/bulk?batch_size=2", json=payload)
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    
+    assert result["received"] == 4
+    assert result["created"] == 3
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 3
+    assert "first_name" in result["errors"][0]["error"]
+    assert result["batches"] == 2
+    assert result["rows_per_second"] >= 0
+    
+    response = client.get("/contacts/?search=Bulk")
+    assert {contact["last_name"] for contact in response.json()} >= {"One", "Two", "Three"}
+
+def test_import_linkedin_csv(client):
+    response = client.post(
+        "/contacts/import",
+        content=LINKEDIN_CSV.encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["created"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 7
+    
+    response = client.get("/contacts/?search=Ingrid Import")
+    data = response.json()
+    assert data[0]["linkedin_url"] == "https://www.linkedin.com/in/ingrid-import"
+
+def test_import_vcard(client):
+    response = client.post("/contacts/import?format=vcard", content=VCARDS.encode())
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["created"] == 2
+    
+    response = client.get("/contacts/?search=Valentina")
+    contact = response.json()[0]
+    assert contact["last_name"] == "Vega"
+    assert contact["nickname"] == "Val"
+    assert contact["city"] == "Lisbon"
+    assert contact["linkedin_url"] == "https://www.linkedin.com/in/valentina-vega"
+    
+    response = client.get("/contacts/?search=Walter White")
+    assert response.json()[0]["last_name"] == "White"
+
+def test_import_jsonl_reports_bad_lines(client):
+    body = '{"first_name": "Jason", "last_name": "Lines"}\nnot json\n["a list"]\n'
+    response = client.post(
+        "/contacts/import",
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    result = response.json()
+    assert result["created"] == 1
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+
+def test_import_unknown_content_type(client):
+    response = client.post("/contacts/import", content=b"x", headers={"Content-Type": "image/png"})
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
@@ -0,0 +1,145 @@
+import pytest
+from fastapi import status
+from datetime import datetime, timedelta
+
+from app.services.contact_stats import DEFAULT_CADENCE_DAYS, MIN_CADENCE_DAYS, effective_cadence
+
+def _contact(client, first_name):
+    response = client.post("/contacts/", json={"first_name": first_name, "last_name": "Test"})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["id"]
+
+def _note(client, contact_ids, days_ago):
+    date = datetime.utcnow() - timedelta(days=days_ago)
+    response = client.post("/notes/", json={
+        "content": "Caught up", "contact_ids": contact_ids, "interaction_date": date.isoformat()
+    })
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["id"]
+
+def _due(client, **params):
+    response = client.get("/contacts/due", params=params)
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+def test_effective_cadence():
+    assert effective_cadence(14, 10, datetime(2026, 1, 1), datetime(2026, 2, 1)) == 14
+    assert effective_cadence(None, 0, None, None) == DEFAULT_CADENCE_DAYS
+    assert effective_cadence(None, 1, datetime(2026, 1, 1), datetime(2026, 1, 1)) == DEFAULT_CADENCE_DAYS
+    # Three interactions 30 days apart
+    assert effective_cadence(None, 3, datetime(2026, 1, 1), datetime(2026, 3, 2)) == 30
+    assert effective_cadence(None, 5, datetime(2026, 1, 1), datetime(2026, 1, 2)) == MIN_CADENCE_DAYS
+
+def test_due_contacts_ranked_by_how_overdue(client):
+    recent = _contact(client, "Recent")
+    old = _contact(client, "Old")
+    older = _contact(client, "Older")
+    _contact(client, "New")  # added today, not due
+    _note(client, [recent], days_ago=10)
+    _note(client, [old], days_ago=100)
+    _note(client, [older], days_ago=200)
+
+    due = _due(client)
+    assert [c["id"] for c in due] == [older, old]
+    assert due[0]["first_name"] == "Older"
+    assert due[0]["interaction_count"] == 1
+    assert due[0]["effective_cadence_days"] == DEFAULT_CADENCE_DAYS
+    assert due[0]["overdue_days"] == pytest.approx(200 - DEFAULT_CADENCE_DAYS, abs=0.1)
+    assert due[0]["overdue_days"] > due[1]["overdue_days"] > 0
+
+    upcoming = _due(client, include_upcoming=True)
+    assert [c["id"] for c in upcoming][:2] == [older, old]
+    assert len(upcoming) == 4
+    assert upcoming[-1]["overdue_days"] < 0
+
+    assert [c["id"] for c in _due(client, limit=1, skip=1)] == [old]
+
+def test_due_contacts_cadence_from_interaction_history(client):
+    frequent = _contact(client, "Frequent")
+    for days_ago in (60, 40, 20):
+        _note(client, [frequent], days_ago=days_ago)
+
+    due = _due(client)
+    assert [c["id"] for c in due] == [frequent]
+    assert due[0]["effective_cadence_days"] == 20
+    assert due[0]["interaction_count"] == 3
+    assert due[0]["overdue_days"] == pytest.approx(0, abs=0.1)
+
+def test_set_cadence(client):
+    contact_id = _contact(client, "Weekly")
+    _note(client, [contact_id], days_ago=10)
+    assert _due(client) == []
+
+    response = client.put(f"/contacts/{contact_id}/cadence", json={"cadence_days": 7})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["cadence_days"] == 7
+    assert response.json()["effective_cadence_days"] == 7
+    assert response.json()["overdue_days"] == pytest.approx(3, abs=0.1)
+    assert [c["id"] for c in _due(client)] == [contact_id]
+
+    # Later interactions keep the cadence
+    _note(client, [contact_id], days_ago=2)
+    assert _due(client, include_upcoming=True)[0]["cadence_days"] == 7
+
+    response = client.put(f"/contacts/{contact_id}/cadence", json={"cadence_days": None})
+    assert response.json()["cadence_days"] is None
+    # Back to the cadence of the history: 8 days
+    assert response.json()["effective_cadence_days"] == 8
+
+def test_set_cadence_validation(client):
+    contact_id = _contact(client, "Someone")
+    response = client.put(f"/contacts/{contact_id}/cadence", json={"cadence_days": 0})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = client.put("/contacts/999/cadence", json={"cadence_days": 7})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_due_contacts_follow_note_changes(client):
+    contact_id = _contact(client, "Busy")
+    other_id = _contact(client, "Other")
+    old_note = _note(client, [contact_id], days_ago=120)
+    assert [c["id"] for c in _due(client)] == [contact_id]
+
+    # A newer interaction makes them no longer due
+    recent_note = _note(client, [contact_id], days_ago=5)
+    assert _due(client) == []
+
+    # ...until it is moved back in time
+    response = client.put(f"/notes/{recent_note}", json={
+        "interaction_date": (datetime.utcnow() - timedelta(days=110)).isoformat()
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert [c["id"] for c in _due(client)] == [contact_id]
+
+    # Linking a recent note to them
+    other_note = _note(client, [other_id], days_ago=1)
+    response = client.post(f"/notes/{other_note}/contacts/{contact_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert _due(client) == []
+
+    # ...and unlinking it again
+    response = client.delete(f"/notes/{other_note}/contacts/{contact_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert [c["id"] for c in _due(client)] == [contact_id]
+
+    # Deleting their notes leaves the date they were added
+    client.delete(f"/notes/{old_note}")
+    client.delete(f"/notes/{recent_note}")
+    assert _due(client) == []
+    due = _due(client, include_upcoming=True)
+    assert {c["id"]: c["interaction_count"] for c in due} == {contact_id: 0, other_id: 1}
+
+def test_deleted_contacts_leave_the_ranking(client):
+    contact_id = _contact(client, "Gone")
+    _note(client, [contact_id], days_ago=200)
+    assert [c["id"] for c in _due(client)] == [contact_id]
+
+    client.delete(f"/contacts/{contact_id}")
+    assert _due(client, include_upcoming=True) == []
+
+def test_due_contacts_is_one_indexed_query(client, query_counter):
+    for i in range(5):
+        _note(client, [_contact(client, f"Contact{i}")], days_ago=100 + i)
+
+    with query_counter() as queries:
+        assert len(_due(client)) == 5
+    assert queries.count == 1
@@ -138,4 +138,85 @@ def test_delete_contact(client):
     
     # Verify it's deleted
     get_response = client.get(f"/contacts/{contact_id}")
-    assert get_response.status_code == status.HTTP_404_NOT_FOUND 
\ No newline at end of file
+    assert get_response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_search_contacts_ignores_accents(client):
+    client.post("/contacts/", json={"first_name": "José", "last_name": "Álvarez"})
+    
+    response = client.get("/contacts/?search=jose alva")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert any(contact["first_name"] == "José" for contact in data)
+    
+    # Accented queries match too
+    response = client.get("/contacts/?search=Álv")
+    assert any(contact["last_name"] == "Álvarez" for contact in response.json())
+
+def test_search_contacts_matches_word_prefixes(client):
+    client.post("/contacts/", json={"first_name": "Alice", "last_name": "Marlowe"})
+    
+    assert [contact["first_name"] for contact in client.get("/contacts/?search=ali").json()] == ["Alice"]
+    # FTS5 matches the start of words, not substrings inside them
+    assert client.get("/contacts/?search=ice").json() == []
+
+def test_search_contacts_reflects_updates(client):
+    create_response = client.post("/contacts/", json={"first_name": "Renata", "last_name": "Quill"})
+    contact_id = create_response.json()["id"]
+    
+    client.put(f"/contacts/{contact_id}", json={"nickname": "Zephyr"})
+    response = client.get("/contacts/?search=zeph")
+    assert [contact["id"] for contact in response.json()] == [contact_id]
+    
+    client.delete(f"/contacts/{contact_id}")
+    response = client.get("/contacts/?search=zeph")
+    assert response.json() == []
+
+def test_read_contacts_cursor_pagination(client):
+    created_ids = []
+    for i in range(5):
+        response = client.post("/contacts/", json={"first_name": f"Page{i}", "last_name": "Cursor"})
+        created_ids.append(response.json()["id"])
+    
+    seen = []
+    response = client.get("/contacts/?limit=2")
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(contact["id"] for contact in page)
+        
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        # Rows created between pages must not shift the following pages
+        client.post("/contacts/", json={"first_name": "Late", "last_name": "Arrival"})
+        response = client.get(f"/contacts/?limit=2&cursor={cursor}")
+    
+    assert len(seen) == len(set(seen))
+    assert set(created_ids) <= set(seen)
+
+def test_read_contacts_invalid_cursor(client):
+    response = client.get("/contacts/?cursor=not-a-cursor")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_contact_notes_date_range(client):
+    contact_response = client.post("/contacts/", json={"first_name": "Rhea", "last_name": "Range"})
+    contact_id = contact_response.json()["id"]
+    
+    for day in ("2024-03-01", "2024-03-10", "2024-03-20"):
+        client.post("/notes/", json={
+            "content": f"Catch-up on {day}",
+            "contact_ids": [contact_id],
+            "interaction_date": f"{day}T09:00:00"
+        })
+    
+    response = client.get(
+        f"/contacts/{contact_id}/notes?start_date=2024-03-05T00:00:00&end_date=2024-03-20T09:00:00"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [note["content"] for note in data] == ["Catch-up on 2024-03-20", "Catch-up on 2024-03-10"]
+
+def test_get_contact_notes_not_found(client):
+    response = client.get("/contacts/999999/notes")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,134 @@
+import pytest
+from fastapi import status
+
+from app.services.dedupe import blocking_keys, linkedin_slug, soundex
+
+def _contact(client, first_name, last_name, **fields):
+    response = client.post("/contacts/", json={"first_name": first_name, "last_name": last_name, **fields})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["id"]
+
+def _note(client, contact_ids):
+    response = client.post("/notes/", json={"content": "Lunch", "contact_ids": contact_ids})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["id"]
+
+def _pairs(client, **params):
+    response = client.get("/contacts/duplicates", params=params)
+    assert response.status_code == status.HTTP_200_OK
+    return [(p["contact"]["id"], p["duplicate"]["id"]) for p in response.json()]
+
+@pytest.mark.parametrize("name,code", [
+    ("robert", "R163"), ("rupert", "R163"), ("ashcraft", "A261"), ("tymczak", "T522"), ("pfister", "P236"),
+    ("lee", "L000"), ("", ""),
+])
+def test_soundex(name, code):
+    assert soundex(name) == code
+
+@pytest.mark.parametrize("url", [
+    "https://www.linkedin.com/in/Ada-Lovelace/",
+    "http://linkedin.com/in/ada-lovelace?trk=profile",
+    "linkedin.com/in/ada-lovelace",
+    "ada-lovelace",
+])
+def test_linkedin_slug(url):
+    assert linkedin_slug(url) == "ada-lovelace"
+
+def test_linkedin_slug_rejects_other_urls():
+    assert linkedin_slug("https://example.com/ada") == ""
+    assert linkedin_slug(None) == ""
+
+def test_blocking_keys():
+    assert blocking_keys("Bob", "Smith", None, None) == blocking_keys("Robert", "Smyth", None, None)
+    assert blocking_keys("Smith", "Robert", None, None) == blocking_keys("Robert", "Smith", None, None)
+    assert "linkedin:ada-lovelace" in blocking_keys("Ada", "Lovelace", None, "linkedin.com/in/ada-lovelace")
+    # The nickname field adds a key of its own
+    assert len(blocking_keys("Margaret", "Hamilton", "Peggy", None)) == 1
+    assert len(blocking_keys("Margaret", "Hamilton", "Maggie", None)) == 1
+    assert len(blocking_keys("Margaret", "Hamilton", "Meg", None)) == 1
+    assert len(blocking_keys("Grace", "Hopper", "Amazing", None)) == 2
+
+def test_find_duplicates(client):
+    robert = _contact(client, "Robert", "Smith", city="Berlin")
+    bob = _contact(client, "Bob", "Smith", city="Berlin")
+    john = _contact(client, "John", "Doe")
+    jane = _contact(client, "Jane", "Doe")
+    ada = _contact(client, "Ada", "Lovelace", linkedin_url="https://www.linkedin.com/in/ada-lovelace/")
+    countess = _contact(client, "Augusta", "King", linkedin_url="linkedin.com/in/Ada-Lovelace")
+    swapped = _contact(client, "Lovelace", "Ada")
+    _contact(client, "Alan", "Turing")
+
+    data = client.get("/contacts/duplicates").json()
+    pairs = _pairs(client)
+    assert set(pairs) == {(ada, countess), (robert, bob), (ada, swapped)}
+    scores = [pair["score"] for pair in data]
+    assert scores == sorted(scores, reverse=True)
+
+    linkedin_pair = data[pairs.index((ada, countess))]
+    assert linkedin_pair["score"] == 1.0
+    assert linkedin_pair["reasons"] == ["same LinkedIn profile"]
+    bob_pair = data[pairs.index((robert, bob))]
+    assert "nickname of the same first name" in bob_pair["reasons"]
+    assert "same city" in bob_pair["reasons"]
+    assert "first and last name swapped" in data[pairs.index((ada, swapped))]["reasons"]
+
+    # John and Jane Doe sound alike but score low
+    assert (john, jane) in _pairs(client, min_score=0.5)
+    assert len(_pairs(client, limit=1)) == 1
+
+def test_duplicates_follow_contact_changes(client):
+    first = _contact(client, "Katherine", "Johnson")
+    second = _contact(client, "Ada", "Byron")
+    assert _pairs(client) == []
+
+    client.put(f"/contacts/{second}", json={"first_name": "Kathy", "last_name": "Johnson"})
+    assert _pairs(client) == [(first, second)]
+
+    client.delete(f"/contacts/{second}")
+    assert _pairs(client) == []
+
+def test_duplicates_is_constant_queries(client, query_counter):
+    for i in range(5):
+        _contact(client, "Robert", f"Smith{'e' * i}")
+    with query_counter() as queries:
+        assert len(_pairs(client, min_score=0.5)) == 10
+    assert queries.count == 2
+
+def test_merge_contacts(client):
+    target = _contact(client, "Robert", "Smith")
+    source = _contact(client, "Bob", "Smith", city="Berlin", linkedin_url="linkedin.com/in/bob")
+    other_source = _contact(client, "Rob", "Smith", city="Paris")
+    friend = _contact(client, "Alan", "Turing")
+    shared = _note(client, [target, source])
+    only_source = _note(client, [source, friend])
+    both_sources = _note(client, [source, other_source])
+
+    response = client.post("/contacts/merge", json={"target_id": target, "source_ids": [source, other_source]})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["id"] == target
+    assert data["first_name"] == "Robert"
+    # Empty fields are filled from the sources, in order
+    assert data["city"] == "Berlin"
+    assert data["linkedin_url"] == "linkedin.com/in/bob"
+    assert data["last_contacted"] is not None
+
+    assert client.get(f"/contacts/{source}").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"/contacts/{other_source}").status_code == status.HTTP_404_NOT_FOUND
+    note_ids = {note["id"] for note in client.get(f"/contacts/{target}/notes").json()}
+    assert note_ids == {shared, only_source, both_sources}
+    assert set(client.get(f"/notes/{only_source}").json()["contact_ids"]) == {target, friend}
+    assert client.get(f"/notes/{both_sources}").json()["contact_ids"] == [target]
+
+    # The graph and the duplicate index see the merge
+    assert [c["contact"]["id"] for c in client.get(f"/contacts/{friend}/network").json()["connections"]] == [target]
+    assert _pairs(client) == []
+
+def test_merge_contacts_errors(client):
+    target = _contact(client, "Robert", "Smith")
+    response = client.post("/contacts/merge", json={"target_id": target, "source_ids": [target]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/contacts/merge", json={"target_id": target, "source_ids": [999]})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.post("/contacts/merge", json={"target_id": target, "source_ids": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
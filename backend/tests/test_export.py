@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from fastapi import status
+
+def _create_contact_with_note(client, first_name):
+    contact_response = client.post("/contacts/", json={"first_name": first_name, "last_name": "Export"})
+    contact_id = contact_response.json()["id"]
+    note_response = client.post("/notes/", json={"content": f"Lunch with {first_name}", "contact_ids": [contact_id]})
+    return contact_id, note_response.json()["id"]
+
+def test_export_ndjson(client):
+    contact_id, note_id = _create_contact_with_note(client, "Nadia")
+    
+    response = client.get("/export/")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    
+    assert {"type": "link", "contact_id": contact_id, "note_id": note_id} in records
+    contact = next(r for r in records if r["type"] == "contact" and r["id"] == contact_id)
+    assert contact["first_name"] == "Nadia"
+    note = next(r for r in records if r["type"] == "note" and r["id"] == note_id)
+    assert note["content"] == "Lunch with Nadia"
+    
+    # Contacts come first, then notes, then links
+    types = [record["type"] for record in records]
+    assert types == sorted(types, key=["contact", "note", "link"].index)
+
+def test_export_csv(client):
+    contact_id, _ = _create_contact_with_note(client, "Carla")
+    
+    response = client.get("/export/?format=csv&entity=contacts")
+    assert response.status_code == status.HTTP_200_OK
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    row = next(r for r in rows if r["id"] == str(contact_id))
+    assert row["first_name"] == "Carla"
+    assert row["nickname"] == ""
+
+def test_export_since(client):
+    _create_contact_with_note(client, "Sincere")
+    
+    future = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    response = client.get(f"/export/?since={future}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == ""
+    
+    past = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    response = client.get(f"/export/?since={past}")
+    assert any(json.loads(line)["type"] == "link" for line in response.text.splitlines())
+
+def test_export_since_includes_new_links_of_old_notes(client):
+    contact_id = client.post("/contacts/", json={"first_name": "Linda", "last_name": "Export"}).json()["id"]
+    other_id = client.post("/contacts/", json={"first_name": "Otto", "last_name": "Export"}).json()["id"]
+    note_id = client.post("/notes/", json={
+        "content": "Old lunch", "contact_ids": [contact_id], "interaction_date": "2020-01-01T12:00:00",
+    }).json()["id"]
+    # Otto's last_contacted is newer than the old note, so linking leaves it
+    client.post("/notes/", json={"content": "Call", "contact_ids": [other_id], "interaction_date": "2024-01-01T12:00:00"})
+    since = datetime.utcnow().isoformat()
+    
+    # Links the existing contact to the existing note without changing either
+    client.post(f"/notes/{note_id}/contacts/{other_id}")
+    records = [json.loads(line) for line in client.get(f"/export/?since={since}").text.splitlines()]
+    assert {"type": "link", "contact_id": other_id, "note_id": note_id} in records
+    assert [r["id"] for r in records if r["type"] == "note"] == [note_id]
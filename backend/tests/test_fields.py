@@ -0,0 +1,97 @@
+from fastapi import status
+
+def _contacts(client, count=3):
+    return [
+        client.post("/contacts/", json={
+            "first_name": f"First{i}", "last_name": f"Last{i}", "how_we_met": "A long story " * 50,
+        }).json()["id"]
+        for i in range(count)
+    ]
+
+def _selects(queries):
+    return [statement for statement in queries.statements if statement.lstrip().upper().startswith("SELECT")]
+
+def test_contact_list_fields(client, query_counter):
+    _contacts(client)
+    with query_counter() as queries:
+        response = client.get("/contacts/?fields=first_name,last_name&limit=2")
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    # id always comes along
+    assert [set(contact) for contact in page] == [{"id", "first_name", "last_name"}] * 2
+    # The wide column is not selected at all
+    assert not any("how_we_met" in statement for statement in _selects(queries))
+
+    # Cursor pagination works on the projected rows
+    cursor = response.headers["X-Next-Cursor"]
+    rest = client.get(f"/contacts/?fields=first_name,last_name&limit=2&cursor={cursor}").json()
+    assert len(rest) == 1
+    assert {c["id"] for c in page + rest} == {c["id"] for c in client.get("/contacts/").json()}
+
+def test_contact_fields(client):
+    contact_id = _contacts(client, 1)[0]
+    response = client.get(f"/contacts/{contact_id}?fields=city,last_name")
+    assert response.json() == {"id": contact_id, "last_name": "Last0", "city": None}
+    full = client.get(f"/contacts/{contact_id}")
+    assert full.json()["how_we_met"].startswith("A long story")
+    # Another representation, another ETag
+    assert response.headers["ETag"] != full.headers["ETag"]
+
+    # Cached fieldsets follow changes
+    client.put(f"/contacts/{contact_id}", json={"city": "Lisbon"})
+    assert client.get(f"/contacts/{contact_id}?fields=city,last_name").json()["city"] == "Lisbon"
+    assert client.get("/contacts/?fields=city").json() == [{"id": contact_id, "city": "Lisbon"}]
+
+def test_unknown_fields(client):
+    response = client.get("/contacts/?fields=first_name,password,salary")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Unknown fields: password, salary"
+    assert client.get("/notes/1?fields=secret").status_code == status.HTTP_400_BAD_REQUEST
+
+def test_note_fields(client, query_counter):
+    ada, bob, _ = _contacts(client)
+    note_id = client.post("/notes/", json={
+        "title": "Lunch", "content": "Long notes " * 100, "contact_ids": [ada, bob],
+    }).json()["id"]
+
+    with query_counter() as queries:
+        notes = client.get("/notes/?fields=title,interaction_date").json()
+    assert notes[0].keys() == {"id", "title", "interaction_date"}
+    assert not any("content" in statement for statement in _selects(queries))
+    # Without contact_ids, contact_notes is not queried
+    assert not any("contact_notes" in statement for statement in _selects(queries))
+
+    assert client.get(f"/notes/{note_id}?fields=contact_ids").json() == {"id": note_id, "contact_ids": [ada, bob]}
+    note = client.get(f"/notes/{note_id}?fields=title,contacts&include_contacts=true").json()
+    assert note["title"] == "Lunch"
+    assert [contact["id"] for contact in note["contacts"]] == [ada, bob]
+    assert client.get(f"/contacts/{ada}/notes?fields=title").json() == [{"id": note_id, "title": "Lunch"}]
+
+    client.delete(f"/notes/{note_id}/contacts/{bob}")
+    assert client.get(f"/notes/{note_id}?fields=contact_ids").json()["contact_ids"] == [ada]
+
+def test_note_fields_embed_contacts(client):
+    ada, bob, _ = _contacts(client)
+    note_id = client.post("/notes/", json={"title": "Lunch", "content": "Soup", "contact_ids": [ada, bob]}).json()["id"]
+
+    # Asking for contacts embeds them without include_contacts
+    notes = client.get("/notes/?fields=contacts").json()
+    assert [contact["id"] for contact in notes[0]["contacts"]] == [ada, bob]
+    # and include_contacts adds them to the fields
+    note = client.get(f"/notes/{note_id}?fields=title&include_contacts=true").json()
+    assert note.keys() == {"id", "title", "contacts"}
+    assert [contact["id"] for contact in note["contacts"]] == [ada, bob]
+    notes = client.get(f"/contacts/{ada}/notes?fields=title&include_contacts=true").json()
+    assert [contact["id"] for contact in notes[0]["contacts"]] == [ada, bob]
+
+def test_fields_responses_are_documented(client):
+    schema = client.get("/openapi.json").json()
+    sparse = schema["components"]["schemas"]["SparseContact"]
+    # Only id is always there
+    assert sparse["required"] == ["id"]
+    response = schema["paths"]["/contacts/{contact_id}"]["get"]["responses"]["200"]["content"]["application/json"]
+    assert response["schema"]["anyOf"] == [
+        {"$ref": "#/components/schemas/Contact"}, {"$ref": "#/components/schemas/SparseContact"},
+    ]
+    notes = schema["paths"]["/notes/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert {"$ref": "#/components/schemas/SparseNoteWithContacts"} in [option["items"] for option in notes["anyOf"]]
@@ -0,0 +1,162 @@
+import pytest
+from fastapi import status
+
+from app.services import graph as graph_service
+from app.services.graph import ContactGraph
+
+# (note_id, contact_id)
+LINKS = [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (3, 3), (3, 4), (4, 5)]
+
+def test_graph_built_from_links():
+    graph = ContactGraph(LINKS)
+    assert graph.neighbors(1) == {2: 2, 3: 1}
+    assert graph.neighbors(3) == {1: 1, 2: 1, 4: 1}
+    assert graph.neighbors(5) == {}
+    assert graph.neighbors(99) == {}
+    assert list(graph.edges()) == [(1, 2, 2), (1, 3, 1), (2, 3, 1), (3, 4, 1)]
+    assert graph.status()["edges"] == 4
+
+def test_graph_applies_link_changes():
+    graph = ContactGraph(LINKS)
+    graph.apply(True, [(5, 3)])
+    assert graph.neighbors(5) == {3: 1, 4: 1}
+    assert graph.neighbors(3)[5] == 1
+
+    # Replays are no-ops
+    graph.apply(True, [(5, 3)])
+    assert graph.neighbors(5) == {3: 1, 4: 1}
+
+    # (contact_id, note_id) like the events: note 2 loses both contacts
+    graph.apply(False, [(1, 2), (2, 2)])
+    assert graph.neighbors(1) == {2: 1, 3: 1}
+    graph.apply(False, [(1, 2)])
+    assert graph.neighbors(1) == {2: 1, 3: 1}
+
+    # A new contact only in the overlay
+    graph.apply(True, [(6, 4)])
+    assert graph.neighbors(6) == {5: 1}
+    assert (5, 6, 1) in list(graph.edges())
+
+def test_graph_compaction_keeps_the_edges(monkeypatch):
+    overlaid = ContactGraph(LINKS)
+    changes = [(True, [(4, 1)]), (False, [(1, 1)]), (True, [(7, 2)]), (False, [(2, 2)])]
+    for added, links in changes:
+        overlaid.apply(added, links)
+    assert overlaid.status()["overlay_entries"] > 0
+
+    monkeypatch.setattr(graph_service, "MIN_COMPACT_ENTRIES", 0)
+    compacted = ContactGraph(LINKS)
+    for added, links in changes:
+        compacted.apply(added, links)
+    assert compacted.status()["overlay_entries"] == 0
+
+    final_links = [(1, 2), (1, 3), (1, 4), (2, 1), (2, 7), (3, 3), (3, 4), (4, 5)]
+    rebuilt = list(ContactGraph(final_links).edges())
+    assert list(overlaid.edges()) == rebuilt
+    assert list(compacted.edges()) == rebuilt
+
+def test_shortest_path_prefers_strong_connections():
+    graph = ContactGraph([
+        (1, 1), (1, 2), (2, 1), (2, 2),   # 1-2 twice
+        (3, 1), (3, 3),                   # 1-3 once
+        (4, 2), (4, 4), (5, 3), (5, 4),   # 2-4, 3-4
+    ])
+    assert graph.shortest_path(1, 4, max_depth=6) == [1, 2, 4]
+    assert graph.shortest_path(1, 1, max_depth=6) == [1]
+    assert graph.shortest_path(1, 4, max_depth=1) is None
+    assert graph.shortest_path(1, 99, max_depth=6) is None
+
+def _contacts(client, *names):
+    ids = []
+    for name in names:
+        response = client.post("/contacts/", json={"first_name": name, "last_name": "Test"})
+        ids.append(response.json()["id"])
+    return ids
+
+def _note(client, contact_ids):
+    response = client.post("/notes/", json={"content": "Dinner", "contact_ids": contact_ids})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["id"]
+
+def test_contact_network(client):
+    ada, alan, grace, linus = _contacts(client, "Ada", "Alan", "Grace", "Linus")
+    _note(client, [ada, alan, grace])
+    _note(client, [ada, alan])
+    _note(client, [linus])
+
+    response = client.get(f"/contacts/{ada}/network")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["contact"]["first_name"] == "Ada"
+    assert [(c["contact"]["id"], c["weight"]) for c in data["connections"]] == [(alan, 2), (grace, 1)]
+
+    response = client.get(f"/contacts/{ada}/network", params={"min_weight": 2})
+    assert [c["contact"]["first_name"] for c in response.json()["connections"]] == ["Alan"]
+
+    assert client.get(f"/contacts/{linus}/network").json()["connections"] == []
+    assert client.get("/contacts/999/network").status_code == status.HTTP_404_NOT_FOUND
+
+def test_network_follows_link_changes(client, query_counter):
+    ada, alan, grace = _contacts(client, "Ada", "Alan", "Grace")
+    note_id = _note(client, [ada, alan])
+    assert client.get(f"/contacts/{ada}/network").json()["connections"][0]["weight"] == 1
+
+    client.post(f"/notes/{note_id}/contacts/{grace}")
+    # Only the names are loaded: the graph was updated in memory
+    with query_counter() as queries:
+        connections = client.get(f"/contacts/{grace}/network").json()["connections"]
+    assert queries.count == 1
+    assert {c["contact"]["id"] for c in connections} == {ada, alan}
+
+    client.delete(f"/notes/{note_id}/contacts/{alan}")
+    assert [c["contact"]["id"] for c in client.get(f"/contacts/{ada}/network").json()["connections"]] == [grace]
+
+    client.delete(f"/notes/{note_id}")
+    assert client.get(f"/contacts/{ada}/network").json()["connections"] == []
+
+def test_deleted_contact_leaves_the_graph(client):
+    ada, alan = _contacts(client, "Ada", "Alan")
+    _note(client, [ada, alan])
+    client.delete(f"/contacts/{alan}")
+    assert client.get(f"/contacts/{ada}/network").json()["connections"] == []
+
+def test_read_graph(client):
+    ada, alan, grace, linus = _contacts(client, "Ada", "Alan", "Grace", "Linus")
+    _note(client, [ada, alan, grace])
+    _note(client, [ada, alan])
+    _note(client, [grace, linus])
+
+    response = client.get("/graph/")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["edges"][0] == {"source": ada, "target": alan, "weight": 2}
+    assert len(data["edges"]) == 4
+    degrees = {node["id"]: node["degree"] for node in data["nodes"]}
+    assert degrees == {ada: 2, alan: 2, grace: 3, linus: 1}
+
+    data = client.get("/graph/", params={"min_weight": 2}).json()
+    assert data["edges"] == [{"source": ada, "target": alan, "weight": 2}]
+    assert {node["id"] for node in data["nodes"]} == {ada, alan}
+
+    assert len(client.get("/graph/", params={"limit": 1}).json()["edges"]) == 1
+
+def test_contact_path(client):
+    ada, alan, grace, linus = _contacts(client, "Ada", "Alan", "Grace", "Linus")
+    _note(client, [ada, alan])
+    _note(client, [alan, grace])
+
+    response = client.get(f"/contacts/{ada}/path/{grace}")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [c["first_name"] for c in data["contacts"]] == ["Ada", "Alan", "Grace"]
+    assert data["weights"] == [1, 1]
+
+    response = client.get(f"/contacts/{ada}/path/{grace}", params={"max_depth": 1})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"/contacts/{ada}/path/{linus}").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"/contacts/{ada}/path/999").status_code == status.HTTP_404_NOT_FOUND
+
+def test_health_reports_graph(client):
+    assert client.get("/health").json()["graph"] == {"built": False}
+    client.get("/graph/")
+    assert client.get("/health").json()["graph"]["built"] is True
@@ -0,0 +1,185 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import Base
+from app.models.job import Job
+from app.services import jobs
+from app.services.refinement import basic_refiner
+
+# Handlers for the tests; calls records what they were called with
+calls = []
+
+@jobs.job_handler("test_flaky", max_attempts=2)
+def _flaky(db, fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError("not yet")
+    return {"calls": len(calls)}
+
+@jobs.job_handler("test_limited", concurrency=1)
+def _limited(db):
+    return None
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+    yield
+    calls.clear()
+
+def _create_note(client, content="had coffee   with ada. she is well"):
+    contact = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()
+    response = client.post("/notes/", json={"content": content, "contact_ids": [contact["id"]]})
+    assert response.status_code == status.HTTP_200_OK
+    return response
+
+def test_basic_refiner():
+    assert basic_refiner("  had coffee   with ada.  she is\tdoing well ") == "Had coffee with ada. She is doing well."
+    assert basic_refiner("Line one\n\n  line two!  ") == "Line one\nline two!"
+    assert basic_refiner("   ") == ""
+
+def test_note_creation_queues_refinement(client):
+    response = _create_note(client)
+    assert response.json()["refined_content"] is None
+    note_id = response.json()["id"]
+    job_id = response.headers["X-Job-Id"]
+
+    response = client.get(f"/jobs/{job_id}")
+    assert response.status_code == status.HTTP_200_OK
+    job = response.json()
+    assert job["kind"] == "refine_note"
+    assert job["status"] == "queued"
+    assert job["payload"] == {"note_ids": [note_id]}
+    assert job["attempts"] == 0
+
+    assert client.get("/jobs/999").status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.parametrize("db_mode", ["sync"])
+def test_refinement_job_fills_refined_content(client, db_session):
+    response = _create_note(client)
+    note_id = response.json()["id"]
+    job_id = response.headers["X-Job-Id"]
+    # Cached before the job runs
+    assert client.get(f"/notes/{note_id}").json()["refined_content"] is None
+
+    assert jobs.run_pending(db_session) == 1
+
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
+    assert job["result"] == {"refined": 1}
+    assert job["finished_at"] is not None
+    assert client.get(f"/notes/{note_id}").json()["refined_content"] == "Had coffee with ada. She is well."
+
+    # A new content is refined again
+    response = client.put(f"/notes/{note_id}", json={"content": "lunch"})
+    assert "X-Job-Id" in response.headers
+    assert client.put(f"/notes/{note_id}", json={"title": "Lunch"}).headers.get("X-Job-Id") is None
+    jobs.run_pending(db_session)
+    assert client.get(f"/notes/{note_id}").json()["refined_content"] == "Lunch."
+
+@pytest.mark.parametrize("db_mode", ["sync"])
+def test_batch_queues_one_job(client, db_session):
+    contact = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()
+    notes = [{"content": f"note {i}", "contact_ids": [contact["id"]]} for i in range(3)]
+    response = client.post("/notes/batch", json=notes)
+    job = client.get(f"/jobs/{response.headers['X-Job-Id']}").json()
+    assert job["payload"]["note_ids"] == [note["id"] for note in response.json()]
+
+    assert jobs.run_pending(db_session) == 1
+    assert [client.get(f"/notes/{note['id']}").json()["refined_content"] for note in response.json()] == [
+        "Note 0.", "Note 1.", "Note 2."
+    ]
+
+def test_failed_jobs_are_retried_with_backoff(db_session):
+    job = jobs.enqueue(db_session, "test_flaky", fail_times=1)
+    db_session.commit()
+
+    assert jobs.run_next(db_session) is True
+    db_session.refresh(job)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert job.last_error == "RuntimeError: not yet"
+    assert job.run_after > datetime.utcnow() + timedelta(seconds=jobs.JOBS_RETRY_SECONDS - 1)
+
+    # Not due yet
+    assert jobs.run_next(db_session) is False
+
+    db_session.execute(update(Job).where(Job.id == job.id).values(run_after=datetime.utcnow()))
+    db_session.commit()
+    assert jobs.run_next(db_session) is True
+    db_session.refresh(job)
+    assert job.status == "succeeded"
+    assert job.attempts == 2
+    assert job.result == {"calls": 2}
+    assert job.last_error is None
+
+def test_jobs_fail_after_max_attempts(db_session, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_RETRY_SECONDS", 0)
+    job = jobs.enqueue(db_session, "test_flaky", fail_times=5)
+    db_session.commit()
+
+    assert jobs.run_pending(db_session) == 2
+    db_session.refresh(job)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.finished_at is not None
+    assert len(calls) == 2
+
+def test_expired_leases_are_claimed_again(db_session):
+    job = jobs.enqueue(db_session, "test_flaky", fail_times=0)
+    db_session.commit()
+    # As if a worker had died while running it
+    stale = datetime.utcnow() - timedelta(seconds=jobs.JOBS_LEASE_SECONDS + 1)
+    db_session.execute(update(Job).where(Job.id == job.id).values(status="running", attempts=1, locked_at=stale))
+    db_session.commit()
+
+    assert jobs.run_pending(db_session) == 1
+    db_session.refresh(job)
+    assert job.status == "succeeded"
+    assert job.attempts == 2
+
+def test_concurrency_limit(db_session, monkeypatch):
+    job = jobs.enqueue(db_session, "test_limited")
+    db_session.commit()
+
+    monkeypatch.setitem(jobs._running, "test_limited", 1)
+    assert jobs.run_next(db_session) is False
+    monkeypatch.setitem(jobs._running, "test_limited", 0)
+    assert jobs.run_next(db_session) is True
+    db_session.refresh(job)
+    assert job.status == "succeeded"
+
+def test_enqueue_unknown_kind(db_session):
+    with pytest.raises(ValueError):
+        jobs.enqueue(db_session, "nothing")
+
+def test_worker_pool_runs_committed_jobs(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    SessionFactory = sessionmaker(bind=engine)
+    pool = jobs.JobWorkerPool(SessionFactory, workers=2, poll_seconds=0.05)
+    pool.start()
+    try:
+        with SessionFactory() as db:
+            job_ids = [jobs.enqueue(db, "test_flaky", fail_times=0).id for _ in range(3)]
+            db.commit()
+
+        deadline = time.time() + 10
+        with SessionFactory() as db:
+            while time.time() < deadline:
+                statuses = {job.status for job in db.query(Job).filter(Job.id.in_(job_ids))}
+                if statuses == {"succeeded"}:
+                    break
+                db.expire_all()
+                time.sleep(0.05)
+        assert statuses == {"succeeded"}
+        assert pool.status()["workers"] == 2
+    finally:
+        pool.stop()
+        engine.dispose()
+    assert pool.status()["workers"] == 0
@@ -0,0 +1,104 @@
+import pytest
+from fastapi import status
+from sqlalchemy import update
+
+from app.models.note import Note
+from app.services import note_search
+from app.services.note_search import NoteIndex, stem, tokenize
+
+NOTES = [
+    (1, "Coffee with Ada\nShe is moving to Berlin next spring"),
+    (2, "Lunch\nTalked about hiring for the Berlin office"),
+    (3, "Call\nHe moved to Zürich, loves the lake"),
+    (4, "Dinner\nHiring, hiring and more hiring"),
+]
+
+def test_tokenize():
+    assert list(tokenize("She is Moving to Zürich!")) == ["mov", "zurich"]
+    assert stem("moves") == stem("moved") == stem("move") == "mov"
+    assert stem("class") == "class"
+    assert list(tokenize(None)) == []
+
+def test_index_ranks_matches():
+    index = NoteIndex(NOTES)
+    assert [note_id for note_id, _ in index.search("berlin", 10)] == [2, 1]
+    # Term frequency counts, saturating
+    assert [note_id for note_id, _ in index.search("hiring", 10)] == [4, 2]
+    # Any of the words, notes with both first
+    assert [note_id for note_id, _ in index.search("moving Berlin", 10)][0] == 1
+    assert {note_id for note_id, _ in index.search("moving", 10)} == {1, 3}
+    assert index.search("berlin", 1) == index.search("berlin", 10)[:1]
+    assert index.search("nothing", 10) == []
+    assert index.search("the", 10) == []
+
+def test_index_updates():
+    index = NoteIndex(NOTES)
+    index.update({2: ("Lunch\nTalked about Paris", 1), 3: (None, 1), 5: ("Berlin wall", 1)})
+    assert {note_id for note_id, _ in index.search("berlin", 10)} == {1, 5}
+    assert [note_id for note_id, _ in index.search("paris", 10)] == [2]
+    assert index.search("zurich", 10) == []
+    # An older change is skipped
+    index.update({2: ("Lunch\nTalked about Rome", 0)})
+    assert [note_id for note_id, _ in index.search("paris", 10)] == [2]
+    assert index.status() == {"notes": 4, "terms": index.status()["terms"], "overlay_entries": 4}
+
+def test_compaction_keeps_the_results(monkeypatch):
+    changes = {2: ("Lunch\nTalked about Paris", 1), 3: (None, 1), 5: ("Berlin wall", 1)}
+    overlaid = NoteIndex(NOTES)
+    overlaid.update(changes)
+
+    monkeypatch.setattr(note_search, "MIN_COMPACT_ENTRIES", 0)
+    compacted = NoteIndex(NOTES)
+    compacted.update(changes)
+    assert compacted.status()["overlay_entries"] == 0
+
+    rebuilt = NoteIndex([(1, NOTES[0][1]), (2, "Lunch\nTalked about Paris"), (4, NOTES[3][1]), (5, "Berlin wall")])
+    for query in ("berlin", "paris", "hiring", "moving berlin wall"):
+        assert compacted.search(query, 10) == rebuilt.search(query, 10)
+        # Replaced notes still count in the overlaid index's frequencies
+        assert [hit[0] for hit in overlaid.search(query, 10)] == [hit[0] for hit in rebuilt.search(query, 10)]
+
+def _note(client, contact_id, title, content):
+    response = client.post("/notes/", json={"title": title, "content": content, "contact_ids": [contact_id]})
+    return response.json()["id"]
+
+def test_search_endpoint(client):
+    contact = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()
+    berlin = _note(client, contact["id"], "Coffee", "She is moving to Berlin")
+    other = _note(client, contact["id"], "Lunch", "Talked about hiring")
+
+    response = client.get("/notes/search?q=berlin")
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()
+    assert [note["id"] for note in results] == [berlin]
+    assert results[0]["contact_ids"] == [contact["id"]]
+    assert results[0]["score"] > 0
+
+    # Changes after the index was built are seen by the next search
+    client.put(f"/notes/{other}", json={"content": "Also moving to Berlin"})
+    assert {note["id"] for note in client.get("/notes/search?q=berlin").json()} == {berlin, other}
+    client.delete(f"/notes/{berlin}")
+    results = client.get("/notes/search?q=berlin&include_contacts=true").json()
+    assert [note["id"] for note in results] == [other]
+    assert results[0]["contacts"][0]["first_name"] == "Ada"
+
+    assert client.get("/notes/search?q=").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/notes/search?q=berlin&limit=0").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+@pytest.mark.parametrize("db_mode", ["sync"])
+def test_changes_during_build_are_read_again(client, db_session, monkeypatch):
+    contact = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()
+    note_id = _note(client, contact["id"], "Coffee", "Berlin")
+
+    built = NoteIndex.__init__
+
+    def build_then_change(self, notes):
+        built(self, notes)
+        # Committed after the scan, before the index is swapped in
+        db_session.execute(update(Note).where(Note.id == note_id).values(content="Paris"))
+        note_search._notes_changed([note_id])
+
+    monkeypatch.setattr(NoteIndex, "__init__", build_then_change)
+    assert [note["id"] for note in client.get("/notes/search?q=paris").json()] == [note_id]
+    assert note_search.index_status()["stale"] == 0
+    assert client.get("/notes/search?q=berlin").json() == []
@@ -177,4 +177,145 @@ def test_delete_note(client):
     
     # Verify note is deleted
     contact_notes = client.get(f"/contacts/{contact_id}/notes")
-    assert not any(note["id"] == note_id for note in contact_notes.json())
\ No newline at end of file
+    assert not any(note["id"] == note_id for note in contact_notes.json())
+
+def test_read_notes_cursor_pagination(client):
+    contact_response = client.post("/contacts/", json={"first_name": "Paula", "last_name": "Pager"})
+    contact_id = contact_response.json()["id"]
+    
+    # Several notes share an interaction_date so the id tie-breaker matters
+    for i in range(5):
+        client.post("/notes/", json={
+            "content": f"Note {i}",
+            "contact_ids": [contact_id],
+            "interaction_date": f"2024-01-0{1 + i // 2}T10:00:00"
+        })
+    
+    for url in ("/notes/", f"/contacts/{contact_id}/notes"):
+        seen = []
+        response = client.get(f"{url}?limit=2")
+        while True:
+            page = response.json()
+            seen.extend((note["interaction_date"], note["id"]) for note in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            response = client.get(f"{url}?limit=2&cursor={cursor}")
+        
+        assert len(seen) == len(set(seen))
+        assert seen == sorted(seen, reverse=True)
+        assert len(seen) >= 5
+
+def test_read_notes_cursor_query_skips_null_handling(client, query_counter):
+    contact_id = client.post("/contacts/", json={"first_name": "Nola", "last_name": "Null"}).json()["id"]
+    for i in range(3):
+        client.post("/notes/", json={"content": f"Note {i}", "contact_ids": [contact_id]})
+    
+    cursor = client.get("/notes/?limit=1").headers["X-Next-Cursor"]
+    with query_counter() as queries:
+        client.get(f"/notes/?limit=1&cursor={cursor}")
+    page_query = next(statement for statement in queries.statements if "FROM notes" in statement)
+    # interaction_date is NOT NULL, so the ordering matches the plain index
+    assert "NULLS LAST" not in page_query
+    assert "IS NULL" not in page_query
+
+def test_read_note_includes_contacts(client):
+    contact_ids = []
+    for name in ("Ada", "Grace"):
+        response = client.post("/contacts/", json={"first_name": name, "last_name": "Pioneer"})
+        contact_ids.append(response.json()["id"])
+    
+    note_response = client.post("/notes/", json={"content": "Panel", "contact_ids": contact_ids})
+    note_id = note_response.json()["id"]
+    assert sorted(note_response.json()["contact_ids"]) == sorted(contact_ids)
+    
+    response = client.get(f"/notes/{note_id}")
+    assert sorted(response.json()["contact_ids"]) == sorted(contact_ids)
+    assert response.json()["contacts"] is None
+    
+    response = client.get(f"/notes/{note_id}?include_contacts=true")
+    contacts = response.json()["contacts"]
+    assert sorted(contact["first_name"] for contact in contacts) == ["Ada", "Grace"]
+
+@pytest.mark.parametrize("url", ["/notes/", "/contacts/{contact_id}/notes"])
+def test_note_lists_query_count_independent_of_page_size(client, query_counter, url):
+    contact_response = client.post("/contacts/", json={"first_name": "Quentin", "last_name": "Count"})
+    contact_id = contact_response.json()["id"]
+    other_response = client.post("/contacts/", json={"first_name": "Other", "last_name": "Count"})
+    other_id = other_response.json()["id"]
+    
+    for i in range(10):
+        client.post("/notes/", json={"content": f"Note {i}", "contact_ids": [contact_id, other_id]})
+    
+    url = url.format(contact_id=contact_id)
+    counts = {}
+    for limit in (2, 10):
+        for include_contacts in ("false", "true"):
+            with query_counter() as queries:
+                response = client.get(f"{url}?limit={limit}&include_contacts={include_contacts}")
+            data = response.json()
+            assert len(data) == limit
+            assert all(sorted(note["contact_ids"]) == sorted([contact_id, other_id]) for note in data)
+            counts[(limit, include_contacts)] = queries.count
+    
+    assert len(set(counts.values())) == 1
+    # Page, contact ids (and the contact check), plus the ETag version lookup
+    assert max(counts.values()) <= 4
+
+def test_create_notes_batch(client):
+    contact_ids = []
+    for name in ("Bea", "Cal"):
+        response = client.post("/contacts/", json={"first_name": name, "last_name": "Batch"})
+        contact_ids.append(response.json()["id"])
+    
+    batch = [
+        {"content": "Standup", "contact_ids": contact_ids, "interaction_date": "2024-05-01T09:00:00"},
+        {"content": "1:1", "contact_ids": [contact_ids[0]], "interaction_date": "2024-05-03T09:00:00"},
+        {"content": "Old call", "contact_ids": [contact_ids[1], 999999], "interaction_date": "2024-04-01T09:00:00"},
+    ]
+    response = client.post("/notes/batch", json=batch)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [note["content"] for note in data] == ["Standup", "1:1", "Old call"]
+    assert data[0]["is_group"] is True
+    assert data[2]["contact_ids"] == [contact_ids[1]]
+    
+    # last_contacted is the newest interaction of each contact
+    first = client.get(f"/contacts/{contact_ids[0]}").json()
+    second = client.get(f"/contacts/{contact_ids[1]}").json()
+    assert first["last_contacted"] == "2024-05-03T09:00:00"
+    assert second["last_contacted"] == "2024-05-01T09:00:00"
+
+def test_create_notes_batch_is_atomic(client):
+    contact_id = client.post("/contacts/", json={"first_name": "Atom", "last_name": "Batch"}).json()["id"]
+    
+    batch = [
+        {"content": "Kept?", "contact_ids": [contact_id]},
+        {"content": "Invalid", "contact_ids": [999999]},
+    ]
+    response = client.post("/notes/batch", json=batch)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "No valid contacts found for note 1"
+    
+    notes = client.get(f"/contacts/{contact_id}/notes").json()
+    assert notes == []
+
+def test_create_notes_batch_query_count(client, query_counter):
+    contact_id = client.post("/contacts/", json={"first_name": "Quinn", "last_name": "Batch"}).json()["id"]
+    
+    counts = []
+    for size in (2, 20):
+        batch = [{"content": f"Event {i}", "contact_ids": [contact_id]} for i in range(size)]
+        with query_counter() as queries:
+            response = client.post("/notes/batch", json=batch)
+        assert len(response.json()) == size
+        counts.append(queries.count)
+    assert counts[0] == counts[1]
+
+def test_backdated_note_keeps_last_contacted(client):
+    contact_id = client.post("/contacts/", json={"first_name": "Back", "last_name": "Dated"}).json()["id"]
+    client.post("/notes/", json={"content": "Recent", "contact_ids": [contact_id], "interaction_date": "2024-06-01T10:00:00"})
+    client.post("/notes/", json={"content": "Older", "contact_ids": [contact_id], "interaction_date": "2024-01-01T10:00:00"})
+    
+    contact = client.get(f"/contacts/{contact_id}").json()
+    assert contact["last_contacted"] == "2024-06-01T10:00:00"
@@ -0,0 +1,85 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.api import profiling
+from app.services.metrics import request_metrics
+
+@pytest.fixture
+def profiling_mode(monkeypatch):
+    def set_mode(mode):
+        monkeypatch.setattr(profiling, "PROFILING_MODE", mode)
+    request_metrics.reset()
+    yield set_mode
+    request_metrics.reset()
+
+def _server_timing(response):
+    return dict(part.strip().split(";", 1) for part in response.headers["server-timing"].split(","))
+
+def test_server_timing_header(client, profiling_mode):
+    profiling_mode("on")
+    contact_id = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+
+    response = client.get(f"/contacts/{contact_id}")
+    timing = _server_timing(response)
+    assert timing["app"].startswith("dur=")
+    assert timing["db"].endswith('queries"')
+    assert timing["db-rows"] == 'desc="1"'
+
+def test_profiling_off_adds_nothing(client, profiling_mode):
+    profiling_mode("off")
+    response = client.get("/contacts/")
+    assert "server-timing" not in response.headers
+
+def test_metrics_endpoint(client, profiling_mode):
+    profiling_mode("on")
+    contact_id = client.post("/contacts/", json={"first_name": "Ada", "last_name": "Lovelace"}).json()["id"]
+    client.get(f"/contacts/{contact_id}")
+    client.get("/contacts/999999")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'crm_http_requests_total{method="GET",route="/contacts/{contact_id}",status="200"} 1' in body
+    assert 'crm_http_requests_total{method="GET",route="/contacts/{contact_id}",status="404"} 1' in body
+    assert 'crm_http_request_duration_seconds_count{method="GET",route="/contacts/{contact_id}"} 2' in body
+    assert 'crm_db_statements_total{method="POST",route="/contacts/"}' in body
+    assert "crm_cache_hits" in body
+
+def _repeating_app(db_engine, repeats):
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+    @app.get("/repeat")
+    def repeat():
+        with db_engine.connect() as connection:
+            for i in range(repeats):
+                connection.execute(text("SELECT :value"), {"value": i})
+        return {"ok": True}
+
+    return app
+
+def test_debug_mode_flags_n_plus_one(db_engine, profiling_mode, monkeypatch):
+    profiling_mode("debug")
+    monkeypatch.setattr(profiling, "N_PLUS_ONE_THRESHOLD", 3)
+
+    with TestClient(_repeating_app(db_engine, 3)) as client:
+        response = client.get("/repeat")
+    assert response.headers[profiling.N_PLUS_ONE_HEADER] == "3"
+    assert 'crm_n_plus_one_total{method="GET",route="/repeat"} 1' in "\n".join(request_metrics.render())
+
+    with TestClient(_repeating_app(db_engine, 2)) as client:
+        response = client.get("/repeat")
+    assert profiling.N_PLUS_ONE_HEADER not in response.headers
+
+def test_debug_mode_profiles_slow_requests(db_engine, profiling_mode, monkeypatch, tmp_path):
+    profiling_mode("debug")
+    monkeypatch.setattr(profiling, "PROFILE_SLOW_MS", 0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+
+    with TestClient(_repeating_app(db_engine, 1)) as client:
+        client.get("/repeat")
+
+    profiles = list(tmp_path.glob("*-GET-repeat-*ms.prof"))
+    assert len(profiles) == 1
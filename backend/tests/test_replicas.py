@@ -0,0 +1,130 @@
+import pytest
+from fastapi import Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app.database import connection, replicas
+from app.database.connection import Base
+from app.database.replicas import READ_REPLICA_KEY, WROTE_AT_COOKIE, Replica, ReplicaSet, RoutingSession
+from app.models.contact import Contact
+from main import app
+
+def _database(path, first_name):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(Contact(first_name=first_name, last_name="Test"))
+        db.commit()
+    return engine
+
+@pytest.fixture
+def databases(tmp_path):
+    # The "replica" has different rows, to tell where a query went
+    primary = _database(tmp_path / "primary.db", "Primary")
+    replica = _database(tmp_path / "replica.db", "Replica")
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+def _sessions(primary, replica_set):
+    return sessionmaker(bind=primary, class_=RoutingSession, replica_set=replica_set)
+
+def _first_name(db):
+    return db.scalar(select(Contact.first_name).order_by(Contact.id))
+
+def test_reads_go_to_healthy_replicas(databases):
+    primary, replica_engine = databases
+    replica_set = ReplicaSet([Replica(replica_engine)], max_lag_seconds=5)
+    Sessions = _sessions(primary, replica_set)
+
+    # Not checked yet
+    with Sessions(info={READ_REPLICA_KEY: True}) as db:
+        assert _first_name(db) == "Primary"
+
+    replica_set.check()
+    assert replica_set.status()[0]["healthy"] is True
+    with Sessions(info={READ_REPLICA_KEY: True}) as db:
+        assert _first_name(db) == "Replica"
+        # A write goes to the primary, and so do the reads after it
+        db.execute(update(Contact).values(nickname="written"))
+        assert _first_name(db) == "Primary"
+        db.commit()
+    with Sessions() as db:
+        assert _first_name(db) == "Primary"
+        assert db.scalar(select(Contact.nickname)) == "written"
+
+    # Too far behind
+    replica_set.replicas[0].lag_seconds = 6
+    with Sessions(info={READ_REPLICA_KEY: True}) as db:
+        assert _first_name(db) == "Primary"
+
+def test_failed_replica_is_skipped(databases, tmp_path):
+    primary, replica_engine = databases
+    missing = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replica_set = ReplicaSet([Replica(missing), Replica(replica_engine)])
+    replica_set.check()
+
+    down, up = replica_set.status()
+    assert down["healthy"] is False and "OperationalError" in down["error"]
+    assert up["healthy"] is True
+    Sessions = _sessions(primary, replica_set)
+    for _ in range(3):
+        with Sessions(info={READ_REPLICA_KEY: True}) as db:
+            assert _first_name(db) == "Replica"
+
+def _request(method, cookies=""):
+    headers = [(b"cookie", cookies.encode())] if cookies else []
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers, "query_string": b""})
+
+def test_read_your_writes_cookie(monkeypatch):
+    monkeypatch.setattr(replicas, "READ_YOUR_WRITES_SECONDS", 5)
+    response = Response()
+    assert replicas.reads_from_replica(_request("POST"), response) is False
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith(f"{WROTE_AT_COOKIE}=") and "Max-Age=5" in cookie
+
+    wrote_at = cookie.split(";")[0].split("=")[1]
+    assert replicas.reads_from_replica(_request("GET", f"{WROTE_AT_COOKIE}={wrote_at}"), Response()) is False
+    assert replicas.reads_from_replica(_request("GET"), Response()) is True
+    assert replicas.reads_from_replica(_request("GET", f"{WROTE_AT_COOKIE}=1000"), Response()) is True
+    assert replicas.reads_from_replica(_request("GET", f"{WROTE_AT_COOKIE}=bogus"), Response()) is True
+
+def test_writer_is_not_served_a_stale_cached_response(databases, monkeypatch):
+    primary, replica_engine = databases
+    # The replica never catches up
+    replica_set = ReplicaSet([Replica(replica_engine)], max_lag_seconds=5)
+    replica_set.check()
+    monkeypatch.setattr(connection, "replica_set", replica_set)
+    monkeypatch.setattr(connection, "SessionLocal", _sessions(primary, replica_set))
+    monkeypatch.setattr(connection, "AsyncSessionLocal", None)
+    monkeypatch.setattr(replicas, "READ_YOUR_WRITES_SECONDS", 5)
+    writer, reader = TestClient(app), TestClient(app)
+    
+    assert reader.get("/contacts/1").json()["first_name"] == "Replica"
+    response = writer.put("/contacts/1", json={"first_name": "Written"})
+    assert response.json()["first_name"] == "Written"
+    # Another client reads the replica after the invalidation, and caches it
+    assert reader.get("/contacts/1").json()["first_name"] == "Replica"
+    
+    # The writer reads the primary, not what the replica left in the cache
+    assert writer.get("/contacts/1").json()["first_name"] == "Written"
+
+def test_indexes_are_built_from_the_primary(databases, monkeypatch):
+    primary, replica_engine = databases
+    # The replica never catches up
+    replica_set = ReplicaSet([Replica(replica_engine)], max_lag_seconds=5)
+    replica_set.check()
+    monkeypatch.setattr(connection, "replica_set", replica_set)
+    monkeypatch.setattr(connection, "SessionLocal", _sessions(primary, replica_set))
+    monkeypatch.setattr(connection, "AsyncSessionLocal", None)
+    monkeypatch.setattr(replicas, "READ_YOUR_WRITES_SECONDS", 5)
+    writer, reader = TestClient(app), TestClient(app)
+
+    # A read request builds the index, from the primary
+    assert [c["first_name"] for c in reader.get("/contacts/autocomplete?prefix=test").json()] == ["Primary"]
+    writer.post("/contacts/", json={"first_name": "Zelda", "last_name": "Fitzgerald"})
+    # Another client's lookup reads the new contact in, from the primary too
+    assert [c["first_name"] for c in reader.get("/contacts/autocomplete?prefix=zel").json()] == ["Zelda"]
+    assert [c["first_name"] for c in writer.get("/contacts/autocomplete?prefix=zel").json()] == ["Zelda"]
@@ -0,0 +1,143 @@
+from datetime import date
+
+import pytest
+from fastapi import status
+from sqlalchemy import select
+
+from app.models.interaction_rollup import ContactDailyInteractions, DailyInteractions
+from app.services.rollups import period_start, rebuild_rollups
+
+def _contact(client, first_name, city=None):
+    return client.post("/contacts/", json={"first_name": first_name, "last_name": "Test", "city": city}).json()["id"]
+
+def _note(client, contact_ids, day, interaction_type="meeting"):
+    response = client.post("/notes/", json={
+        "content": "Catch-up",
+        "contact_ids": contact_ids,
+        "interaction_date": f"{day}T12:00:00",
+        "interaction_type": interaction_type,
+    })
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["id"]
+
+def _rollups(db_session):
+    notes = db_session.execute(select(DailyInteractions).where(DailyInteractions.notes != 0)).scalars()
+    links = db_session.execute(
+        select(ContactDailyInteractions).where(ContactDailyInteractions.notes != 0)
+    ).scalars()
+    return (
+        sorted((row.day, row.interaction_type, row.notes) for row in notes),
+        sorted((row.day, row.interaction_type, row.contact_id, row.notes) for row in links),
+    )
+
+def test_period_start():
+    assert period_start(date(2024, 5, 16), "day") == date(2024, 5, 16)
+    assert period_start(date(2024, 5, 16), "week") == date(2024, 5, 13)
+    assert period_start(date(2024, 5, 16), "month") == date(2024, 5, 1)
+
+def test_timeline(client):
+    ada = _contact(client, "Ada", "London")
+    bob = _contact(client, "Bob", "Paris")
+    _note(client, [ada], "2024-05-13")
+    _note(client, [ada, bob], "2024-05-16", "call")
+    _note(client, [bob], "2024-05-21", "call")
+
+    response = client.get("/stats/timeline")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "period": "week",
+        "group_by": None,
+        "points": [
+            {"start": "2024-05-13", "group": None, "count": 2},
+            {"start": "2024-05-20", "group": None, "count": 1},
+        ],
+    }
+
+    points = client.get("/stats/timeline?period=month&group_by=interaction_type").json()["points"]
+    assert points == [
+        {"start": "2024-05-01", "group": "call", "count": 2},
+        {"start": "2024-05-01", "group": "meeting", "count": 1},
+    ]
+    # The group note counts for both cities
+    points = client.get("/stats/timeline?period=month&group_by=city").json()["points"]
+    assert [(p["group"], p["count"]) for p in points] == [("London", 2), ("Paris", 2)]
+
+    points = client.get("/stats/timeline?period=day&since=2024-05-14&until=2024-05-20").json()["points"]
+    assert points == [{"start": "2024-05-16", "group": None, "count": 1}]
+    points = client.get("/stats/timeline?interaction_type=call&period=month").json()["points"]
+    assert points == [{"start": "2024-05-01", "group": None, "count": 2}]
+
+    assert client.get("/stats/timeline?period=year").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_contact_activity(client):
+    ada = _contact(client, "Ada")
+    _note(client, [ada], "2024-04-30")
+    _note(client, [ada], "2024-05-02", "call")
+    _note(client, [ada], "2024-05-20", "call")
+
+    response = client.get(f"/stats/contacts/{ada}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "contact_id": ada,
+        "total": 3,
+        "first_day": "2024-04-30",
+        "last_day": "2024-05-20",
+        "by_type": {"call": 2, "meeting": 1},
+        "period": "month",
+        "timeline": [
+            {"start": "2024-04-01", "group": None, "count": 1},
+            {"start": "2024-05-01", "group": None, "count": 2},
+        ],
+    }
+    assert client.get(f"/stats/contacts/{ada}?since=2024-05-10").json()["total"] == 1
+    assert client.get("/stats/contacts/999").status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.parametrize("db_mode", ["sync"])
+def test_rollups_follow_changes(client, db_session):
+    ada = _contact(client, "Ada")
+    bob = _contact(client, "Bob")
+    cid = _contact(client, "Cid")
+    first = _note(client, [ada, bob], "2024-05-13")
+    second = _note(client, [bob], "2024-05-13", "call")
+
+    # Moved to another day and type
+    client.put(f"/notes/{first}", json={"interaction_date": "2024-05-14T09:00:00", "interaction_type": "call"})
+    # Content changes do not touch the rollups
+    client.put(f"/notes/{first}", json={"content": "Lunch"})
+    client.post(f"/notes/{first}/contacts/{cid}")
+    client.delete(f"/notes/{first}/contacts/{ada}")
+    client.delete(f"/notes/{second}")
+    expected = (
+        [(date(2024, 5, 14), "call", 1)],
+        [(date(2024, 5, 14), "call", bob, 1), (date(2024, 5, 14), "call", cid, 1)],
+    )
+    assert _rollups(db_session) == expected
+
+    # Incremental maintenance matches a full rebuild
+    rebuild_rollups(db_session)
+    assert _rollups(db_session) == expected
+
+    # Merging moves the interactions to the kept contact
+    client.post("/contacts/merge", json={"target_id": ada, "source_ids": [bob]})
+    assert _rollups(db_session)[1] == [(date(2024, 5, 14), "call", ada, 1), (date(2024, 5, 14), "call", cid, 1)]
+    client.delete(f"/contacts/{cid}")
+    assert _rollups(db_session)[1] == [(date(2024, 5, 14), "call", ada, 1)]
+
+def test_deleting_and_merging_linked_contacts(client):
+    # Foreign keys are enforced in the tests: rollup rows of a deleted
+    # contact must not be written again when its links are removed
+    ada = _contact(client, "Ada")
+    bob = _contact(client, "Bob")
+    cid = _contact(client, "Cid")
+    _note(client, [ada, bob], "2024-05-13")
+    _note(client, [cid], "2024-05-14")
+
+    response = client.post("/contacts/merge", json={"target_id": ada, "source_ids": [bob]})
+    assert response.status_code == status.HTTP_200_OK
+    assert client.delete(f"/contacts/{cid}").status_code == status.HTTP_200_OK
+
+    assert client.get(f"/stats/contacts/{ada}").json()["total"] == 1
+    assert client.get("/stats/timeline?period=day").json()["points"] == [
+        {"start": "2024-05-13", "group": None, "count": 1},
+        {"start": "2024-05-14", "group": None, "count": 1},
+    ]